@@ -1,68 +1,53 @@
+from collections import defaultdict
+import html
 import itertools
+import json
 import os
+import tempfile
+import threading
 
-from flask import Flask
-import numpy as np
-import pandas as pd
-import pulp
-from sheetfu import SpreadsheetApp
+from flask import Flask, jsonify, url_for
+
+# numpy, pulp and sheetfu are imported by the functions that use them,
+# so a cold start only loads flask and the light pyscheduler modules
+from pyscheduler.cache import ScheduleCache, schedule_key
+from pyscheduler.jobs import JobQueue
+from pyscheduler.stats import SolveStats, cbc_log_stats, phase
 
 
 app = Flask(__name__)
 THRESH = .25
 N_GAMES = 5
+PARTNER_CAP = 2
+OPPONENT_CAP = 3
+# 'cbc' solves the model, 'anneal' is the fast path that never imports pulp
+SOLVER = os.environ.get('SCHEDULE_SOLVER', 'cbc')
+JOBS = JobQueue(max_workers=2)
+CACHE = ScheduleCache(os.environ.get('SCHEDULE_CACHE_DIR', os.path.join(os.path.dirname(__file__), '.schedule_cache')))
 ssid = '1pviG2swzT_N_DyiMmBH22D0oCQ3bNuliE7-XqF3CY7s'
+# set to a pyscheduler.sheets.FakeSheetsBackend to run jobs offline
+SHEETS_BACKEND = None
+SHEETS = {}
+SHEETS_LOCK = threading.Lock()
 
 
-def _game_combos(team_combos, n_games):
-    """Creates game combinations from team combinations
-    Args:
-        team_combos (list[tuple]): the team combinations
-        n_games (int): number of games to schedule
-    Returns:
-        list[tuple]
-    """
-    # calculate game combinations
-    # each item is a 3-tuple of tuple(team1), tuple(team2), game_number
-    # the set intersection ensures no common elements between teams
-    legal_games = [(t[0], t[1]) for t in pulp.combination(team_combos, 2) 
-                   if not set(t[0]) & set(t[1])]
-    return [(t1, t2, game_number)
-            for game_number in np.arange(n_games) + 1
-            for t1, t2 in legal_games]
-
-
-def _game_scores(game_combos, s):
-    """Creates game scores from mapping
-    Args:
-        game_combos (list[tuple]): the game combos
-        s (dict[str, float]): the game scores
-    Returns:
-        dict[tuple, float]
-    """
-    # calculate game score differential
-    game_scores = {}
-    for gc in game_combos:
-        p1, p2 = gc[0]
-        p3, p4 = gc[1]
-        game_scores[(gc[0], gc[1])] = np.abs((s[p1] + s[p2]) - (s[p3] + s[p4]))
-    return game_scores
-
-
-def _optimize(team_combos, game_combos, game_scores, p, n_games, solver=None):
-    """Creates game scores from mapping
+def _build_problem(game_combos, game_scores, p, n_games):
+    """Creates the optimization problem
     Args:
-        team_combos (list[tuple]): the team combos
         game_combos (list[tuple]): the game combos
         game_scores (dict[tuple, float]): the game scores
         p (list[str]): player names
         n_games (int): number of games
-        solver (pulp.apis.core.LpSolver): optional solver
     Returns:
-        pulp.LpProblem
+        tuple: pulp.LpProblem, dict[tuple, LpVariable]
     """
+    import numpy as np
+    import pulp
+    from pyscheduler.pyscheduler import _index_gcvars
+
     # decision variables
     gcvars = pulp.LpVariable.dicts('gc_decvar', game_combos, cat=pulp.LpBinary)
+    by_player, by_player_round, by_partners, by_opponents = _index_gcvars(gcvars)
 
     # create problem
     # minimize game scores subject to constraints
@@ -79,231 +64,227 @@ def _optimize(team_combos, game_combos, game_scores, p, n_games, solver=None):
 
     # each player must have n_games games
     for player in p:
-        prob += pulp.lpSum([v for k, v in gcvars.items()
-                            if (player in k[0] or player in k[1])]) == n_games
+        prob += pulp.lpSum(by_player.get(player, [])) == n_games
 
     # each player has 1 game per game_number
     for player in p:
         for game_number in np.arange(1, n_games + 1):
-            prob += pulp.lpSum([v for k, v in gcvars.items()
-                                if (player in k[0] or player in k[1]) and
-                                k[2] == game_number]) == 1
+            prob += pulp.lpSum(by_player_round.get((player, game_number), [])) == 1
     
     # do not play with a player more than once
     # do not play against a player more than twice
     for player, pplayer in itertools.combinations(p, 2):
-        prob += pulp.lpSum([v for k, v in gcvars.items()
-                            if (player in k[0] and pplayer in k[0]) or
-                            (player in k[1] and pplayer in k[1])]) <= 2
-        prob += pulp.lpSum([v for k, v in gcvars.items()
-                            if (player in k[0] and pplayer in k[1]) or
-                            (player in k[1] and pplayer in k[0])]) <= 3
+        pair = frozenset((player, pplayer))
+        prob += pulp.lpSum(by_partners.get(pair, [])) <= PARTNER_CAP
+        prob += pulp.lpSum(by_opponents.get(pair, [])) <= OPPONENT_CAP
 
-    # solve the problem
+    return prob, gcvars
+
+
+def _optimize(team_combos, game_combos, game_scores, p, n_games, solver=None, warm_start=False, stats=None):
+    """Creates game scores from mapping
+    Args:
+        team_combos (list[tuple]): the team combos
+        game_combos (list[tuple]): the game combos
+        game_scores (dict[tuple, float]): the game scores
+        p (list[str]): player names
+        n_games (int): number of games
+        solver (pulp.apis.core.LpSolver): optional solver
+        warm_start (bool): start CBC from a greedy schedule
+        stats (SolveStats): optional, collects build, warm_start and solve phases
+    Returns:
+        pulp.LpProblem
+    """
+    import pulp
+    from pyscheduler.backends import _warm_start
+    from pyscheduler.pyscheduler import _greedy_schedule
+
+    with phase(stats, 'build') as rec:
+        prob, gcvars = _build_problem(game_combos, game_scores, p, n_games)
+        rec.update(n_vars=prob.numVariables(), n_constraints=prob.numConstraints())
     if not solver:
         solver = pulp.getSolver('PULP_CBC_CMD', timeLimit=600, gapAbs=2)
-    prob.solve(solver)
+
+    # load greedy schedule as the MIP start
+    start = set()
+    if warm_start:
+        with phase(stats, 'warm_start') as rec:
+            start = set(_greedy_schedule(game_combos, game_scores, p, n_games, PARTNER_CAP, OPPONENT_CAP))
+            rec['found'] = bool(start)
+        if start:
+            for gc, v in gcvars.items():
+                v.setInitialValue(1 if gc in start else 0)
+
+    # solve the problem
+    # bound, gap and first incumbent come from the CBC log when there is one
+    with _warm_start(solver, bool(start)), phase(stats, 'solve') as rec:
+        prob.solve(solver)
+        rec.update(status=pulp.LpStatus[prob.status], objective=pulp.value(prob.objective))
+        log_path = solver.optionsDict.get('logPath')
+        if log_path and os.path.exists(log_path):
+            rec.update({k: v for k, v in cbc_log_stats(log_path).items()
+                        if k not in ('objective', 'incumbent_times')})
 
     return prob, gcvars
 
 
-def _solution(gcvars, s):
-    """Inspects solution
+def _court_table(combos):
+    """Schedule sheet rows, one per game_number with a column per court
     Args:
-        gcvars (dict[str, LpVariable]): the decision variables
+        combos (list[tuple]): (team1, team2, game_number) tuples
     Returns:
-        DataFrame
+        list[list]: header row, then one row per game_number
     """
-    # look at solution
-    df = pd.DataFrame(data=[k for k, v in gcvars.items() if v.varValue == 1], 
-                        columns=['Team1', 'Team2', 'Round#'])
-    df = df.sort_values('Round#')
-    df['Team1_score'] = df['Team1'].apply(lambda x: sum(s.get(i) for i in x))
-    df['Team2_score'] = df['Team2'].apply(lambda x: sum(s.get(i) for i in x))
-    df = df.assign(Combined_score=lambda x: x['Team1_score'] + x['Team2_score'])
-    df = df.assign(Score_diff=lambda x: (np.abs(x['Team1_score'] - x['Team2_score']).round(2)))
-    return df
-
-
-def _ss_to_df(ws):
-    """Creates dataframe from spreadsheet"""
-    data = wks.get_all_values()
-    headers = data.pop(0)
-    return pd.DataFrame(data, columns=headers)
-
-
-def clear_sheet(s, keep_headers=False):
-    """Clears all values in worksheet
-    
+    courts = defaultdict(list)
+    for t1, t2, game_number in sorted(combos, key=lambda gc: gc[2]):
+        courts[game_number].append(' and '.join(t1) + '\n' + ' and '.join(t2))
+    n_courts = max((len(v) for v in courts.values()), default=0)
+    rows = [['Round#'] + [f'Court {c}' for c in range(1, n_courts + 1)]]
+    for game_number, matchups in courts.items():
+        rows.append([game_number] + matchups + [''] * (n_courts - len(matchups)))
+    return rows
+
+
+def _to_html(values):
+    """Renders rows as an html table, the first row is the header"""
+    def tr(row, tag):
+        return '<tr>' + ''.join(f'<{tag}>{html.escape(str(v))}</{tag}>' for v in row) + '</tr>'
+    return '<table>' + tr(values[0], 'th') + ''.join(tr(row, 'td') for row in values[1:]) + '</table>'
+
+
+def _sheets():
+    """Player sheet reader and schedule sheet publisher, kept between jobs"""
+    with SHEETS_LOCK:
+        if not SHEETS:
+            from pyscheduler.sheets import GoogleSheetsBackend, SheetPublisher, SheetReader
+            backend = SHEETS_BACKEND
+            if backend is None:
+                from sheetfu import SpreadsheetApp
+                sa = SpreadsheetApp(from_env=True)
+                backend = GoogleSheetsBackend(sa.sheet_service, ssid, getattr(sa, 'drive_service', None))
+            SHEETS.update(players=SheetReader(backend, 'players'),
+                          schedule=SheetPublisher(backend, 'schedule'))
+    return SHEETS['players'], SHEETS['schedule']
+
+
+def _report_phase(rec):
+    """Sends one pipeline phase to the metrics log"""
+    app.logger.info('schedule phase %s', json.dumps(rec, default=str))
+
+
+def _solve_cbc(s, log_path):
+    """Builds and solves the model, run in a job process
     Args:
-        s (worksheet): sheetfu worksheet object
-        keep_headers (bool): keep worksheet headers
-
+        s (dict[str, float]): dict of player and score
+        log_path (str): CBC log, read by the status endpoint while solving
     Returns:
-        None
-
+        tuple: chosen game combos, objective (None if CBC found no schedule), stats phases
     """
-    if keep_headers:
-        max_row = s.get_max_rows()
-        max_column = s.get_max_columns()
-        rng = s.get_range(row=2, column=1, number_of_row=max_row - 1, number_of_column=max_column)
-    else:
-        try:
-            rng = s.get_data_range()
-        except (ValueError, NoDataRangeError):
-            rng = s.get_range(row=1, column=1, number_of_row=500, number_of_column=25)
-    rng.set_value('')
+    import pulp
+    from pyscheduler.pyscheduler import _game_combos_within
+
+    stats = SolveStats()
+    # create game combos
+    # games over THRESH are skipped while enumerating instead of filtered afterwards
+    with phase(stats, 'game_combos', thresh=THRESH) as rec:
+        valid_game_combos, valid_game_scores = _game_combos_within(s, N_GAMES, THRESH)
+        rec['n_game_combos'] = len(valid_game_combos)
+    valid_team_combos = set([gc[0][0] for gc in valid_game_combos] + [gc[0][1] for gc in valid_game_combos])
+    solver = pulp.getSolver('PULP_CBC_CMD', gapAbs=1, timeLimit=300, logPath=log_path)
+    prob, gcvars = _optimize(valid_team_combos, valid_game_combos, valid_game_scores, list(s.keys()), N_GAMES, solver,
+                             warm_start=True, stats=stats)
+    combos = [k for k, v in gcvars.items() if v.varValue == 1]
+    solved = prob.sol_status in (pulp.LpSolutionOptimal, pulp.LpSolutionIntegerFeasible)
+    return combos, pulp.value(prob.objective) if solved else None, stats.phases
 
 
-def df_to_values(df, include_headers=True):
-    """Converts DataFrame to list of tuples to use for sheet values
-    
+def _schedule_job(job):
+    """Reads the roster, solves and writes the schedule sheet
     Args:
-        df (DataFrame): the dataframe to convert
-        include_headers (bool): include headers in values
-
+        job (Job): the background job, checked for cancellation between steps
     Returns:
-        list[tuple]
-
+        str: the schedule as html
     """
-    if include_headers:
-        return [tuple(df.columns)] + list(df.itertuples(index=False, name=None))
-    return list(df.itertuples(index=False, name=None))
-
-
-def get_df_rng(ws, df, start_row=1, start_col=1, include_headers=True):
-    """Gets a range that matches size of dataframe"""
-    nrow = len(df) + 1 if include_headers else len(df) 
-    ncol = len(df.columns)
-    return ws.get_range(row=start_row, 
-                        column=start_col, 
-                        number_of_row=nrow, 
-                        number_of_column=ncol)
-
-
-def df_to_sheet(s, df, include_headers=True):
-    """Replaces all values in ws with dataframe values)"""
-    # step one: clear existing values
-    clear_sheet(s)
-    rng = get_df_rng(s, df, include_headers=include_headers)
-    vals = df_to_values(df, include_headers=include_headers)
-    rng.set_values(vals)
-    return True  
-
-
-def sheet_to_df(s, include_headers=True):
-    """Reads a worksheet into a pandas dataframe"""
-    rng = s.get_data_range() 
-    vals = rng.get_values()
-    if include_headers:
-        headers = vals.pop(0)
-        return (
-            pd.DataFrame(data=vals, columns=headers)
-        )
-    return pd.DataFrame(data=vals)
-
-
-@app.route('/')
-def hello_world():
     #sa = SpreadsheetApp('/content/drive/MyDrive/pickleball-315623-72469838c4d6.json')
-    sa = SpreadsheetApp(from_env=True)
-    spreadsheet = sa.open_by_id(ssid)
-    
-    # get player ratings from spreadsheet
-    # only uses players marked active
-    player_sheet = spreadsheet.get_sheet_by_name('players')
-    playerdf = sheet_to_df(player_sheet)
-    playerdf.columns = playerdf.columns.str.strip()
-    playerdf['Rating'] = playerdf['Rating'].astype(float) 
-    playerdf = playerdf.loc[playerdf['Active'] == 'Yes', :]
-    s = dict(zip(playerdf['Player'], playerdf['Rating']))
-
-    # create team combos
-    team_combos = list(pulp.combination(s.keys(), 2))
-    game_combos = _game_combos(team_combos, N_GAMES)
-    game_scores = _game_scores(game_combos, s)
-
-    # filter invalid games
-    valid_game_scores = {k: v for k,v in game_scores.items() if v <= THRESH}
-    valid_game_combos = [(item[0][0], item[0][1], item[1])
-                          for item in itertools.product(valid_game_scores.keys(), np.arange(N_GAMES) + 1)]
-    valid_team_combos = set([gc[0][0] for gc in valid_game_combos] + [gc[0][1] for gc in valid_game_combos])
-    solver = pulp.get_solver('PULP_CBC_CMD', gapAbs=1, timeLimit=300)
-    prob, gcvars = _optimize(valid_team_combos, valid_game_combos, valid_game_scores, list(s.keys()), N_GAMES, solver)
-    df = _solution(gcvars, s)
-    df['Matchup'] = df.apply(lambda x: ' and '.join([p for p in x.Team1]) + '\n' + ' and '.join([p for p in x.Team2]), axis=1)
-    df['Court'] = df.groupby('Round#').cumcount() + 1
-    pdf = df.pivot(index='Round#', columns='Court', values='Matchup')
-    pdf.columns = [f'Court {c}' for c in pdf.columns]
-    pdf = pdf.reset_index()
-    
-    schedule_sheet = spreadsheet.get_sheet_by_name('schedule')
-    
-    # save to disk
-    df_to_sheet(schedule_sheet, pdf)
-    
-    # clear existing formatting and
-    # add alternating formatting to 
-    # header and cells with data
-    try:
-        # clear existing formatting
-        cells = schedule_sheet.get_range_from_a1('A1:M13')
-        blank_backgrounds = [[''] * 13 for _ in range(13)]
-        cells.set_backgrounds(blank_backgrounds)
-
-        # add formatting to schedule
-        data_range = schedule_sheet.get_data_range()
-        backgrounds = data_range.get_backgrounds()
-        new_backgrounds = []
-        for idx, row in enumerate(backgrounds):
-            n_columns = len(row)
-            fmt = ''
-            if idx == 0:
-                fmt = '#bdbdbd'
-            elif idx % 2 == 1:
-                fmt = '#f3f3f3'
-            new_backgrounds.append([fmt] * n_columns)    
-        data_range.set_backgrounds(new_backgrounds)
-    except:
-        pass
-        
-    # autosize rows and columns
-    try:
-        sheetid = 1017411366
-        request = {
-            "autoResizeDimensions": {
-                "dimensions": {
-                  "sheetId": sheetid,
-                  "dimension": "COLUMNS",
-                  "startIndex": 0,
-                  "endIndex": 20
-                }
-            }
-        }
-
-        body = {'requests': [request]}
-        sa.sheet_service.spreadsheets().batchUpdate(spreadsheetId=ssid, body=body).execute()
-
-        request = {
-            "autoResizeDimensions": {
-                "dimensions": {
-                  "sheetId": sheetid,
-                  "dimension": "ROWS",
-                  "startIndex": 0,
-                  "endIndex": 20
-                }
-            }
-        }
-
-        body = {'requests': [request]}
-        sa.sheet_service.spreadsheets().batchUpdate(spreadsheetId=ssid, body=body).execute()
-    except:
-        pass
+    job.update(progress='reading players')
+    stats = job.stats = SolveStats(callback=_report_phase)
+    with phase(stats, 'read_players') as rec:
+        players, publisher = _sheets()
+        # get player ratings from spreadsheet
+        # only uses players marked active, the read is reused until the spreadsheet changes
+        with SHEETS_LOCK:
+            records, rec['changed'] = players.records()
+        s = {row['Player']: float(row['Rating']) for row in records if row['Active'] == 'Yes'}
+        rec['n_players'] = len(s)
+
+    # reuse the stored schedule if the roster and settings have not changed
+    key = schedule_key(s, N_GAMES, thresh=THRESH, method='diff', solver=SOLVER,
+                       partner_cap=PARTNER_CAP, opponent_cap=OPPONENT_CAP)
+    with phase(stats, 'cache_lookup') as rec:
+        combos = CACHE.get(key)
+        rec['hit'] = combos is not None
+    if combos is None and SOLVER == 'anneal':
+        # local search caps partners at 1 and opponents at 2, within the app caps
+        # games over THRESH count as violations, so only a schedule within it is cached
+        from pyscheduler.pyscheduler2 import PyScheduler2
+        job.update(progress='solving')
+        sched = PyScheduler2(N_GAMES, s, thresh=THRESH, stats=stats).solve(time_limit=60, seed=0)
+        combos = list(sched)
+        if not stats['anneal']['violations']:
+            CACHE.put(key, combos)
+            job.update(objective=stats['anneal']['objective'])
+    elif combos is None:
+        # the solve runs in a child process, so cancelling the job kills CBC
+        # the status endpoint reads the best objective so far from the CBC log
+        log_path = os.path.join(tempfile.gettempdir(), f'cbc-{job.id}.log')
+        job.update(progress='solving')
+        job.log_path = log_path
+        try:
+            combos, objective, phases = job.run_process(_solve_cbc, s, log_path)
+        finally:
+            job.log_path = None
+            if os.path.exists(log_path):
+                os.remove(log_path)
+        stats.extend(phases)
+        # only keep schedules the solver found, not an empty or partial answer
+        if objective is not None:
+            CACHE.put(key, combos)
+            job.update(objective=objective)
+    with phase(stats, 'postprocess'):
+        values = _court_table(combos)
     
-    try:    
-        return pdf.to_html()
-    except:
-        return 'Hello world!!!'
+    # a newer roster may have arrived while solving, do not overwrite its schedule
+    job.update(progress='writing schedule')
+
+    # values, banding and autoresize go out in one batchUpdate of the changed cells
+    with phase(stats, 'write_sheet') as rec, SHEETS_LOCK:
+        rec.update(publisher.publish(values))
+
+    return _to_html(values)
+
+
+@app.route('/', methods=['GET', 'POST'])
+def hello_world():
+    """Queues a schedule job, a newer request supersedes unfinished ones"""
+    job = JOBS.submit(_schedule_job, group=ssid)
+    return jsonify(job_id=job.id, status=job.status, url=url_for('job_status', job_id=job.id)), 202
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Progress, best objective so far and, once done, the schedule html"""
+    job = JOBS.get(job_id)
+    if job is None:
+        return jsonify(error='unknown job'), 404
+    return jsonify(job.to_dict())
+
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def job_cancel(job_id):
+    """Cancels a queued or running job, a running solve is killed"""
+    if not JOBS.cancel(job_id):
+        return jsonify(error='unknown or finished job'), 404
+    return jsonify(JOBS.get(job_id).to_dict())
         
         
 if __name__ == "__main__":
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+benchmarks/backends.py
+CBC and CP-SAT on the same rounds model
+
+Each seeded roster is built once with _schedule_model and solved by
+every backend with the same time limit, so only the solver differs.
+CP-SAT is skipped if OR-Tools is not installed.
+
+Usage, from the repository root:
+    python -m benchmarks.backends --players 12 16 20 --n-games 5 --workers 8
+
+"""
+import argparse
+import random
+import time
+
+import pulp
+
+from pyscheduler import pyscheduler
+from pyscheduler.backends import CpSatBackend, PulpBackend
+from pyscheduler.games import game_keys, legal_games, team_array
+
+
+def run(n_players, n_games, time_limit, workers, seed):
+    """Solves one random roster with each backend"""
+    rng = random.Random(seed)
+    ratings = [round(rng.uniform(3.5, 5.0), 1) for _ in range(n_players)]
+    games = legal_games(team_array(n_players))
+    game_combos = game_keys(games, n_games)
+    game_scores = pyscheduler._matchup_scores(games, ratings)
+    p = list(range(n_players))
+    kept, _ = pyscheduler.presolve(game_combos, game_scores, p, n_games)
+    model = pyscheduler._schedule_model(kept, game_scores, p, n_games)
+    backends = [PulpBackend(pulp.getSolver('PULP_CBC_CMD', msg=False, timeLimit=time_limit, gapAbs=2)),
+                CpSatBackend(time_limit=time_limit, workers=workers, gap_abs=2, seed=seed)]
+    for backend in backends:
+        start = time.perf_counter()
+        try:
+            status, objective, _ = backend.solve(model)
+        except ImportError as e:
+            print(f'{n_players:>3} {n_games:>3} {backend.name:>6} skipped: {e}')
+            continue
+        elapsed = time.perf_counter() - start
+        print(f'{n_players:>3} {n_games:>3} {backend.name:>6} {status:>10} '
+              f'{"-" if objective is None else f"{objective:.1f}":>8} {elapsed:>8.2f}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--players', type=int, nargs='+', default=[12, 16])
+    parser.add_argument('--n-games', type=int, default=5)
+    parser.add_argument('--time-limit', type=float, default=60)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    print('players games backend    status objective  seconds')
+    for n_players in args.players:
+        run(n_players, args.n_games, args.time_limit, args.workers, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+benchmarks/import_time.py
+cold import time of the package and the app
+
+Each target is imported in a fresh interpreter, the best of --repeat
+runs is kept, and the heavy modules it loaded are recorded. A target
+that loads a module it should leave to the phases that need it is an
+error, as is one slower than its --compare baseline by --tolerance.
+
+Usage, from the repository root:
+    python -m benchmarks.import_time --out imports.json
+    python -m benchmarks.import_time --out new.json --compare imports.json
+
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ('numpy', 'pandas', 'pulp', 'sheetfu')
+
+# target: heavy modules it must not load
+TARGETS = {
+    'pyscheduler': ('numpy', 'pandas', 'pulp'),
+    'pyscheduler.cache': ('numpy', 'pandas', 'pulp'),
+    'pyscheduler.jobs': ('numpy', 'pandas', 'pulp'),
+    'pyscheduler.stats': ('numpy', 'pandas', 'pulp'),
+    'pyscheduler.pyscheduler2': ('pandas', 'pulp'),
+    'pyscheduler.pyscheduler': (),
+    'app': HEAVY,
+}
+
+PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+import {target}
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+'''
+
+
+def measure(target, repeat):
+    """Best cold import time of a target
+
+    Returns:
+        dict: seconds and loaded heavy modules, or error
+
+    """
+    # app/app.py is imported as the top-level module app, like the server runs it
+    path = [os.path.join(ROOT, 'app'), ROOT] if target == 'app' else [ROOT]
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(path + [os.environ.get('PYTHONPATH', '')]))
+    best = None
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, '-c', PROBE.format(target=target, heavy=HEAVY)],
+                              capture_output=True, text=True, env=env, cwd=ROOT)
+        if proc.returncode:
+            return {'error': proc.stderr.strip().splitlines()[-1]}
+        rec = json.loads(proc.stdout)
+        if best is None or rec['seconds'] < best['seconds']:
+            best = rec
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--targets', nargs='+', default=list(TARGETS))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--out', default='imports.json')
+    parser.add_argument('--compare', help='earlier output to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=1.5)
+    args = parser.parse_args()
+
+    results, n_failed = {}, 0
+    for target in args.targets:
+        rec = results[target] = measure(target, args.repeat)
+        if 'error' in rec:
+            # e.g. flask is not installed here
+            print(f'{target:<26} skipped: {rec["error"]}')
+            continue
+        forbidden = sorted(set(rec['loaded']) & set(TARGETS.get(target, ())))
+        n_failed += bool(forbidden)
+        print(f'{target:<26} {rec["seconds"]:.4f}s loaded={",".join(rec["loaded"]) or "-"}'
+              + (f' FORBIDDEN={",".join(forbidden)}' if forbidden else ''))
+
+    with open(args.out, 'w') as f:
+        json.dump({'python': sys.version.split()[0], 'results': results}, f, indent=1)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        for target, rec in results.items():
+            before = baseline.get(target, {}).get('seconds')
+            if before and 'seconds' in rec and rec['seconds'] / before > args.tolerance:
+                n_failed += 1
+                print(f'REGRESSION {target}: {before:.4f}s -> {rec["seconds"]:.4f}s')
+    if n_failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+benchmarks/sheets.py
+round trips and cells written when publishing schedules
+
+Publishes a sequence of schedules for one roster to the in-memory
+backend, each one a re-solve after a single rating change, and counts
+the API calls and cells written. --latency adds a fixed delay per call
+to estimate wall time against the real API. The app used to make seven
+calls per publish: clear, set_values, blank backgrounds, get_backgrounds,
+set_backgrounds and two autoresize batchUpdates.
+
+Usage, from the repository root:
+    python -m benchmarks.sheets --players 16 --publishes 10 --latency .3
+
+"""
+import argparse
+import random
+import time
+
+from pyscheduler.search import anneal
+from pyscheduler.sheets import FakeSheetsBackend, SheetPublisher
+
+OLD_CALLS_PER_PUBLISH = 7
+
+
+class SlowBackend(FakeSheetsBackend):
+    """Fake backend that sleeps on every call like a network round trip"""
+
+    def __init__(self, latency, **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency
+
+    def get_values(self, sheet):
+        time.sleep(self.latency)
+        return super().get_values(sheet)
+
+    def batch_update(self, requests):
+        time.sleep(self.latency)
+        return super().batch_update(requests)
+
+
+def table(ratings, names, n_games, seed):
+    """Schedule sheet rows of an annealed schedule"""
+    games, rounds, _, _ = anneal(ratings, n_games, iterations=20000, seed=seed)
+    rows = {}
+    for (p1, p2, p3, p4), game_number in zip(games.tolist(), rounds.tolist()):
+        rows.setdefault(game_number, [game_number]).append(
+            f'{names[p1]} and {names[p2]}\n{names[p3]} and {names[p4]}')
+    n_courts = len(names) // 4
+    return [['Round#'] + [f'Court {c}' for c in range(1, n_courts + 1)]] + list(rows.values())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--players', type=int, default=16)
+    parser.add_argument('--n-games', type=int, default=5)
+    parser.add_argument('--publishes', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    names = [f'P{idx:02d}' for idx in range(args.players)]
+    ratings = [rng.choice(range(30, 51)) / 10 for _ in names]
+    backend = SlowBackend(args.latency, sheets={'schedule': []})
+    publisher = SheetPublisher(backend, 'schedule')
+    n_cells, seconds = 0, 0.0
+    for idx in range(args.publishes):
+        # the same roster solves to the same schedule, a rating change moves a few games
+        if idx % 2:
+            ratings[rng.randrange(len(ratings))] += .1
+        values = table(ratings, names, args.n_games, args.seed)
+        start = time.perf_counter()
+        n_cells += publisher.publish(values)['cells']
+        seconds += time.perf_counter() - start
+    full = (args.players // 4 + 1) * (args.n_games + 1)
+    print(f'publishes={args.publishes} calls={len(backend.calls)} '
+          f'(was {OLD_CALLS_PER_PUBLISH * args.publishes}) cells={n_cells} '
+          f'(was {full * args.publishes}) seconds={seconds:.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+benchmarks/suite.py
+per-phase timings and peak memory of the scheduling pipeline
+
+Rosters come from fixed seeds so runs can be compared across commits.
+Each case times the phases of pyscheduler (game combos, game scores,
+model build, CBC solve, extraction) and PyScheduler2 (game array,
+game combos, game scores, local search). Phases are timed without
+tracing, then run again under tracemalloc for peak memory.
+
+Usage, from the repository root:
+    python -m benchmarks.suite --out bench.json
+    python -m benchmarks.suite --players 8 16 --n-games 3 --out new.json --compare bench.json
+
+"""
+import argparse
+import gc
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pulp
+
+from pyscheduler import pyscheduler
+from pyscheduler.pyscheduler2 import PyScheduler2
+from pyscheduler.schedule import Schedule
+from pyscheduler.search import anneal
+
+
+def roster(n_players, seed):
+    """Fixed roster for a player count"""
+    rng = np.random.default_rng(seed + n_players)
+    ratings = rng.choice(np.arange(30, 51) / 10, n_players).tolist()
+    return {f'P{idx:02d}': rating for idx, rating in enumerate(ratings)}
+
+
+def measure(fn, repeat, memory):
+    """Best time of repeat calls, then peak traced memory of one more call
+
+    Returns:
+        tuple: result of the last call, seconds, peak bytes or None
+
+    """
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    peak = None
+    if memory:
+        del result
+        gc.collect()
+        tracemalloc.start()
+        result = fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, best, peak
+
+
+def run_pyscheduler(s, n_games, thresh, args):
+    """Phases of the pyscheduler rounds model, diff method only"""
+    phases = {}
+
+    def record(name, fn, memory=True):
+        result, seconds, peak = measure(fn, args.repeat, memory and args.memory)
+        phases[name] = {'seconds': seconds, 'peak_bytes': peak}
+        return result
+
+    if thresh is None:
+        team_combos = list(itertools.combinations(s, 2))
+        game_combos = record('game_combos', lambda: pyscheduler._game_combos(team_combos, n_games))
+        game_scores = record('game_scores', lambda: pyscheduler._game_scores(game_combos, s))
+    else:
+        # scores come out of the threshold enumeration
+        game_combos, game_scores = record(
+            'game_combos', lambda: pyscheduler._game_combos_within(s, n_games, thresh))
+    extra = {'n_vars': len(game_combos)}
+    if len(game_combos) > args.max_vars:
+        return phases, dict(extra, skipped='max_vars')
+
+    prob, gcvars = record('build', lambda: pyscheduler._build_problem(game_combos, game_scores,
+                                                                      list(s), n_games))
+    if len(s) > args.max_solve_players:
+        return phases, dict(extra, skipped='max_solve_players')
+    solver = pulp.getSolver('PULP_CBC_CMD', msg=False, timeLimit=args.time_limit, gapAbs=2)
+    start = time.perf_counter()
+    prob.solve(solver)
+    phases['solve'] = {'seconds': time.perf_counter() - start, 'peak_bytes': None}
+    extra['status'] = pulp.LpStatus[prob.status]
+    extra['objective'] = pulp.value(prob.objective)
+    record('extract', lambda: Schedule.from_gcvars(gcvars, list(s), s))
+    return phases, extra
+
+
+def run_pyscheduler2(s, n_games, method, thresh, args):
+    """Phases of PyScheduler2"""
+    phases = {}
+
+    def record(name, fn):
+        result, seconds, peak = measure(fn, args.repeat, args.memory)
+        phases[name] = {'seconds': seconds, 'peak_bytes': peak}
+        return result
+
+    # each phase gets a fresh object so nothing is cached between repeats
+    record('game_array', lambda: PyScheduler2(n_games, s, method, thresh).game_array)
+    o = PyScheduler2(n_games, s, method, thresh)
+    o.game_array
+    record('game_combos', lambda: (setattr(o, '_game_combos', None), o.game_combos)[1])
+    record('game_scores', lambda: (setattr(o, '_game_scores', None), o.game_scores.scores)[1])
+    extra = {'n_vars': len(o.game_array) * n_games}
+    if len(s) % 4 == 0:
+        record('anneal', lambda: anneal(list(s.values()), n_games, method,
+                                        iterations=args.iterations, seed=args.seed))
+    return phases, extra
+
+
+def git_commit():
+    """Current commit, None outside a git checkout"""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """Prints phases slower than baseline by more than tolerance
+
+    Returns:
+        int: number of regressions
+
+    """
+    def key(rec):
+        return (rec['target'], rec['players'], rec['n_games'], rec['method'], rec['thresh'])
+
+    old = {key(rec): rec for rec in baseline['results']}
+    n = 0
+    for rec in results:
+        prev = old.get(key(rec))
+        if not prev:
+            continue
+        for phase, v in rec['phases'].items():
+            before = prev['phases'].get(phase, {}).get('seconds')
+            # ignore phases too fast to time reliably
+            if not before or before < 1e-3 or phase == 'solve':
+                continue
+            ratio = v['seconds'] / before
+            if ratio > tolerance:
+                n += 1
+                print(f'REGRESSION {key(rec)} {phase}: {before:.4f}s -> {v["seconds"]:.4f}s ({ratio:.2f}x)')
+    return n
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--players', type=int, nargs='+', default=[8, 12, 16, 24, 32, 40])
+    parser.add_argument('--n-games', type=int, nargs='+', default=[3, 5, 10])
+    parser.add_argument('--methods', nargs='+', default=['diff', 'gap'])
+    parser.add_argument('--thresh', type=float, nargs='*', default=[.25, .5],
+                        help='thresholds to run in addition to no threshold')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-memory', dest='memory', action='store_false')
+    parser.add_argument('--max-vars', type=int, default=100000,
+                        help='skip model build above this many decision variables')
+    parser.add_argument('--max-solve-players', type=int, default=16)
+    parser.add_argument('--time-limit', type=int, default=30)
+    parser.add_argument('--iterations', type=int, default=5000)
+    parser.add_argument('--out', default='bench.json')
+    parser.add_argument('--compare', help='earlier output to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=1.25)
+    args = parser.parse_args()
+
+    results = []
+    for n_players, n_games, thresh in itertools.product(args.players, args.n_games,
+                                                        [None] + args.thresh):
+        s = roster(n_players, args.seed)
+        for target, method in [('pyscheduler', 'diff')] + [('pyscheduler2', m) for m in args.methods]:
+            if target == 'pyscheduler':
+                phases, extra = run_pyscheduler(s, n_games, thresh, args)
+            else:
+                phases, extra = run_pyscheduler2(s, n_games, method, thresh, args)
+            rec = {'target': target, 'players': n_players, 'n_games': n_games,
+                   'method': method, 'thresh': thresh, 'phases': phases, **extra}
+            results.append(rec)
+            timings = ' '.join(f'{k}={v["seconds"]:.4f}' for k, v in phases.items())
+            print(f'{target:<12} {n_players:>3} {n_games:>3} {method:<4} {thresh!s:<5} {timings}',
+                  flush=True)
+
+    out = {'commit': git_commit(), 'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+           'python': sys.version.split()[0], 'platform': platform.platform(),
+           'numpy': np.__version__, 'pulp': pulp.__version__,
+           'args': vars(args), 'results': results}
+    with open(args.out, 'w') as f:
+        json.dump(out, f, indent=1)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
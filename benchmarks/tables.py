@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+benchmarks/tables.py
+enumerating legal games against opening the precomputed tables
+
+For each roster size the tables are written once, then the best of
+--repeat runs of legal_games(team_array(n)) is compared with opening
+the memory-mapped table in a new GameTables and with a lookup on an
+already open one, which is what every later call in a process costs.
+
+Usage, from the repository root:
+    python -m benchmarks.tables --players 12 16 24 32
+
+"""
+import argparse
+import tempfile
+import time
+
+from pyscheduler.games import legal_games, team_array
+from pyscheduler.tables import GameTables
+
+
+def best(fn, repeat):
+    """Best wall time of fn over repeat runs"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--players', type=int, nargs='+', default=[12, 16, 24, 32])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as path:
+        GameTables(path, max(args.players)).precompute()
+        opened = GameTables(path)
+        print('players    games  enumerate      open    lookup')
+        for n in args.players:
+            enumerate_ = best(lambda: legal_games(team_array(n)), args.repeat)
+            open_ = best(lambda: GameTables(path).games(n), args.repeat)
+            opened.games(n)
+            lookup = best(lambda: opened.games(n), args.repeat)
+            print(f'{n:>7} {len(opened.games(n)):>8} {enumerate_:>9.5f} {open_:>9.5f} {lookup:>9.6f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+benchmarks/warm_start.py
+time to first incumbent with and without the greedy warm start
+
+Usage, from the repository root:
+    python -m benchmarks.warm_start --players 12 16 20 --n-games 5
+
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import pulp
+
+from pyscheduler import pyscheduler
+from pyscheduler.games import game_keys, legal_games, team_array
+
+
+def run(n_players, n_games, time_limit, seed):
+    """Solves one random roster with and without warm start"""
+    rng = random.Random(seed)
+    ratings = [round(rng.uniform(3.5, 5.0), 1) for _ in range(n_players)]
+    games = legal_games(team_array(n_players))
+    game_combos = game_keys(games, n_games)
+    game_scores = pyscheduler._matchup_scores(games, ratings)
+    for warm_start in (False, True):
+        fd, log_path = tempfile.mkstemp(suffix='.log')
+        os.close(fd)
+        solver = pulp.getSolver('PULP_CBC_CMD', msg=False, timeLimit=time_limit, gapAbs=2,
+                                logPath=log_path)
+        start = time.perf_counter()
+        prob, _ = pyscheduler._optimize(None, game_combos, game_scores, list(range(n_players)),
+                                        n_games, solver, warm_start=warm_start)
+        elapsed = time.perf_counter() - start
+        incumbents = pyscheduler._incumbent_times(log_path)
+        os.remove(log_path)
+        first = incumbents[0] if incumbents else (None, None)
+        print(f'{n_players:>3} {n_games:>3} {str(warm_start):>6} '
+              f'{first[0]!s:>8} {first[1]!s:>8} {pulp.value(prob.objective) or 0:>8.2f} {elapsed:>8.2f}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--players', type=int, nargs='+', default=[12, 16, 20])
+    parser.add_argument('--n-games', type=int, default=5)
+    parser.add_argument('--time-limit', type=int, default=120)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    print('players n_games warm first_s first_obj     obj   wall_s')
+    for n_players in args.players:
+        run(n_players, args.n_games, args.time_limit, args.seed)
+
+
+if __name__ == '__main__':
+    main()
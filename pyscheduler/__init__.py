@@ -1 +1,26 @@
-from .pyscheduler import *
+"""
+pyscheduler
+python library for creating league schedules
+
+The names of pyscheduler.pyscheduler are loaded on first access, so
+importing the package, or a submodule that does not solve with pulp,
+does not import pulp. __all__ keeps from pyscheduler import * working:
+the schedulers and the modules it has always provided, except pulp.
+
+"""
+import importlib
+
+__all__ = ['defaultdict', 'itertools', 'make_schedule', 'np', 'presolve', 'reschedule',
+           'rolling_schedule']
+
+
+def __getattr__(name):
+    module = importlib.import_module('.pyscheduler', __name__)
+    try:
+        return getattr(module, name)
+    except AttributeError:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}') from None
+
+
+def __dir__():
+    return sorted(set(globals()) | set(dir(importlib.import_module('.pyscheduler', __name__))))
@@ -0,0 +1,176 @@
+"""
+artifacts.py
+persisted model artifacts
+
+The rounds model only depends on the game combos, game scores,
+players and game numbers, not on the solver settings. A built model is
+written once as an MPS file next to a json map from MPS column names to
+game keys, in a directory named by a hash of those inputs. Later solves
+run CBC straight on the MPS file, so changing the time limit or gap
+does not rebuild the model in pulp.
+
+"""
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+import subprocess
+import tempfile
+from typing import Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+import pulp
+
+from .games import Game
+from .pyscheduler import _build_problem, _matchup
+
+# bump when _build_problem changes so older artifacts are not reused
+MODEL_VERSION = 2
+
+
+def model_key(game_combos: Sequence, game_scores: Dict, p: Sequence, n_games: int) -> str:
+    """Hashes the structural inputs of the rounds model
+
+    Args:
+        game_combos (list[Union[tuple, Game]]): the game combos
+        game_scores (dict[tuple, float]): the game scores
+        p (list): player names or ids
+        n_games (int): number of games
+
+    Returns:
+        str: hex digest
+
+    """
+    h = hashlib.sha256(f'rounds-{MODEL_VERSION}-{n_games}-{list(p)!r}'.encode())
+    if game_combos and isinstance(game_combos[0], Game):
+        h.update(np.array(game_combos, dtype=np.int64).tobytes())
+    else:
+        h.update(repr(list(game_combos)).encode())
+    h.update(np.array([game_scores[_matchup(gc)] for gc in game_combos], dtype=float).tobytes())
+    return h.hexdigest()
+
+
+def _dump_key(gc):
+    return int(gc) if isinstance(gc, Game) else [list(gc[0]), list(gc[1]), gc[2]]
+
+
+def _load_key(value):
+    return Game.from_int(value) if isinstance(value, int) else (tuple(value[0]), tuple(value[1]), value[2])
+
+
+class ModelArtifact:
+    """Built rounds model stored as an MPS file and its column map"""
+
+    def __init__(self, path: Union[str, Path]):
+        """Creates new instance
+
+        Args:
+            path (Union[str, Path]): the artifact directory
+
+        Returns:
+            ModelArtifact
+
+        """
+        self.path = Path(path)
+        self._columns = None
+
+    @property
+    def mps(self) -> Path:
+        return self.path / 'model.mps'
+
+    @property
+    def exists(self) -> bool:
+        return self.mps.exists() and (self.path / 'columns.json').exists()
+
+    @property
+    def columns(self) -> Dict[str, Union[tuple, Game]]:
+        """Maps MPS column name to game key"""
+        if self._columns is None:
+            with (self.path / 'columns.json').open() as f:
+                self._columns = {name: _load_key(key) for name, key in json.load(f)}
+        return self._columns
+
+    @classmethod
+    def build(cls, cache_dir: Union[str, Path], game_combos: Sequence, game_scores: Dict,
+              p: Sequence, n_games: int) -> Tuple['ModelArtifact', bool]:
+        """Loads the artifact for these inputs, building and writing it if needed
+
+        Args:
+            cache_dir (Union[str, Path]): directory holding one folder per model
+            game_combos (list[Union[tuple, Game]]): the game combos
+            game_scores (dict[tuple, float]): the game scores
+            p (list): player names or ids
+            n_games (int): number of games
+
+        Returns:
+            tuple: ModelArtifact, True if it was already on disk
+
+        """
+        artifact = cls(Path(cache_dir) / model_key(game_combos, game_scores, p, n_games))
+        if artifact.exists:
+            return artifact, True
+        prob, gcvars = _build_problem(game_combos, game_scores, p, n_games)
+
+        # write to a temporary folder and rename so a half-written model is never used
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(dir=cache_dir))
+        _, names, _, _ = prob.writeMPS(str(tmp / 'model.mps'), rename=1)
+        columns = [[names[v.name], _dump_key(gc)] for gc, v in gcvars.items()]
+        with (tmp / 'columns.json').open('w') as f:
+            json.dump(columns, f)
+        try:
+            os.replace(tmp, artifact.path)
+        except OSError:
+            # another process wrote the same model first
+            for fn in tmp.iterdir():
+                fn.unlink()
+            tmp.rmdir()
+        return artifact, False
+
+    def solve(self, solver: pulp.COIN_CMD, log_path: str = None) -> Tuple[int, int, float, List]:
+        """Runs CBC on the stored model
+
+        Args:
+            solver (pulp.COIN_CMD): CBC solver, its time limit and options are used
+            log_path (str, optional): file for the CBC log
+
+        Returns:
+            tuple: pulp status, pulp sol_status, objective, chosen game keys
+
+        """
+        if not isinstance(solver, pulp.COIN_CMD):
+            raise ValueError(f'Model artifacts need a CBC solver, not {type(solver).__name__}')
+        fd, sol = tempfile.mkstemp(suffix='.sol')
+        os.close(fd)
+        args = [solver.path, str(self.mps)]
+        if solver.timeLimit is not None:
+            args += ['-sec', str(solver.timeLimit)]
+        for option in solver.options + solver.getOptions():
+            args += ('-' + option).split()
+        args += ['-solve', '-solution', sol]
+        try:
+            if log_path:
+                with open(log_path, 'w') as log:
+                    subprocess.run(args, stdout=log, stderr=subprocess.STDOUT, check=False)
+            else:
+                subprocess.run(args, stdout=None if solver.msg else subprocess.DEVNULL,
+                               stderr=subprocess.STDOUT, check=False)
+            if not os.path.getsize(sol):
+                raise pulp.PulpSolverError(f'CBC did not write a solution for {self.mps}')
+            status, sol_status = solver.get_status(sol)
+            objective, chosen = None, []
+            with open(sol) as f:
+                first = f.readline()
+                if 'objective value' in first:
+                    objective = float(first.rsplit(None, 1)[-1])
+                for line in f:
+                    tokens = line.split()
+                    if tokens and tokens[0] == '**':
+                        tokens = tokens[1:]
+                    if len(tokens) >= 3 and tokens[1] in self.columns and round(float(tokens[2])) == 1:
+                        chosen.append(self.columns[tokens[1]])
+        finally:
+            os.remove(sol)
+        logging.getLogger(__name__).debug('solved %s: %s', self.path.name, pulp.LpStatus[status])
+        return status, sol_status, objective, chosen
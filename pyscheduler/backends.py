@@ -0,0 +1,272 @@
+"""
+backends.py
+solver backends for the rounds model
+
+The rounds model is described once as a ScheduleModel: binary game
+variables with their scores, rows that pick exactly one game per player
+and game_number, and pair rows capped at a count. A backend compiles it
+for its solver. PulpBackend builds a pulp problem for CBC, CpSatBackend
+builds an OR-Tools CP-SAT model, which searches with several workers.
+OR-Tools is optional, install it with the cpsat extra.
+
+"""
+from contextlib import contextmanager
+import logging
+from typing import Hashable, List, Optional, Sequence, Set, Tuple
+
+from .stats import SolveStats, phase
+
+# CP-SAT only takes integer coefficients, ratings have one decimal
+CPSAT_SCALE = 1000
+
+
+@contextmanager
+def _warm_start(solver, enabled: bool = True):
+    """Turns on the warmStart option of a pulp solver, restoring the caller's options on exit"""
+    options = solver.optionsDict
+    missing = object()
+    previous = options.get('warmStart', missing)
+    if enabled:
+        options['warmStart'] = True
+    try:
+        yield solver
+    finally:
+        if previous is missing:
+            options.pop('warmStart', None)
+        else:
+            options['warmStart'] = previous
+
+
+class ScheduleModel:
+    """Solver-independent description of the rounds model"""
+
+    def __init__(self, keys: Sequence[Hashable], costs: Sequence[float]):
+        """Creates new instance
+
+        Args:
+            keys (list): game key of each variable, e.g. Game or (team1, team2, game_number)
+            costs (list[float]): objective coefficient of each variable
+
+        Returns:
+            ScheduleModel
+
+        """
+        self.keys = list(keys)
+        self.costs = list(costs)
+        # variables that must be 0
+        self.fixed_zero: Set[int] = set()
+        # rows of variable indices that sum to exactly 1
+        self.exactly_one: List[List[int]] = []
+        # (row of variable indices, cap) that sum to at most cap
+        self.at_most: List[Tuple[List[int], int]] = []
+
+    @property
+    def n_vars(self) -> int:
+        return len(self.keys)
+
+    @property
+    def n_constraints(self) -> int:
+        return len(self.exactly_one) + len(self.at_most)
+
+    def objective(self, chosen: Sequence[Hashable]) -> float:
+        """Sum of the costs of the chosen keys"""
+        index = {k: idx for idx, k in enumerate(self.keys)}
+        return sum(self.costs[index[k]] for k in chosen)
+
+
+class PulpBackend:
+    """Compiles the model to pulp and solves it with a pulp solver, CBC by default"""
+
+    name = 'cbc'
+
+    def __init__(self, solver=None):
+        """Creates new instance
+
+        Args:
+            solver (pulp.apis.core.LpSolver, optional): default CBC with a 600 second limit
+
+        Returns:
+            PulpBackend
+
+        """
+        self.solver = solver
+
+    @staticmethod
+    def compile(model: ScheduleModel):
+        """Builds the pulp problem
+
+        Args:
+            model (ScheduleModel): the model
+
+        Returns:
+            tuple: pulp.LpProblem, dict[key, LpVariable]
+
+        """
+        import pulp
+
+        gcvars = pulp.LpVariable.dicts('gc_decvar', model.keys, cat=pulp.LpBinary)
+        vs = [gcvars[k] for k in model.keys]
+        prob = pulp.LpProblem("PBOpt", pulp.LpMinimize)
+        prob += pulp.lpSum([v * c for v, c in zip(vs, model.costs)])
+        for idx in model.fixed_zero:
+            vs[idx].upBound = 0
+        for row in model.exactly_one:
+            prob += pulp.lpSum([vs[idx] for idx in row]) == 1
+        for row, cap in model.at_most:
+            prob += pulp.lpSum([vs[idx] for idx in row]) <= cap
+        return prob, gcvars
+
+    def solve(self, model: ScheduleModel, hint: Sequence[Hashable] = None,
+              stats: Optional[SolveStats] = None) -> Tuple[str, Optional[float], List]:
+        """Solves the model
+
+        Args:
+            model (ScheduleModel): the model
+            hint (list, optional): keys of a known schedule, used as the MIP start
+            stats (SolveStats, optional): collects a 'solve' phase
+
+        Returns:
+            tuple: status ('optimal', 'feasible', 'infeasible' or 'unknown'),
+                   objective, chosen keys
+
+        """
+        import pulp
+
+        solver = self.solver or pulp.getSolver('PULP_CBC_CMD', timeLimit=600, gapAbs=2)
+        prob, gcvars = self.compile(model)
+        if hint:
+            start = set(hint)
+            for k, v in gcvars.items():
+                v.setInitialValue(1 if k in start else 0)
+        warm = _warm_start(solver, bool(hint))
+        with warm, phase(stats, 'solve', backend=self.name, n_vars=model.n_vars,
+                         n_constraints=model.n_constraints) as rec:
+            prob.solve(solver)
+            if prob.sol_status == pulp.LpSolutionOptimal:
+                status = 'optimal'
+            elif prob.sol_status == pulp.LpSolutionIntegerFeasible:
+                status = 'feasible'
+            elif prob.status == pulp.LpStatusInfeasible:
+                status = 'infeasible'
+            else:
+                status = 'unknown'
+            chosen = [k for k, v in gcvars.items() if v.varValue is not None and round(v.varValue) == 1]
+            objective = model.objective(chosen) if status in ('optimal', 'feasible') else None
+            rec.update(status=status, objective=objective)
+        return status, objective, chosen
+
+
+class CpSatBackend:
+    """Compiles the model to OR-Tools CP-SAT and solves it with several workers"""
+
+    name = 'cpsat'
+
+    def __init__(self, time_limit: float = 600, workers: int = 0, gap_abs: float = None,
+                 seed: int = None, log: bool = False):
+        """Creates new instance
+
+        Args:
+            time_limit (float, optional): seconds
+            workers (int, optional): search workers, 0 uses every core
+            gap_abs (float, optional): stop once within this absolute gap, like CBC gapAbs
+            seed (int, optional): random seed
+            log (bool, optional): print the search log
+
+        Returns:
+            CpSatBackend
+
+        """
+        self.time_limit = time_limit
+        self.workers = workers
+        self.gap_abs = gap_abs
+        self.seed = seed
+        self.log = log
+
+    @staticmethod
+    def compile(model: ScheduleModel):
+        """Builds the CP-SAT model
+
+        Args:
+            model (ScheduleModel): the model
+
+        Returns:
+            tuple: cp_model.CpModel, list of BoolVar in model.keys order
+
+        """
+        try:
+            from ortools.sat.python import cp_model
+        except ImportError as e:
+            raise ImportError('CpSatBackend needs OR-Tools: pip install pyscheduler[cpsat]') from e
+
+        cp = cp_model.CpModel()
+        xs = [cp.NewBoolVar(f'g{idx}') for idx in range(model.n_vars)]
+        for idx in model.fixed_zero:
+            cp.Add(xs[idx] == 0)
+        for row in model.exactly_one:
+            cp.AddExactlyOne([xs[idx] for idx in row])
+        for row, cap in model.at_most:
+            cp.Add(cp_model.LinearExpr.Sum([xs[idx] for idx in row]) <= cap)
+        cp.Minimize(cp_model.LinearExpr.WeightedSum(xs, [round(c * CPSAT_SCALE) for c in model.costs]))
+        return cp, xs
+
+    def solve(self, model: ScheduleModel, hint: Sequence[Hashable] = None,
+              stats: Optional[SolveStats] = None) -> Tuple[str, Optional[float], List]:
+        """Solves the model
+
+        Args:
+            model (ScheduleModel): the model
+            hint (list, optional): keys of a known schedule, used as the solution hint
+            stats (SolveStats, optional): collects a 'solve' phase
+
+        Returns:
+            tuple: status ('optimal', 'feasible', 'infeasible' or 'unknown'),
+                   objective, chosen keys
+
+        """
+        cp, xs = self.compile(model)
+        from ortools.sat.python import cp_model
+
+        if hint:
+            start = set(hint)
+            for k, x in zip(model.keys, xs):
+                cp.AddHint(x, 1 if k in start else 0)
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = float(self.time_limit)
+        solver.parameters.num_search_workers = self.workers
+        solver.parameters.log_search_progress = self.log
+        if self.gap_abs is not None:
+            solver.parameters.absolute_gap_limit = self.gap_abs * CPSAT_SCALE
+        if self.seed is not None:
+            solver.parameters.random_seed = self.seed
+        with phase(stats, 'solve', backend=self.name, n_vars=model.n_vars,
+                   n_constraints=model.n_constraints, workers=self.workers) as rec:
+            result = solver.Solve(cp)
+            status = {cp_model.OPTIMAL: 'optimal', cp_model.FEASIBLE: 'feasible',
+                      cp_model.INFEASIBLE: 'infeasible'}.get(result, 'unknown')
+            chosen, objective = [], None
+            if status in ('optimal', 'feasible'):
+                chosen = [k for k, x in zip(model.keys, xs) if solver.BooleanValue(x)]
+                objective = model.objective(chosen)
+                rec['bound'] = solver.BestObjectiveBound() / CPSAT_SCALE
+            rec.update(status=status, objective=objective)
+        logging.getLogger(__name__).debug('CP-SAT %s in %.1f seconds', status, solver.WallTime())
+        return status, objective, chosen
+
+
+BACKENDS = {'cbc': PulpBackend, 'cpsat': CpSatBackend}
+
+
+def get_backend(name: str, **kwargs):
+    """Creates a backend by name, 'cbc' or 'cpsat'
+
+    Args:
+        name (str): the backend name
+        **kwargs: passed to the backend
+
+    Returns:
+        PulpBackend or CpSatBackend
+
+    """
+    if name not in BACKENDS:
+        raise ValueError(f'Invalid solver backend: {name}')
+    return BACKENDS[name](**kwargs)
@@ -0,0 +1,225 @@
+"""
+batch.py
+many leagues in one run
+
+Each job is a roster, its ratings, the number of games and optional
+solver settings. Jobs run in their own processes, a few at a time, and
+a job still running past its time budget is killed, so one slow or
+failing league does not hold up the others. Results are yielded as
+jobs finish and the command line writes them as json lines.
+
+Usage:
+    pyscheduler-batch leagues.json --out schedules.jsonl
+    pyscheduler-batch divisions.csv --n-games 5 --solver anneal --time-limit 30
+
+"""
+import argparse
+import csv
+import json
+import logging
+import multiprocessing as mp
+import os
+from pathlib import Path
+import queue
+import sys
+import time
+from typing import Dict, Iterable, Iterator, List
+
+from .jobs import _kill
+from .portfolio import _objective, portfolio_schedule
+from .pods import pod_schedule
+from .pyscheduler import make_schedule
+from .schedule import Schedule
+from .search import anneal
+
+SOLVERS = ('cbc', 'anneal', 'pods', 'portfolio')
+
+
+def load_jobs(path: str, n_games: int = None, settings: Dict = None) -> List[Dict]:
+    """Reads jobs from a json, json lines or csv file
+
+    A json file holds a list of jobs or {'jobs': [...]}, a json lines file
+    one job per line. A job is {'id': str, 'players': {name: rating},
+    'n_games': int, 'settings': dict}. A csv file has league, player and
+    rating columns and an optional n_games column, one job per league.
+
+    Args:
+        path (str): the file, '-' reads json lines from stdin
+        n_games (int, optional): n_games of jobs that do not give one
+        settings (dict, optional): settings of jobs that do not give them
+
+    Returns:
+        list[dict]
+
+    """
+    if path == '-':
+        jobs = [json.loads(line) for line in sys.stdin if line.strip()]
+    elif Path(path).suffix.lower() == '.csv':
+        by_league = {}
+        with open(path, newline='') as f:
+            for row in csv.DictReader(f):
+                job = by_league.setdefault(row['league'], {'id': row['league'], 'players': {}})
+                job['players'][row['player']] = float(row['rating'])
+                if row.get('n_games'):
+                    job['n_games'] = int(row['n_games'])
+        jobs = list(by_league.values())
+    elif Path(path).suffix.lower() in ('.jsonl', '.ndjson'):
+        with open(path) as f:
+            jobs = [json.loads(line) for line in f if line.strip()]
+    else:
+        with open(path) as f:
+            data = json.load(f)
+        jobs = data['jobs'] if isinstance(data, dict) else data
+    for idx, job in enumerate(jobs):
+        job.setdefault('id', f'{Path(path).stem}-{idx}')
+        if n_games is not None:
+            job.setdefault('n_games', n_games)
+        job['settings'] = {**(settings or {}), **(job.get('settings') or {})}
+    return jobs
+
+
+def _run_job(job: Dict, time_limit: float) -> Dict:
+    """Schedules one job
+
+    Args:
+        job (dict): the job, see load_jobs
+        time_limit (float): solver seconds unless the job settings give time_limit
+
+    Returns:
+        dict: status, objective and games
+
+    """
+    import pulp
+    players = {str(k): float(v) for k, v in job['players'].items()}
+    n_games = int(job['n_games'])
+    settings = dict(job.get('settings') or {})
+    kind = settings.pop('solver', 'cbc')
+    time_limit = settings.pop('time_limit', time_limit)
+    if kind == 'cbc':
+        solver = pulp.getSolver('PULP_CBC_CMD', msg=False, timeLimit=max(int(time_limit), 1),
+                                gapAbs=settings.pop('gap_abs', 2))
+        sched = make_schedule(players, n_games, solver, **settings)
+    elif kind == 'anneal':
+        names = list(players)
+        games, rounds, _, violations = anneal([players[name] for name in names], n_games,
+                                              time_limit=time_limit, **settings)
+        sched = None if violations else Schedule(names, games, rounds, players)
+    elif kind == 'pods':
+        sched = pod_schedule(players, n_games, time_limit=time_limit, **settings)
+    elif kind == 'portfolio':
+        sched, _ = portfolio_schedule(players, n_games, time_limit=time_limit, **settings)
+    else:
+        raise ValueError(f'Invalid batch solver: {kind}')
+    if sched is None or len(sched) != n_games * len(players) // 4:
+        return {'status': 'infeasible', 'objective': None, 'games': None}
+    return {'status': 'ok', 'objective': _objective(sched),
+            'games': [[list(t1), list(t2), game_number] for t1, t2, game_number in sched]}
+
+
+def _worker(job, time_limit, results):
+    """Process entry point, puts the job result on results"""
+    # own process group so a timed out job is killed with its solvers
+    if hasattr(os, 'setpgrp'):
+        os.setpgrp()
+    start = time.monotonic()
+    try:
+        rec = _run_job(job, time_limit)
+    except Exception as e:
+        rec = {'status': f'error: {e!r}', 'objective': None, 'games': None}
+    results.put({'id': job['id'], **rec, 'seconds': time.monotonic() - start})
+
+
+def batch_schedule(jobs: Iterable[Dict], processes: int = None, time_limit: float = 60,
+                   grace: float = 10) -> Iterator[Dict]:
+    """Schedules many leagues, yielding each result as its job finishes
+
+    Args:
+        jobs (list[dict]): jobs, see load_jobs
+        processes (int, optional): jobs run at the same time, default cpu count
+        time_limit (float, optional): solver seconds of jobs whose settings do not give time_limit
+        grace (float, optional): seconds past its time limit before a job is killed
+
+    Yields:
+        dict: id, status ('ok', 'infeasible', 'timeout' or 'error: ...'),
+              objective, games as [team1, team2, game_number] and seconds
+
+    """
+    logger = logging.getLogger(__name__)
+    pending = list(jobs)
+    ids = [job['id'] for job in pending]
+    if len(set(ids)) != len(ids):
+        raise ValueError(f'Batch job ids must be unique: {ids}')
+    processes = processes or os.cpu_count() or 1
+
+    results = mp.Queue()
+    running = {}
+    try:
+        while pending or running:
+            while pending and len(running) < processes:
+                job = pending.pop(0)
+                budget = (job.get('settings') or {}).get('time_limit', time_limit) + grace
+                # not daemonic, pods and portfolio jobs start processes of their own
+                proc = mp.Process(target=_worker, args=(job, time_limit, results))
+                proc.start()
+                running[job['id']] = (proc, time.monotonic(), time.monotonic() + budget)
+            try:
+                rec = results.get(timeout=.5)
+            except queue.Empty:
+                now = time.monotonic()
+                for job_id, (proc, start, deadline) in list(running.items()):
+                    if now > deadline:
+                        _kill(proc)
+                        status = 'timeout'
+                    elif not proc.is_alive() and proc.exitcode:
+                        status = f'error: exit code {proc.exitcode}'
+                    else:
+                        continue
+                    del running[job_id]
+                    logger.warning('batch job %s: %s', job_id, status)
+                    yield {'id': job_id, 'status': status, 'objective': None, 'games': None,
+                           'seconds': now - start}
+                continue
+            entry = running.pop(rec['id'], None)
+            if entry is None:
+                # reported just after it was killed
+                continue
+            entry[0].join()
+            yield rec
+    finally:
+        for proc, _, _ in running.values():
+            _kill(proc)
+        results.close()
+
+
+def main(argv: List[str] = None) -> None:
+    """Command line entry point, writes one json line per job"""
+    parser = argparse.ArgumentParser(prog='pyscheduler-batch', description=__doc__.split('\n')[2])
+    parser.add_argument('inputs', nargs='+', help='json, json lines or csv files, - for stdin')
+    parser.add_argument('--out', help='json lines output, default stdout')
+    parser.add_argument('--n-games', type=int, help='n_games of jobs that do not give one')
+    parser.add_argument('--solver', choices=SOLVERS, help='solver of jobs that do not give one')
+    parser.add_argument('--processes', type=int)
+    parser.add_argument('--time-limit', type=float, default=60)
+    parser.add_argument('--grace', type=float, default=10)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s %(name)s: %(message)s')
+
+    settings = {'solver': args.solver} if args.solver else None
+    jobs = [job for path in args.inputs for job in load_jobs(path, args.n_games, settings)]
+    out = open(args.out, 'w') if args.out else sys.stdout
+    n_failed = 0
+    try:
+        for rec in batch_schedule(jobs, args.processes, args.time_limit, args.grace):
+            n_failed += rec['status'] != 'ok'
+            out.write(json.dumps(rec) + '\n')
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    if n_failed:
+        logging.getLogger(__name__).warning('%s of %s jobs failed', n_failed, len(jobs))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""
+cache.py
+content-addressed schedule cache
+
+Schedules are keyed by a hash of everything that goes into the model,
+so the same roster and settings return the stored schedule instead of solving again.
+Entries are held in an in-memory LRU and, when a directory is given,
+as json files on disk that are evicted oldest first once over max_bytes.
+
+"""
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+import tempfile
+from typing import Dict, List, Optional, Union
+
+
+def schedule_key(players: Dict[str, float], n_games: int, **params) -> str:
+    """Hashes the inputs of a schedule
+
+    Args:
+        players (dict[str, float]): dict of player and score
+        n_games (int): number of games
+        **params: other settings that change the schedule, e.g. thresh, method, caps
+
+    Returns:
+        str: hex digest
+
+    """
+    data = {'players': sorted([str(k), float(v)] for k, v in players.items()),
+            'n_games': int(n_games),
+            'params': {k: params[k] for k in sorted(params)}}
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class ScheduleCache:
+    """Two-level cache of solved game combos
+
+    Values are lists of (team1, team2, game_number) tuples.
+
+    """
+
+    def __init__(self, path: Union[str, Path, None] = None, maxsize: int = 128,
+                 max_bytes: int = 50 * 1024 * 1024):
+        """Creates new instance
+
+        Args:
+            path (Union[str, Path], optional): directory for the disk layer, memory only if None
+            maxsize (int, optional): max entries held in memory
+            max_bytes (int, optional): max total size of the disk layer
+
+        Returns:
+            ScheduleCache
+
+        """
+        logging.getLogger(__name__).addHandler(logging.NullHandler())
+        self.path = Path(path) if path else None
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()
+        if self.path:
+            self.path.mkdir(parents=True, exist_ok=True)
+
+    def _file(self, key: str) -> Path:
+        return self.path / f'{key}.json'
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._memory or bool(self.path and self._file(key).exists())
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    def get(self, key: str) -> Optional[List[tuple]]:
+        """Gets stored game combos
+
+        Args:
+            key (str): the schedule key
+
+        Returns:
+            list[tuple]: the game combos, None if not cached
+
+        """
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return self._memory[key]
+        if not self.path:
+            return None
+        fn = self._file(key)
+        try:
+            with fn.open() as f:
+                combos = [(tuple(t1), tuple(t2), gn) for t1, t2, gn in json.load(f)]
+            # refresh mtime so eviction drops the least recently used files
+            os.utime(fn)
+        except (OSError, ValueError):
+            return None
+        self._remember(key, combos)
+        return combos
+
+    def put(self, key: str, combos: List[tuple]) -> None:
+        """Stores game combos
+
+        Args:
+            key (str): the schedule key
+            combos (list[tuple]): (team1, team2, game_number) tuples
+
+        Returns:
+            None
+
+        """
+        combos = [(tuple(t1), tuple(t2), int(gn)) for t1, t2, gn in combos]
+        self._remember(key, combos)
+        if not self.path:
+            return
+        # write then rename so readers never see a partial file
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(combos, f)
+            os.replace(tmp, self._file(key))
+        except OSError:
+            logging.getLogger(__name__).exception('Could not write schedule %s', key)
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        self._evict()
+
+    def _remember(self, key, combos):
+        """Adds to the memory layer, dropping the least recently used entry when full"""
+        self._memory[key] = combos
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def _evict(self):
+        """Removes the oldest files until the disk layer is under max_bytes"""
+        files = []
+        for fn in self.path.glob('*.json'):
+            try:
+                st = fn.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, fn))
+        total = sum(size for _, size, _ in files)
+        for _, size, fn in sorted(files, key=lambda x: x[0]):
+            if total <= self.max_bytes:
+                break
+            try:
+                fn.unlink()
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self) -> None:
+        """Removes every entry from both layers"""
+        self._memory.clear()
+        if self.path:
+            for fn in self.path.glob('*.json'):
+                fn.unlink(missing_ok=True)
@@ -0,0 +1,341 @@
+"""
+games.py
+integer-encoded game enumeration
+
+Players are mapped to integer ids and games are held as an
+(n_games x 4) int array, columns 0-1 are team1 and columns 2-3 are team2.
+Names are only attached again at the API boundary.
+A Game packs the four player ids and the game_number into one int,
+so it hashes like an int but still indexes like the
+(team1, team2, game_number) tuples used elsewhere.
+
+"""
+from collections.abc import Mapping
+import itertools
+from typing import Iterable, Iterator, List, Sequence, Tuple, Union
+
+import numpy as np
+
+
+ID_DTYPE = np.int32
+TOL = 1e-9
+ID_BITS = 12
+ID_MASK = (1 << ID_BITS) - 1
+MATCHUP_MASK = (1 << (4 * ID_BITS)) - 1
+
+
+def team_array(n_players: int) -> np.ndarray:
+    """Creates integer-encoded team combinations
+
+    Args:
+        n_players (int): number of players
+
+    Returns:
+        np.ndarray: (n_teams x 2) array of player ids
+
+    """
+    return np.transpose(np.triu_indices(n_players, 1)).astype(ID_DTYPE)
+
+
+def legal_games(teams: np.ndarray) -> np.ndarray:
+    """Creates integer-encoded legal games from team combinations
+
+    Args:
+        teams (np.ndarray): (n_teams x 2) array of player ids
+
+    Returns:
+        np.ndarray: (n_games x 4) array of player ids
+
+    """
+    # every pair of teams, in the same order as itertools.combinations
+    # then drop pairs of teams that share a player
+    teams = np.asarray(teams, dtype=ID_DTYPE).reshape(-1, 2)
+    gcidx = np.transpose(np.triu_indices(len(teams), 1))
+    games = teams[gcidx].reshape(len(gcidx), 4)
+    legal = ((games[:, 0] != games[:, 2]) & (games[:, 0] != games[:, 3]) &
+             (games[:, 1] != games[:, 2]) & (games[:, 1] != games[:, 3]))
+    return games[legal]
+
+
+def canonical_games(games: np.ndarray) -> np.ndarray:
+    """Orders players within teams and teams within games like legal_games
+
+    Args:
+        games (np.ndarray): (n_games x 4) array of player ids
+
+    Returns:
+        np.ndarray: (n_games x 4) array of player ids
+
+    """
+    games = np.asarray(games, dtype=ID_DTYPE).reshape(-1, 4)
+    t1, t2 = np.sort(games[:, :2], axis=1), np.sort(games[:, 2:], axis=1)
+    swap = (t1[:, 0] > t2[:, 0]) | ((t1[:, 0] == t2[:, 0]) & (t1[:, 1] > t2[:, 1]))
+    return np.where(swap[:, None], np.hstack((t2, t1)), np.hstack((t1, t2)))
+
+
+def games_within(ratings: Sequence[float], thresh: float, method: str = 'diff') -> Iterator[np.ndarray]:
+    """Yields legal games with game score <= thresh, one block at a time
+
+    Games that are over the threshold are never built. For 'diff', teams
+    are sorted by rating sum and each team is only paired with the teams
+    whose sum is within thresh. For 'gap', players are sorted by rating and
+    each player is only grouped with the players rated up to thresh above them.
+
+    Args:
+        ratings (list[float]): player ratings in player id order
+        thresh (float): max game score
+        method (str, optional): 'diff' or 'gap', see PyScheduler2
+
+    Yields:
+        np.ndarray: (k x 4) array of player ids
+
+    """
+    r = np.asarray(ratings, dtype=float)
+    if method == 'diff':
+        teams = team_array(len(r))
+        sums = r[teams[:, 0]] + r[teams[:, 1]]
+        order = np.argsort(sums, kind='stable')
+        teams, sums = teams[order], sums[order]
+        his = np.searchsorted(sums, sums + thresh + TOL, side='right')
+        for i in range(len(teams)):
+            j = np.arange(i + 1, his[i])
+            if not len(j):
+                continue
+            games = np.hstack((np.repeat(teams[i:i + 1], len(j), axis=0), teams[j]))
+            keep = ((np.abs(sums[i] - sums[j]) <= thresh) &
+                    (games[:, 0] != games[:, 2]) & (games[:, 0] != games[:, 3]) &
+                    (games[:, 1] != games[:, 2]) & (games[:, 1] != games[:, 3]))
+            if keep.any():
+                yield canonical_games(games[keep])
+    elif method == 'gap':
+        order = np.argsort(r, kind='stable')
+        rs = r[order]
+        his = np.searchsorted(rs, rs + thresh + TOL, side='right')
+        for a in range(len(r)):
+            if his[a] - a < 4:
+                continue
+            trips = np.array(list(itertools.combinations(range(a + 1, his[a]), 3)))
+            trips = trips[rs[trips[:, 2]] - rs[a] <= thresh]
+            if not len(trips):
+                continue
+            w = np.full(len(trips), order[a])
+            x, y, z = order[trips[:, 0]], order[trips[:, 1]], order[trips[:, 2]]
+            yield canonical_games(np.vstack((np.column_stack((w, x, y, z)),
+                                             np.column_stack((w, y, x, z)),
+                                             np.column_stack((w, z, x, y)))))
+    else:
+        raise ValueError(f'Invalid game_scores method: {method}')
+
+
+def encode_teams(team_combos: Iterable[tuple], names: List = None) -> Tuple[list, np.ndarray]:
+    """Maps team combinations of player names to player ids
+
+    Args:
+        team_combos (list[tuple]): the team combinations
+        names (list, optional): player names in id order, extended with unseen players
+
+    Returns:
+        tuple: list of player names, (n_teams x 2) array of player ids
+
+    """
+    names = list(names) if names else []
+    ids = {name: idx for idx, name in enumerate(names)}
+    teams = []
+    for team in team_combos:
+        for player in team:
+            if player not in ids:
+                ids[player] = len(names)
+                names.append(player)
+        teams.append([ids[player] for player in team])
+    return names, np.array(teams, dtype=ID_DTYPE).reshape(-1, 2)
+
+
+def decode_games(games: np.ndarray, names: List) -> List[tuple]:
+    """Maps integer-encoded games back to player names
+
+    Args:
+        games (np.ndarray): (n_games x 4) array of player ids
+        names (list): player names in id order
+
+    Returns:
+        list[tuple]: each item is a 2-tuple of tuple(team1), tuple(team2)
+
+    """
+    named = np.array(names, dtype=object)[games].tolist()
+    return [((p1, p2), (p3, p4)) for p1, p2, p3, p4 in named]
+
+
+class Game(int):
+    """Game packed into a single int
+
+    Bits 0-47 hold player ids p1, p2 (team1) and p3, p4 (team2),
+    the bits above hold the game_number.
+
+    """
+    __slots__ = ()
+
+    def __new__(cls, p1: int, p2: int, p3: int, p4: int, game_number: int = 0):
+        value = 0
+        for idx, v in enumerate((p1, p2, p3, p4, game_number)):
+            if not 0 <= v <= ID_MASK:
+                raise ValueError(f'Player ids and game numbers must be between 0 and {ID_MASK}')
+            value |= int(v) << (ID_BITS * idx)
+        return int.__new__(cls, value)
+
+    def __getnewargs__(self):
+        return self.players + (self.game_number,)
+
+    @classmethod
+    def from_int(cls, value: int) -> 'Game':
+        """Wraps an already packed int"""
+        return int.__new__(cls, value)
+
+    @property
+    def players(self) -> tuple:
+        return (self & ID_MASK, (self >> ID_BITS) & ID_MASK,
+                (self >> (2 * ID_BITS)) & ID_MASK, (self >> (3 * ID_BITS)) & ID_MASK)
+
+    @property
+    def team1(self) -> tuple:
+        return self.players[:2]
+
+    @property
+    def team2(self) -> tuple:
+        return self.players[2:]
+
+    @property
+    def game_number(self) -> int:
+        return int(self >> (4 * ID_BITS))
+
+    @property
+    def matchup(self) -> 'Game':
+        """Same game without the game_number"""
+        return Game.from_int(self & MATCHUP_MASK)
+
+    def __getitem__(self, idx):
+        return tuple(self)[idx]
+
+    def __iter__(self):
+        p1, p2, p3, p4 = self.players
+        return iter(((p1, p2), (p3, p4), self >> (4 * ID_BITS)))
+
+    def __repr__(self):
+        return 'Game({}, {}, {}, {}, {})'.format(*self.players, self.game_number)
+
+    __str__ = int.__repr__
+
+
+def pack_games(games: np.ndarray, rounds: Union[int, np.ndarray] = 0) -> np.ndarray:
+    """Packs integer-encoded games into one int per game
+
+    Args:
+        games (np.ndarray): (n_games x 4) array of player ids
+        rounds (Union[int, np.ndarray]): game_number of each game
+
+    Returns:
+        np.ndarray: int64 array
+
+    """
+    games = np.asarray(games, dtype=np.int64).reshape(-1, 4)
+    if (games > ID_MASK).any() or (np.asarray(rounds) > ID_MASK).any():
+        raise ValueError(f'Player ids and game numbers must be <= {ID_MASK}')
+    shifts = np.arange(4, dtype=np.int64) * ID_BITS
+    return (games << shifts).sum(axis=1) | (np.asarray(rounds, dtype=np.int64) << (4 * ID_BITS))
+
+
+def unpack_games(packed: np.ndarray) -> tuple:
+    """Unpacks games packed by pack_games
+
+    Args:
+        packed (np.ndarray): int64 array
+
+    Returns:
+        tuple: (n_games x 4) array of player ids, array of game numbers
+
+    """
+    packed = np.asarray(packed, dtype=np.int64)
+    shifts = np.arange(4, dtype=np.int64) * ID_BITS
+    games = (packed[:, None] >> shifts) & ID_MASK
+    return games.astype(ID_DTYPE), (packed >> (4 * ID_BITS)).astype(ID_DTYPE)
+
+
+def game_keys(games: np.ndarray, n_games: int) -> List[Game]:
+    """Creates a Game for every legal game in every game_number
+
+    Args:
+        games (np.ndarray): (n_games x 4) array of player ids
+        n_games (int): number of games to schedule
+
+    Returns:
+        list[Game]
+
+    """
+    matchups = pack_games(games)
+    return [Game.from_int(v) for game_number in range(1, n_games + 1)
+            for v in (matchups | (game_number << (4 * ID_BITS))).tolist()]
+
+
+class GameScores(Mapping):
+    """Read-only view of game scores for every game_number
+
+    Scores are stored once per legal game, keys are
+    (team1, team2, game_number) like the game combos, or Game.
+
+    """
+    __slots__ = ('scores', 'games', 'names', 'rounds', '_index', '_packed')
+
+    def __init__(self, scores: np.ndarray, games: np.ndarray, names: List, rounds: range):
+        """Creates new instance
+
+        Args:
+            scores (np.ndarray): score of each legal game
+            games (np.ndarray): (n_games x 4) array of player ids
+            names (list): player names in id order
+            rounds (range): the game numbers
+
+        Returns:
+            GameScores
+
+        """
+        self.scores = scores
+        self.games = games
+        self.names = names
+        self.rounds = rounds
+        self._index = None
+        self._packed = None
+
+    @property
+    def index(self) -> dict:
+        """Maps (team1, team2) to row of the score array"""
+        if self._index is None:
+            self._index = {gc: idx for idx, gc in enumerate(decode_games(self.games, self.names))}
+        return self._index
+
+    @property
+    def packed(self) -> dict:
+        """Maps packed matchup to row of the score array"""
+        if self._packed is None:
+            self._packed = {v: idx for idx, v in enumerate(pack_games(self.games).tolist())}
+        return self._packed
+
+    def __getitem__(self, key: Union[tuple, Game]) -> float:
+        if isinstance(key, Game):
+            if key.game_number in self.rounds and key.matchup in self.packed:
+                return float(self.scores[self.packed[key.matchup]])
+            raise KeyError(key)
+        try:
+            t1, t2, game_number = key
+            if game_number in self.rounds:
+                return float(self.scores[self.index[(t1, t2)]])
+        except (KeyError, TypeError, ValueError):
+            pass
+        raise KeyError(key)
+
+    def __iter__(self):
+        games = list(self.index)
+        for game_number in self.rounds:
+            for t1, t2 in games:
+                yield (t1, t2, game_number)
+
+    def __len__(self) -> int:
+        return len(self.index) * len(self.rounds)
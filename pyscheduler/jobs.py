@@ -0,0 +1,293 @@
+"""
+jobs.py
+background schedule jobs
+
+Jobs run in a thread pool so a web request can return a job id
+right away and poll for progress. Each job belongs to a group,
+e.g. one league sheet, and a newer job cancels the older unfinished
+jobs of its group so a stale roster never overwrites a newer one.
+Long solves go through Job.run_process, which runs them in a child
+process with its own process group, so cancelling the job kills the
+solve and any CBC it started instead of waiting out its time limit.
+
+"""
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import multiprocessing as mp
+import os
+import queue
+import signal
+import threading
+import time
+import uuid
+from typing import Any, Callable, Optional
+
+from .stats import cbc_log_stats
+
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+
+class JobCancelled(Exception):
+    """Raised inside a job that was cancelled or superseded"""
+
+
+def _signal(proc) -> None:
+    """Kills a process started by _call and any solver it started, without waiting"""
+    if proc.is_alive():
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except (AttributeError, OSError):
+            proc.kill()
+
+
+def _kill(proc) -> None:
+    """Stops a process and any solver it started"""
+    _signal(proc)
+    proc.join()
+
+
+def _call(fn, args, results):
+    """Process entry point, puts (True, result) or (False, error) on results"""
+    # own process group so the CBC child is killed with this process
+    if hasattr(os, 'setpgrp'):
+        os.setpgrp()
+    try:
+        results.put((True, fn(*args)))
+    except Exception as e:
+        results.put((False, repr(e)))
+
+
+class Job:
+    """State of one background job
+
+    The job function receives the Job and calls update() between steps,
+    which raises JobCancelled once the job is cancelled. Set log_path
+    to a CBC log and the best objective found so far is read from it,
+    set stats to a SolveStats and its phases are included in the status.
+
+    """
+
+    def __init__(self, group: Optional[str] = None):
+        """Creates new instance
+
+        Args:
+            group (str, optional): jobs in the same group supersede each other
+
+        Returns:
+            Job
+
+        """
+        self.id = uuid.uuid4().hex
+        self.group = group
+        self.status = QUEUED
+        self.progress = None
+        self.objective = None
+        self.log_path = None
+        self.stats = None
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self._cancel = threading.Event()
+        self._process = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self) -> None:
+        """Asks the job to stop at its next update and kills its running process"""
+        self._cancel.set()
+        if self.status == QUEUED:
+            self.status = CANCELLED
+            self.finished = time.time()
+        proc = self._process
+        if proc is not None:
+            _signal(proc)
+
+    def run_process(self, fn: Callable, *args, poll: float = .2) -> Any:
+        """Runs fn(*args) in a child process that cancel() kills
+
+        Args:
+            fn (Callable): a module-level function, its arguments and result must pickle
+            *args: passed to fn
+            poll (float, optional): seconds between cancellation checks
+
+        Returns:
+            the result of fn
+
+        Raises:
+            JobCancelled: the job was cancelled before or while fn ran
+            RuntimeError: fn raised or its process died
+
+        """
+        self.update()
+        results = mp.Queue()
+        proc = mp.Process(target=_call, args=(fn, args, results), daemon=True)
+        proc.start()
+        self._process = proc
+        try:
+            while True:
+                if self.cancelled:
+                    raise JobCancelled(self.id)
+                try:
+                    ok, value = results.get(timeout=poll)
+                    break
+                except queue.Empty:
+                    if proc.is_alive():
+                        continue
+                # the result may have been queued just before the process exited
+                try:
+                    ok, value = results.get(timeout=poll)
+                    break
+                except queue.Empty:
+                    if self.cancelled:
+                        raise JobCancelled(self.id)
+                    raise RuntimeError(f'job process exited with code {proc.exitcode}')
+        finally:
+            self._process = None
+            _kill(proc)
+            results.close()
+        if not ok:
+            raise RuntimeError(value)
+        return value
+
+    def update(self, progress: str = None, objective: float = None) -> None:
+        """Records progress, raises JobCancelled if the job was cancelled
+
+        Args:
+            progress (str, optional): the current step
+            objective (float, optional): the best objective so far
+
+        Returns:
+            None
+
+        """
+        if self.cancelled:
+            raise JobCancelled(self.id)
+        if progress is not None:
+            self.progress = progress
+        if objective is not None:
+            self.objective = objective
+
+    def best_objective(self) -> Optional[float]:
+        """Best objective so far, from the solver log while it runs"""
+        log_path = self.log_path
+        if log_path:
+            try:
+                incumbents = cbc_log_stats(log_path)['incumbent_times']
+            except OSError:
+                incumbents = []
+            if incumbents:
+                self.objective = min(obj for _, obj in incumbents)
+        return self.objective
+
+    def to_dict(self) -> dict:
+        """Status of the job, the result is only included when done"""
+        d = {'id': self.id, 'group': self.group, 'status': self.status,
+             'progress': self.progress, 'objective': self.best_objective(),
+             'created': self.created, 'started': self.started, 'finished': self.finished}
+        if self.stats is not None:
+            d['stats'] = self.stats.to_dict()
+        if self.status == DONE:
+            d['result'] = self.result
+        elif self.status == FAILED:
+            d['error'] = self.error
+        return d
+
+
+class JobQueue:
+    """Runs jobs in a thread pool and keeps the most recent ones"""
+
+    def __init__(self, max_workers: int = 2, max_jobs: int = 100):
+        """Creates new instance
+
+        Args:
+            max_workers (int, optional): number of jobs run at the same time
+            max_jobs (int, optional): number of jobs kept for polling
+
+        Returns:
+            JobQueue
+
+        """
+        logging.getLogger(__name__).addHandler(logging.NullHandler())
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def submit(self, fn: Callable, *args, group: Optional[str] = None, **kwargs) -> Job:
+        """Queues fn(job, *args, **kwargs)
+
+        Args:
+            fn (Callable): the job function, gets the Job as first argument
+            group (str, optional): unfinished jobs in this group are cancelled
+
+        Returns:
+            Job
+
+        """
+        job = Job(group)
+        with self._lock:
+            if group is not None:
+                for other in self._jobs.values():
+                    if other.group == group and other.status in (QUEUED, RUNNING):
+                        other.cancel()
+            self._jobs[job.id] = job
+            # drop the oldest finished jobs
+            extra = len(self._jobs) - self.max_jobs
+            for old_id in [k for k, v in self._jobs.items() if v.finished][:max(extra, 0)]:
+                del self._jobs[old_id]
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancels a job
+
+        Args:
+            job_id (str): the job id
+
+        Returns:
+            bool: True if the job was found and not finished
+
+        """
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return False
+        job.cancel()
+        return True
+
+    def _run(self, job, fn, args, kwargs):
+        """Runs one job and records its outcome"""
+        if job.cancelled:
+            return
+        job.status, job.started = RUNNING, time.time()
+        try:
+            job.result = fn(job, *args, **kwargs)
+            job.status = CANCELLED if job.cancelled else DONE
+        except JobCancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            logging.getLogger(__name__).exception('job %s failed', job.id)
+            job.status, job.error = FAILED, repr(e)
+        job.finished = time.time()
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Cancels unfinished jobs and stops the workers"""
+        for job in list(self._jobs.values()):
+            if not job.finished:
+                job.cancel()
+        self._executor.shutdown(wait=wait)
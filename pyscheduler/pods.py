@@ -0,0 +1,113 @@
+"""
+pods.py
+rating-tier decomposition for large leagues
+
+The rounds model grows with players^4, so large rosters are split
+into pods of players with similar ratings. Each pod is scheduled on its
+own in a process pool and the pods are merged into one Schedule.
+An optional mixing pass then runs local search over the whole roster,
+starting from the merged schedule, so players near a tier boundary
+can be swapped across pods when that gives closer games.
+
+"""
+from concurrent.futures import ProcessPoolExecutor
+import logging
+import os
+from typing import Dict, List
+
+import numpy as np
+
+from .pyscheduler import make_schedule
+from .pyscheduler2 import PyScheduler2
+from .schedule import Schedule
+from .search import anneal
+
+
+def split_pods(players: Dict[str, float], pod_size: int = 8) -> List[Dict[str, float]]:
+    """Splits a roster into rating tiers
+
+    Players are sorted by rating and cut into contiguous pods whose sizes
+    are multiples of 4 and as close to pod_size as the roster allows.
+
+    Args:
+        players (dict[str, float]): dict of player and score
+        pod_size (int, optional): target players per pod, a multiple of 4
+
+    Returns:
+        list[dict[str, float]]: pods from the highest rated down
+
+    """
+    if len(players) % 4 or pod_size % 4 or pod_size < 8:
+        raise ValueError(f'Players ({len(players)}) and pod_size ({pod_size}) must be multiples of 4, '
+                         'pod_size at least 8')
+    ranked = sorted(players, key=players.get, reverse=True)
+    n_groups = len(ranked) // 4
+    n_pods = max(1, min(round(len(ranked) / pod_size), n_groups // 2))
+    # spread the groups of 4 as evenly as possible, larger pods first
+    sizes = [4 * (n_groups // n_pods + (idx < n_groups % n_pods)) for idx in range(n_pods)]
+    pods, start = [], 0
+    for size in sizes:
+        pods.append({name: players[name] for name in ranked[start:start + size]})
+        start += size
+    return pods
+
+
+def _solve_pod(players, n_games, time_limit, gap_abs):
+    """Schedules one pod, falls back to local search if CBC has no valid schedule"""
+    import pulp
+    logger = logging.getLogger(__name__)
+    solver = pulp.getSolver('PULP_CBC_CMD', msg=False, timeLimit=time_limit, gapAbs=gap_abs)
+    sched = make_schedule(players, n_games, solver, warm_start=True)
+    checker = PyScheduler2(n_games, players)
+    if len(sched) and not checker.validate(zip(sched.rounds.tolist(), sched.games.tolist())):
+        return sched
+    logger.warning('no CBC schedule for pod of %s players, using local search', len(players))
+    names = list(players)
+    games, rounds, _, violations = anneal([players[name] for name in names], n_games, seed=0)
+    if violations:
+        logger.warning('local search left %s violations in pod of %s players', violations, len(players))
+    return Schedule(names, games, rounds, players)
+
+
+def pod_schedule(players: Dict[str, float], n_games: int, pod_size: int = 8,
+                 time_limit: int = 60, gap_abs: float = 2, processes: int = None,
+                 mix: bool = False, mix_iterations: int = 50000) -> Schedule:
+    """Creates a schedule for a large roster one rating tier at a time
+
+    Args:
+        players (dict[str, float]): dict of player and score
+        n_games (int): number of games
+        pod_size (int, optional): target players per pod, see split_pods
+        time_limit (int, optional): CBC seconds per pod
+        gap_abs (float, optional): CBC absolute gap per pod
+        processes (int, optional): pods solved at the same time, default cpu count
+        mix (bool, optional): run local search across pods after merging
+        mix_iterations (int, optional): moves in the mixing pass
+
+    Returns:
+        Schedule
+
+    """
+    pods = split_pods(players, pod_size)
+    with ProcessPoolExecutor(max_workers=min(processes or os.cpu_count() or 1, len(pods))) as pool:
+        scheds = list(pool.map(_solve_pod, pods, [n_games] * len(pods), [time_limit] * len(pods),
+                               [gap_abs] * len(pods)))
+
+    # merge, each pod's player ids are shifted past the pods before it
+    names, games, rounds, offset = [], [], [], 0
+    for sched in scheds:
+        names += sched.names
+        games.append(sched.games + offset)
+        rounds.append(sched.rounds)
+        offset += len(sched.names)
+    merged = Schedule(names, np.vstack(games), np.concatenate(rounds), players)
+    if not mix:
+        return merged
+
+    ratings = [players[name] for name in names]
+    mixed, mixed_rounds, _, violations = anneal(ratings, n_games, iterations=mix_iterations, seed=0,
+                                                t_start=.05, start=(merged.games, merged.rounds))
+    if violations:
+        logging.getLogger(__name__).info('mixing pass left %s violations, keeping pods', violations)
+        return merged
+    return Schedule(names, mixed, mixed_rounds, players)
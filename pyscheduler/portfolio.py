@@ -0,0 +1,188 @@
+"""
+portfolio.py
+parallel solver portfolio
+
+Runs several solvers on the same roster in separate processes:
+CBC with different seeds and options and the solver-free heuristics.
+The first CBC run that proves its gapAbs target ends the race and the
+others are killed, otherwise it runs until the time limit. Either way
+the best schedule found by then wins.
+The report records every member so the portfolio can be tuned over time.
+
+"""
+import logging
+import multiprocessing as mp
+import os
+import queue
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .games import game_keys
+from .jobs import _kill
+from .pyscheduler import _greedy_schedule, _matchup_scores, _optimize, _solved, presolve
+from .schedule import Schedule
+from .search import anneal
+from .tables import TABLES
+
+
+MEMBERS = (
+    {'name': 'cbc', 'kind': 'cbc'},
+    {'name': 'cbc_warm', 'kind': 'cbc', 'warm_start': True},
+    {'name': 'cbc_seed_1', 'kind': 'cbc', 'warm_start': True, 'seed': 1},
+    {'name': 'anneal', 'kind': 'anneal', 'seed': 0},
+    {'name': 'greedy', 'kind': 'greedy', 'seed': 0},
+)
+
+
+def _objective(schedule: Schedule) -> float:
+    """Sum of game scores, the same objective as the rounds model"""
+    return float(np.abs(np.diff(schedule.team_scores(), axis=1)).sum())
+
+
+def _solve_member(member: dict, players: Dict[str, float], n_games: int, time_limit: float,
+                  gap_abs: float) -> Tuple[str, Optional[Schedule]]:
+    """Runs one portfolio member
+
+    Args:
+        member (dict): 'kind' is 'cbc', 'anneal' or 'greedy', other keys are options
+        players (dict[str, float]): dict of player and score
+        n_games (int): number of games
+        time_limit (float): seconds
+        gap_abs (float): absolute gap that counts as solved
+
+    Returns:
+        tuple: status, Schedule or None
+
+    """
+    import pulp
+    names = list(players)
+    ratings = [players[name] for name in names]
+    kind = member['kind']
+    if kind == 'cbc':
+        options = [f"randomCbcSeed {member['seed']}"] if 'seed' in member else []
+        solver = pulp.getSolver('PULP_CBC_CMD', msg=False, timeLimit=max(int(time_limit), 1),
+                                gapAbs=gap_abs, options=options)
+        games = TABLES.games(len(names))
+        game_combos = game_keys(games, n_games)
+        game_scores = _matchup_scores(games, ratings)
+        game_combos, _ = presolve(game_combos, game_scores, list(range(len(names))), n_games)
+        prob, gcvars = _optimize(None, game_combos, game_scores, list(range(len(names))), n_games,
+                                 solver, member.get('warm_start', False))
+        if not _solved(prob):
+            return 'infeasible', None
+        # CBC only reports an optimal solution once it is within gapAbs
+        status = 'optimal' if prob.sol_status == pulp.LpSolutionOptimal else 'feasible'
+        return status, Schedule.from_gcvars(gcvars, names, ratings)
+    if kind == 'anneal':
+        games, rounds, _, violations = anneal(ratings, n_games, iterations=member.get('iterations', 50000),
+                                              time_limit=time_limit, seed=member.get('seed'))
+        if violations:
+            return 'infeasible', None
+        return 'feasible', Schedule(names, games, rounds, ratings)
+    if kind == 'greedy':
+        games = TABLES.games(len(names))
+        game_combos = game_keys(games, n_games)
+        game_scores = _matchup_scores(games, ratings)
+        chosen = _greedy_schedule(game_combos, game_scores, list(range(len(names))), n_games,
+                                  tries=member.get('tries', 50), seed=member.get('seed'))
+        if not chosen:
+            return 'infeasible', None
+        return 'feasible', Schedule.from_combos(chosen, names, ratings)
+    raise ValueError(f'Invalid portfolio member: {kind}')
+
+
+def _worker(member, players, n_games, time_limit, gap_abs, results):
+    """Process entry point, puts (name, status, schedule, seconds) on results"""
+    # own process group so the CBC child is killed with this process
+    if hasattr(os, 'setpgrp'):
+        os.setpgrp()
+    start = time.monotonic()
+    try:
+        status, sched = _solve_member(member, players, n_games, time_limit, gap_abs)
+    except Exception as e:
+        status, sched = f'error: {e!r}', None
+    results.put((member['name'], status, sched, time.monotonic() - start))
+
+
+def portfolio_schedule(players: Dict[str, float], n_games: int, members: List[dict] = None,
+                       time_limit: float = 60, gap_abs: float = 2,
+                       processes: int = None) -> Tuple[Optional[Schedule], dict]:
+    """Creates a schedule by racing several solvers
+
+    Args:
+        players (dict[str, float]): dict of player and score
+        n_games (int): number of games
+        members (list[dict], optional): portfolio members, default MEMBERS
+        time_limit (float, optional): seconds for the whole portfolio
+        gap_abs (float, optional): absolute gap that ends the race
+        processes (int, optional): members run at the same time, default cpu count
+
+    Returns:
+        tuple: best Schedule (None if no member found one), report dict with the
+               winner, its objective and each member's status, objective and seconds
+
+    """
+    logger = logging.getLogger(__name__)
+    members = list(members or MEMBERS)
+    names = [m['name'] for m in members]
+    if len(set(names)) != len(names):
+        raise ValueError(f'Portfolio member names must be unique: {names}')
+    processes = min(processes or os.cpu_count() or 1, len(members))
+    report = {'winner': None, 'objective': None,
+              'members': {name: {'status': 'not started', 'objective': None, 'seconds': None}
+                          for name in names}}
+
+    results = mp.Queue()
+    pending, running = list(members), {}
+    best = None
+    start = time.monotonic()
+    deadline = start + time_limit
+    try:
+        while pending or running:
+            while pending and len(running) < processes:
+                member = pending.pop(0)
+                # leave members time to report back before the deadline
+                remaining = .9 * (deadline - time.monotonic())
+                proc = mp.Process(target=_worker, daemon=True,
+                                  args=(member, players, n_games, remaining, gap_abs, results))
+                proc.start()
+                running[member['name']] = proc
+                report['members'][member['name']]['status'] = 'running'
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                name, status, sched, seconds = results.get(timeout=min(remaining, .5))
+            except queue.Empty:
+                # a member that crashed without reporting frees its slot
+                for name, proc in list(running.items()):
+                    if not proc.is_alive() and proc.exitcode:
+                        report['members'][name]['status'] = f'error: exit code {proc.exitcode}'
+                        del running[name]
+                continue
+            running.pop(name).join()
+            entry = report['members'][name]
+            entry['status'], entry['seconds'] = status, seconds
+            if sched is None:
+                continue
+            entry['objective'] = _objective(sched)
+            if best is None or entry['objective'] < best[1] - 1e-9:
+                best = (name, entry['objective'], sched)
+            # CBC proved no schedule beats its own by more than gapAbs, stop waiting
+            if status == 'optimal':
+                break
+    finally:
+        for name, proc in running.items():
+            _kill(proc)
+            report['members'][name]['status'] = 'killed'
+        results.close()
+
+    if best is None:
+        logger.warning('no portfolio member found a schedule in %s seconds', time_limit)
+        return None, report
+    report['winner'], report['objective'] = best[0], best[1]
+    logger.info('portfolio won by %s with objective %s after %.1f seconds',
+                best[0], best[1], time.monotonic() - start)
+    return best[2], report
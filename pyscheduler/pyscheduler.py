@@ -22,12 +22,22 @@ game_combos = rows_uniq_elems(players[tcidx][gcidx].reshape(len(gcidx), 4))
 game_combos.shape
 
 """
-from collections import defaultdict
+from collections import Counter, defaultdict
 import itertools
+import logging
 import numpy as np
+import os
+import random
+import tempfile
 #import openpyxl
 #import pandas as pd
-import pulp
+
+from .backends import CpSatBackend, PulpBackend, ScheduleModel, _warm_start
+from .games import (Game, canonical_games, decode_games, encode_teams, game_keys,
+                    games_within, pack_games)
+from .schedule import Schedule
+from .stats import cbc_log_stats, phase
+from .tables import TABLES, lookup_games
 
 
 def _game_combos(team_combos, n_games):
@@ -43,20 +53,68 @@ def _game_combos(team_combos, n_games):
     """
     # calculate game combinations
     # each item is a 3-tuple of tuple(team1), tuple(team2), game_number
-    # the set intersection ensures no common elements between teams
-    legal_games = [(t[0], t[1]) for t in pulp.combination(team_combos, 2) 
-                   if not set(t[0]) & set(t[1])]
+    # legal games are read from the game tables on player ids, names are only reattached here
+    names, teams = encode_teams(team_combos)
+    games = decode_games(lookup_games(teams), names)
     return [(t1, t2, game_number)
-            for game_number in np.arange(n_games) + 1
-            for t1, t2 in legal_games]
+            for game_number in range(1, n_games + 1)
+            for t1, t2 in games]
+
+
+def _game_combos_within(s, n_games, thresh, method='diff'):
+    """Creates game combinations and scores for games with score <= thresh
+
+    Games over the threshold are skipped while enumerating,
+    so they are never scored or held in memory.
+
+    Args:
+        s (dict[str, float]): dict of player and score
+        n_games (int): number of games to schedule
+        thresh (float): max game score
+        method (str, optional): 'diff' or 'gap', see PyScheduler2
+
+    Returns:
+        tuple: list[tuple] of game combos, dict[tuple, float] of game scores
+
+    """
+    names = list(s)
+    r = np.array([s[name] for name in names], dtype=float)
+    game_scores = {}
+    for block in games_within(r, thresh, method):
+        rb = r[block]
+        if method == 'diff':
+            scores = np.abs((rb[:, 0] + rb[:, 1]) - (rb[:, 2] + rb[:, 3]))
+        else:
+            scores = rb.max(axis=1) - rb.min(axis=1)
+        for (t1, t2), score in zip(decode_games(block, names), scores.tolist()):
+            game_scores[(t1, t2)] = score
+    game_combos = [(t1, t2, game_number)
+                   for game_number in range(1, n_games + 1)
+                   for t1, t2 in game_scores]
+    return game_combos, game_scores
+
+
+def _matchup(gc):
+    """Key of the game score for a game combo
+
+    Args:
+        gc (Union[tuple, Game]): the game combo
+
+    Returns:
+        Union[tuple, Game]: (team1, team2) or the Game without game_number
+
+    """
+    if isinstance(gc, Game):
+        return gc.matchup
+    return (gc[0], gc[1])
 
 
 def _game_scores(game_combos, s):
     """Creates game scores from mapping
 
     Args:
-        game_combos (list[tuple]): the game combos
-        s (dict[str, float]): the game scores
+        game_combos (list[Union[tuple, Game]]): the game combos
+        s (dict[str, float]): the game scores, or list of scores by player id for Game
 
     Returns:
         dict[tuple, float]
@@ -67,147 +125,713 @@ def _game_scores(game_combos, s):
     for gc in game_combos:
         p1, p2 = gc[0]
         p3, p4 = gc[1]
-        game_scores[(gc[0], gc[1])] = np.abs((s[p1] + s[p2]) - (s[p3] + s[p4]))
+        game_scores[_matchup(gc)] = np.abs((s[p1] + s[p2]) - (s[p3] + s[p4]))
     return game_scores
 
-'''
-def _opp_report(df, player_names):
-    """Generates opponent report"""
-    opp = {player: {'partner': defaultdict(int), 'opponent': defaultdict(int)}
-           for player in player_names}
-    for row in df.itertuples():
-        p1, p2 = row.Team1
-        p3, p4 = row.Team2
-        opp[p1]['partner'][p2] += 1
-        opp[p2]['partner'][p1] += 1
-        opp[p3]['partner'][p4] += 1
-        opp[p4]['partner'][p3] += 1
-        opp[p1]['opponent'][p3] += 1
-        opp[p1]['opponent'][p4] += 1
-        opp[p2]['opponent'][p3] += 1
-        opp[p2]['opponent'][p4] += 1
-        opp[p3]['opponent'][p1] += 1
-        opp[p4]['opponent'][p1] += 1
-        opp[p3]['opponent'][p2] += 1
-        opp[p4]['opponent'][p2] += 1
-    return opp
-'''
 
+def _matchup_scores(games, s):
+    """Scores each legal game once, shared by every game_number
+
+    Args:
+        games (np.ndarray): (n_games x 4) array of player ids
+        s (list[float]): scores by player id
+
+    Returns:
+        dict[Game, float]: keyed by Game.matchup, same as _game_scores for Game keys
+
+    """
+    r = np.asarray(s, dtype=float)[np.asarray(games, dtype=int).reshape(-1, 4)]
+    scores = np.abs((r[:, 0] + r[:, 1]) - (r[:, 2] + r[:, 3]))
+    return dict(zip(map(Game.from_int, pack_games(games).tolist()), scores.tolist()))
 
-def _optimize(team_combos, game_combos, game_scores, p, n_games, solver=None):
-    """Creates game scores from mapping
+
+def _index_gcvars(gcvars):
+    """Buckets decision variables by the players they involve
+
+    Makes a single pass over the game combos so each constraint
+    can be built from its bucket instead of scanning every variable.
 
     Args:
-        team_combos (list[tuple]): the team combos
-        game_combos (list[tuple]): the game combos
+        gcvars (dict[tuple, LpVariable]): the decision variables
+
+    Returns:
+        tuple: dicts of player, (player, game_number), partner pair
+               and opponent pair to list[LpVariable]
+
+    """
+    by_player = defaultdict(list)
+    by_player_round = defaultdict(list)
+    by_partners = defaultdict(list)
+    by_opponents = defaultdict(list)
+    for k, v in gcvars.items():
+        t1, t2, game_number = k
+        for player in set(t1) | set(t2):
+            by_player[player].append(v)
+            by_player_round[(player, game_number)].append(v)
+        for team in set(frozenset(t) for t in (t1, t2)):
+            by_partners[team].append(v)
+        for pair in set(frozenset(pair) for pair in itertools.product(t1, t2)):
+            by_opponents[pair].append(v)
+    return by_player, by_player_round, by_partners, by_opponents
+
+
+def _schedule_model(game_combos, game_scores, p, n_games, rounds=None, played=None):
+    """Describes the rounds model independent of the solver
+
+    Args:
+        game_combos (list[Union[tuple, Game]]): the game combos
         game_scores (dict[tuple, float]): the game scores
-        p (list[str]): player names
+        p (list[str]): player names, or player ids for Game combos
         n_games (int): number of games
-        solver (pulp.apis.core.LpSolver): optional solver
+        rounds (list[int], optional): game numbers to schedule, default 1 to n_games
+        played (tuple, optional): Counters of partner and opponent pairs
+                                  already played, subtracted from the caps
 
     Returns:
-        pulp.LpProblem
+        ScheduleModel
 
     """
-    # decision variables
-    gcvars = pulp.LpVariable.dicts('gc_decvar', game_combos, cat=pulp.LpBinary)
+    if rounds is None:
+        rounds = range(1, n_games + 1)
+    partners_played, opponents_played = played or ({}, {})
 
-    # create problem
-    # minimize game scores subject to constraints
-    prob = pulp.LpProblem("PBOpt", pulp.LpMinimize)
-    
-    # objective function
-    # minimize difference between team scores
-    prob += pulp.lpSum([gcvars[gc] * game_scores[(gc[0], gc[1])] for gc in game_combos])
-    
-    # constraints
-    # no game scores > 1
-    for gc in game_combos:
-        prob += gcvars[gc] * game_scores[(gc[0], gc[1])] <= 1
+    # one variable per game combo, buckets hold variable indices
+    model = ScheduleModel(game_combos, [game_scores[_matchup(gc)] for gc in game_combos])
+    by_player, by_player_round, by_partners, by_opponents = _index_gcvars(
+        {gc: idx for idx, gc in enumerate(model.keys)})
 
-    # each player must have n_games games
-    for player in p:
-        prob += pulp.lpSum([v for k, v in gcvars.items()
-                            if (player in k[0] or player in k[1])]) == n_games
+    # no game scores > 1, a bound rather than a row, presolve usually removed them already
+    model.fixed_zero = {idx for idx, cost in enumerate(model.costs) if cost > 1}
 
     # each player has 1 game per game_number
+    # which also gives every player a game in every game_number
     for player in p:
-        for game_number in np.arange(1, n_games + 1):
-            prob += pulp.lpSum([v for k, v in gcvars.items()
-                                if (player in k[0] or player in k[1]) and
-                                k[2] == game_number]) == 1
-    
+        for game_number in rounds:
+            model.exactly_one.append(by_player_round.get((player, game_number), []))
+
     # do not play with a player more than once
     # do not play against a player more than twice
+    # a pair with no more games than its cap cannot break it, so it gets no row
     for player, pplayer in itertools.combinations(p, 2):
-        prob += pulp.lpSum([v for k, v in gcvars.items()
-                            if (player in k[0] and pplayer in k[0]) or
-                            (player in k[1] and pplayer in k[1])]) <= 1
-        prob += pulp.lpSum([v for k, v in gcvars.items()
-                            if (player in k[0] and pplayer in k[1]) or
-                            (player in k[1] and pplayer in k[0])]) <= 2
+        pair = frozenset((player, pplayer))
+        for bucket, cap in ((by_partners.get(pair, []), 1 - partners_played.get(pair, 0)),
+                            (by_opponents.get(pair, []), 2 - opponents_played.get(pair, 0))):
+            if len(bucket) > cap or cap < 0:
+                model.at_most.append((bucket, cap))
+    return model
 
-    # solve the problem
+
+def _build_problem(game_combos, game_scores, p, n_games, rounds=None, played=None):
+    """Creates the optimization problem
+
+    Args:
+        game_combos (list[Union[tuple, Game]]): the game combos
+        game_scores (dict[tuple, float]): the game scores
+        p (list[str]): player names, or player ids for Game combos
+        n_games (int): number of games
+        rounds (list[int], optional): game numbers to schedule, default 1 to n_games
+        played (tuple, optional): Counters of partner and opponent pairs
+                                  already played, subtracted from the caps
+
+    Returns:
+        tuple: pulp.LpProblem, dict[tuple, LpVariable]
+
+    """
+    return PulpBackend.compile(_schedule_model(game_combos, game_scores, p, n_games, rounds, played))
+
+def presolve(game_combos, game_scores, p, n_games, rounds=None, played=None):
+    """Removes games that cannot be part of a feasible schedule
+
+    Drops games outside rounds, games with score > 1 and games that
+    repeat a pair already at its cap in played. Then, while some player
+    has a single game left in a game_number, that game is forced and the
+    games it rules out are dropped: other games of its players in that
+    game_number, its teams in other game numbers and opponent pairs that
+    reach their cap.
+
+    Args:
+        game_combos (list[Union[tuple, Game]]): the game combos
+        game_scores (dict[tuple, float]): the game scores
+        p (list[str]): player names, or player ids for Game combos
+        n_games (int): number of games
+        rounds (list[int], optional): game numbers to schedule, default 1 to n_games
+        played (tuple, optional): Counters of partner and opponent pairs already played
+
+    Returns:
+        tuple: list of the remaining game combos, dict report with n_before, n_after,
+               removed counts by reason, n_forced and infeasible (a player with no game
+               left in some game_number)
+
+    """
+    rounds = set(range(1, n_games + 1) if rounds is None else rounds)
+    partners_played, opponents_played = played or ({}, {})
+    report = {'n_before': len(game_combos), 'removed_round': 0, 'removed_score': 0,
+              'removed_played': 0, 'removed_forced': 0}
+    alive = []
+    for gc in game_combos:
+        t1, t2, game_number = gc
+        if game_number not in rounds:
+            report['removed_round'] += 1
+        elif game_scores[_matchup(gc)] > 1:
+            report['removed_score'] += 1
+        elif (partners_played.get(frozenset(t1), 0) >= 1 or partners_played.get(frozenset(t2), 0) >= 1 or
+              any(opponents_played.get(frozenset((a, b)), 0) >= 2 for a in t1 for b in t2)):
+            report['removed_played'] += 1
+        else:
+            alive.append(gc)
+
+    # games of each (player, game_number), team and opponent pair
+    by_slot, by_team, by_opp = defaultdict(set), defaultdict(set), defaultdict(set)
+    for idx, (t1, t2, game_number) in enumerate(alive):
+        for player in t1 + t2:
+            by_slot[(player, game_number)].add(idx)
+        for team in (t1, t2):
+            by_team[frozenset(team)].add(idx)
+        for a in t1:
+            for b in t2:
+                by_opp[frozenset((a, b))].add(idx)
+    slots = [(player, game_number) for player in p for game_number in rounds]
+    infeasible = any(not by_slot[slot] for slot in slots)
+
+    def drop(idx):
+        t1, t2, game_number = alive[idx]
+        dead.add(idx)
+        for player in t1 + t2:
+            by_slot[(player, game_number)].discard(idx)
+            if len(by_slot[(player, game_number)]) == 1:
+                queue.append((player, game_number))
+        for team in (t1, t2):
+            by_team[frozenset(team)].discard(idx)
+        for a in t1:
+            for b in t2:
+                by_opp[frozenset((a, b))].discard(idx)
+
+    dead, forced = set(), set()
+    opponents = Counter(opponents_played)
+    queue = [slot for slot in slots if len(by_slot[slot]) == 1]
+    while queue and not infeasible:
+        slot = queue.pop()
+        if len(by_slot[slot]) != 1 or next(iter(by_slot[slot])) in forced:
+            infeasible = infeasible or not by_slot[slot]
+            continue
+        idx = next(iter(by_slot[slot]))
+        forced.add(idx)
+        t1, t2, game_number = alive[idx]
+        ruled_out = set()
+        for player in t1 + t2:
+            ruled_out |= by_slot[(player, game_number)]
+        for team in (t1, t2):
+            ruled_out |= by_team[frozenset(team)]
+        for a in t1:
+            for b in t2:
+                pair = frozenset((a, b))
+                opponents[pair] += 1
+                if opponents[pair] >= 2:
+                    ruled_out |= by_opp[pair]
+        for other in ruled_out - forced:
+            drop(other)
+        infeasible = any(not by_slot[(player, game_number)] for player in t1 + t2)
+
+    kept = [gc for idx, gc in enumerate(alive) if idx not in dead]
+    report.update(removed_forced=len(dead), n_forced=len(forced), n_after=len(kept),
+                  infeasible=infeasible)
+    return kept, report
+
+
+def _solved(prob):
+    """Checks if the solver found a feasible solution"""
+    import pulp
+    return prob.sol_status in (pulp.LpSolutionOptimal, pulp.LpSolutionIntegerFeasible)
+
+
+def _greedy_schedule(game_combos, game_scores, p, n_games, partner_cap=1, opponent_cap=2,
+                     tries=10, seed=None):
+    """Builds a schedule game_number by game_number, cheapest games first
+
+    Players with the fewest candidate games are placed first. A game_number
+    that cannot be filled is retried with a shuffled order, and the whole
+    schedule is restarted if that keeps failing.
+
+    Args:
+        game_combos (list[Union[tuple, Game]]): the game combos
+        game_scores (dict[tuple, float]): the game scores
+        p (list[str]): player names, or player ids for Game combos
+        n_games (int): number of games
+        partner_cap (int): max times two players are partners
+        opponent_cap (int): max times two players are opponents
+        tries (int): number of attempts per game_number and per schedule
+        seed (int): random seed for the shuffled attempts
+
+    Returns:
+        list[Union[tuple, Game]]: the chosen game combos, empty if no complete schedule was found
+
+    """
+    # players, teams and opponent pairs of each candidate, cheapest first
+    candidates = defaultdict(list)
+    for gc in game_combos:
+        score = game_scores[_matchup(gc)]
+        if score <= 1:
+            t1, t2, game_number = gc
+            teams = (frozenset(t1), frozenset(t2))
+            info = (gc, teams[0] | teams[1], teams,
+                    tuple(frozenset((a, b)) for a in t1 for b in t2), score)
+            for player in info[1]:
+                candidates[(game_number, player)].append(info)
+    for v in candidates.values():
+        v.sort(key=lambda info: info[4])
+
+    rng = random.Random(seed)
+    constrained = sorted(p, key=lambda player: len(candidates[(1, player)]))
+
+    def fill(game_number, order, partners, opponents):
+        placed, games = set(), []
+        for player in order:
+            if player in placed:
+                continue
+            for info in candidates[(game_number, player)]:
+                _, players, teams, opps, _ = info
+                if (not placed & players and
+                        all(partners[t] < partner_cap for t in teams) and
+                        all(opponents[o] < opponent_cap for o in opps)):
+                    placed |= players
+                    games.append(info)
+                    break
+            else:
+                return []
+        return games
+
+    for _ in range(tries):
+        partners, opponents = defaultdict(int), defaultdict(int)
+        chosen = []
+        for game_number in range(1, n_games + 1):
+            order = constrained
+            for _ in range(tries):
+                games = fill(game_number, order, partners, opponents)
+                if games:
+                    break
+                order = rng.sample(p, len(p))
+            if not games:
+                break
+            for gc, _, teams, opps, _ in games:
+                for t in teams:
+                    partners[t] += 1
+                for o in opps:
+                    opponents[o] += 1
+                chosen.append(gc)
+        else:
+            return chosen
+    return []
+
+
+def _incumbent_times(log_path):
+    """Reads when CBC found each integer solution
+
+    Args:
+        log_path (str): path of the CBC log, see the logPath solver option
+
+    Returns:
+        list[tuple]: (seconds, objective) of each incumbent
+
+    """
+    return cbc_log_stats(log_path)['incumbent_times']
+
+
+def _solve(prob, solver, stats=None, **info):
+    """Solves the problem, recording CBC statistics in a 'solve' phase
+
+    Args:
+        prob (pulp.LpProblem): the problem
+        solver (pulp.apis.core.LpSolver): the solver
+        stats (SolveStats, optional): collects the phase
+        **info: other values for the phase
+
+    Returns:
+        None
+
+    """
+    import pulp
+    # CBC statistics come from its log, use a temporary one unless a log is already set
+    cbc = isinstance(solver, pulp.COIN_CMD)
+    log_path, tmp = solver.optionsDict.get('logPath'), None
+    if stats is not None and cbc and not log_path:
+        fd, tmp = tempfile.mkstemp(suffix='.log')
+        os.close(fd)
+        solver.optionsDict['logPath'] = log_path = tmp
+    try:
+        with phase(stats, 'solve', n_vars=prob.numVariables(),
+                   n_constraints=prob.numConstraints(), **info) as rec:
+            prob.solve(solver)
+            rec['status'] = pulp.LpStatus[prob.status]
+            rec['sol_status'] = pulp.LpSolution[prob.sol_status]
+            rec['objective'] = pulp.value(prob.objective)
+            if stats is not None and cbc and os.path.exists(log_path):
+                rec.update({k: v for k, v in cbc_log_stats(log_path).items()
+                            if k not in ('objective', 'incumbent_times')})
+    finally:
+        if tmp:
+            del solver.optionsDict['logPath']
+            os.remove(tmp)
+
+
+def _optimize(team_combos, game_combos, game_scores, p, n_games, solver=None, warm_start=False,
+              stats=None):
+    """Creates game scores from mapping
+
+    Args:
+        team_combos (list[tuple]): the team combos
+        game_combos (list[tuple]): the game combos
+        game_scores (dict[tuple, float]): the game scores
+        p (list[str]): player names
+        n_games (int): number of games
+        solver (pulp.apis.core.LpSolver): optional solver
+        warm_start (bool, optional): start CBC from a greedy schedule
+        stats (SolveStats, optional): collects build, warm_start and solve phases
+
+    Returns:
+        pulp.LpProblem
+
+    """
+    import pulp
     if not solver:
         solver = pulp.getSolver('PULP_CBC_CMD', timeLimit=600, gapAbs=2)
-    prob.solve(solver)
+    with phase(stats, 'build') as rec:
+        prob, gcvars = _build_problem(game_combos, game_scores, p, n_games)
+        rec.update(n_vars=prob.numVariables(), n_constraints=prob.numConstraints())
+
+    # load greedy schedule as the MIP start
+    start = set()
+    if warm_start:
+        with phase(stats, 'warm_start') as rec:
+            start = set(_greedy_schedule(game_combos, game_scores, p, n_games))
+            rec['found'] = bool(start)
+        if start:
+            for gc, v in gcvars.items():
+                v.setInitialValue(1 if gc in start else 0)
+        else:
+            logging.getLogger(__name__).info('greedy schedule not found, solving without warm start')
+
+    # solve the problem
+    with _warm_start(solver, bool(start)):
+        _solve(prob, solver, stats)
 
     return prob, gcvars
 
-'''
-def _solution(gcvars, s):
-    """Inspects solution
+
+def make_schedule(players, n_games, solver=None, warm_start=False, thresh=None, stats=None,
+                  model_dir=None):
+    """Creates an optimized schedule
 
     Args:
-        gcvars (dict[str, LpVariable]): the decision variables
+        players (dict[str, float]): dict of player and score
+        n_games (int): number of games
+        solver (pulp.apis.core.LpSolver): optional solver, or a PulpBackend or CpSatBackend
+                                          from backends.py
+        warm_start (bool, optional): start CBC from a greedy schedule
+        thresh (float, optional): only consider games with score <= thresh
+        stats (SolveStats, optional): collects phase timings, attached to the schedule
+        model_dir (str, optional): reuse built models from this directory, see artifacts.py
+                                   CBC only, no warm start
 
     Returns:
-        DataFrame
+        Schedule: empty if the solver found no feasible schedule
 
     """
-    # look at solution
-    df = pd.DataFrame(data=[k for k, v in gcvars.items() if v.varValue == 1], 
-                        columns=['Team1', 'Team2', 'Round#'])
-    df = df.sort_values('Round#')
-    df['Team1_score'] = df['Team1'].apply(lambda x: sum(s.get(i) for i in x))
-    df['Team2_score'] = df['Team2'].apply(lambda x: sum(s.get(i) for i in x))
-    df = df.assign(Combined_score=lambda x: x['Team1_score'] + x['Team2_score'])
-    df = df.assign(Score_diff=lambda x: (np.abs(x['Team1_score'] - x['Team2_score']).round(2)))
-    return df
+    names = list(players)
+    ratings = [players[name] for name in names]
+    with phase(stats, 'game_combos', thresh=thresh) as rec:
+        if thresh is None:
+            games = TABLES.games(len(names))
+        else:
+            games = np.vstack([np.empty((0, 4), dtype=int)] + list(games_within(ratings, thresh)))
+        game_combos = game_keys(games, n_games)
+        rec['n_game_combos'] = len(game_combos)
+    with phase(stats, 'game_scores'):
+        game_scores = _matchup_scores(games, ratings)
+    with phase(stats, 'presolve') as rec:
+        game_combos, report = presolve(game_combos, game_scores, list(range(len(names))), n_games)
+        rec.update(report)
+    if report['infeasible']:
+        logging.getLogger(__name__).warning('presolve found a player without a legal game')
+    if isinstance(solver, (CpSatBackend, PulpBackend)):
+        chosen = _optimize_backend(game_combos, game_scores, list(range(len(names))), n_games,
+                                   solver, warm_start, model_dir, stats)
+        with phase(stats, 'extract') as rec:
+            sched = Schedule.from_combos(chosen, names, ratings)
+            rec['n_scheduled'] = len(sched)
+    elif model_dir is None:
+        prob, gcvars = _optimize(None, game_combos, game_scores, list(range(len(names))), n_games,
+                                 solver, warm_start, stats)
+        with phase(stats, 'extract') as rec:
+            # an infeasible solve leaves arbitrary values in the variables
+            sched = Schedule.from_gcvars(gcvars if _solved(prob) else {}, names, ratings)
+            rec['n_scheduled'] = len(sched)
+    else:
+        chosen = _optimize_artifact(game_combos, game_scores, list(range(len(names))), n_games,
+                                    solver, model_dir, stats)
+        with phase(stats, 'extract') as rec:
+            sched = Schedule.from_combos(chosen, names, ratings)
+            rec['n_scheduled'] = len(sched)
+    if not len(sched):
+        logging.getLogger(__name__).warning('no feasible schedule for %s players and %s games',
+                                            len(names), n_games)
+    sched.stats = stats
+    return sched
+
+
+def _optimize_artifact(game_combos, game_scores, p, n_games, solver, model_dir, stats=None):
+    """Solves the rounds model from a stored artifact, building it on the first run
 
+    Args:
+        game_combos (list[Game]): the game combos
+        game_scores (dict[Game, float]): the game scores
+        p (list[int]): player ids
+        n_games (int): number of games
+        solver (pulp.COIN_CMD): optional CBC solver
+        model_dir (str): directory of model artifacts
+        stats (SolveStats, optional): collects build and solve phases
+
+    Returns:
+        list[Game]: the chosen games, empty if CBC found none
+
+    """
+    import pulp
+    # artifacts imports this module
+    from .artifacts import ModelArtifact
+
+    if not solver:
+        solver = pulp.getSolver('PULP_CBC_CMD', timeLimit=600, gapAbs=2)
+    with phase(stats, 'build') as rec:
+        artifact, cached = ModelArtifact.build(model_dir, game_combos, game_scores, p, n_games)
+        rec.update(cached=cached, n_vars=len(artifact.columns))
+
+    log_path, tmp = solver.optionsDict.get('logPath'), None
+    if stats is not None and not log_path:
+        fd, tmp = tempfile.mkstemp(suffix='.log')
+        os.close(fd)
+        log_path = tmp
+    try:
+        with phase(stats, 'solve') as rec:
+            status, sol_status, objective, chosen = artifact.solve(solver, log_path)
+            rec.update(status=pulp.LpStatus[status], sol_status=pulp.LpSolution[sol_status],
+                       objective=objective)
+            if stats is not None:
+                rec.update({k: v for k, v in cbc_log_stats(log_path).items()
+                            if k not in ('objective', 'incumbent_times')})
+    finally:
+        if tmp:
+            os.remove(tmp)
+    return chosen if sol_status in (pulp.LpSolutionOptimal, pulp.LpSolutionIntegerFeasible) else []
+
+
+def _optimize_backend(game_combos, game_scores, p, n_games, backend, warm_start, model_dir,
+                      stats=None):
+    """Solves the rounds model with a solver backend
 
-def _solution_grid(df, player_names, grid_type):
-    """Generates solution pivot table showing partner or opponent
+    Args:
+        game_combos (list[Game]): the game combos
+        game_scores (dict[Game, float]): the game scores
+        p (list[int]): player ids
+        n_games (int): number of games
+        backend (Union[PulpBackend, CpSatBackend]): the backend
+        warm_start (bool): hint the backend with a greedy schedule
+        model_dir (str): must be None, artifacts are CBC only
+        stats (SolveStats, optional): collects build, warm_start and solve phases
+
+    Returns:
+        list[Game]: the chosen games, empty if the backend found none
+
+    """
+    if model_dir is not None:
+        raise ValueError('Solver backends do not support model_dir, artifacts are CBC only')
+    with phase(stats, 'build', backend=backend.name) as rec:
+        model = _schedule_model(game_combos, game_scores, p, n_games)
+        rec.update(n_vars=model.n_vars, n_constraints=model.n_constraints)
+    hint = None
+    if warm_start:
+        with phase(stats, 'warm_start') as rec:
+            hint = _greedy_schedule(game_combos, game_scores, p, n_games)
+            rec['found'] = bool(hint)
+    status, _, chosen = backend.solve(model, hint, stats)
+    return chosen if status in ('optimal', 'feasible') else []
+
+
+def _pair_counts(games):
+    """Counts partner and opponent pairs in (n x 4) games
 
     Args:
-        df (DataFrame): the solution dataframe
-        grid_type (str): either 'partner' or 'opponent'
+        games (Iterable[tuple]): (p1, p2, p3, p4) player tuples
 
     Returns:
-        DataFrame with index player name, columns player name
+        tuple: Counter of partner pairs, Counter of opponent pairs
 
     """
-    orpt = _opp_report(df, player_names)
+    partners, opponents = Counter(), Counter()
+    for p1, p2, p3, p4 in games:
+        partners.update((frozenset((p1, p2)), frozenset((p3, p4))))
+        opponents.update(frozenset(pair) for pair in itertools.product((p1, p2), (p3, p4)))
+    return partners, opponents
 
-    # orpt has values for partner and opponent
-    # this filters to the correct one
-    # key is player name, value is dict of partner/opponent and counts
-    d = {k: v[grid_type] for k, v in orpt.items()}
-    l = []
-    for k, v in d.items():
-        for k2, v2 in v.items():
-            l.append((k, k2, v2))
-    
-    return (
-        pd.DataFrame(data=l, columns=['player', grid_type, 'n'])
-        .pivot(index='player', columns=grid_type, values='n')
-        .fillna(0)
-        .astype(int)
-        .astype(str)
-        .replace('0', '')
-    )
 
+def reschedule(schedule, changes, frozen_rounds=0, solver=None):
+    """Repairs a schedule after the roster or ratings change
+
+    Game numbers up to frozen_rounds are kept as played and count toward
+    the partner and opponent caps. In the other game numbers, games whose
+    players are all unchanged are fixed first and only the rest are solved again.
+    If that is infeasible, every open game number is solved again,
+    warm-started from the games of the old schedule that are still legal.
+
+    Args:
+        schedule (Schedule): the previous schedule, must have ratings
+        changes (dict[str, float]): new or re-rated player and score,
+                                    None removes the player
+        frozen_rounds (int, optional): last game_number that was already played
+        solver (pulp.apis.core.LpSolver): optional solver
+
+    Returns:
+        tuple: Schedule, number of games that changed
+
+    """
+    import pulp
+    logger = logging.getLogger(__name__)
+    if schedule.ratings is None:
+        raise ValueError('Schedule has no ratings')
+    old = dict(zip(schedule.names, schedule.ratings.tolist()))
+    players = dict(old)
+    for name, rating in changes.items():
+        if rating is None:
+            if players.pop(name, None) is None:
+                raise ValueError(f'Unknown player: {name}')
+        else:
+            players[name] = float(rating)
+    if len(players) % 4:
+        raise ValueError(f'Number of players must be a multiple of 4: {len(players)}')
+    touched = {name for name in changes if name not in old or players.get(name) != old[name]}
+
+    # removed players keep their ids after the current roster for the frozen games
+    names = list(players) + [name for name in old if name not in players]
+    ids = {name: idx for idx, name in enumerate(names)}
+    ratings = [players.get(name, old.get(name)) for name in names]
+    n_games = max(schedule.game_numbers, default=0)
+    rounds = list(range(frozen_rounds + 1, n_games + 1))
+
+    old_games = [(tuple(ids[p] for p in t1 + t2), gn) for t1, t2, gn in schedule]
+    frozen = [(game, gn) for game, gn in old_games if gn <= frozen_rounds]
+    open_games = [(game, gn) for game, gn in old_games if gn > frozen_rounds]
+    if not rounds:
+        return Schedule(names, [g for g, _ in frozen], [gn for _, gn in frozen], ratings), 0
+
+    current = list(range(len(players)))
+    games = TABLES.games(len(players))
+    game_combos = [gc for gc in game_keys(games, n_games) if gc.game_number > frozen_rounds]
+    game_scores = _matchup_scores(games, ratings)
+    # presolve drops games the new ratings push over the score cap, which
+    # the model would otherwise fix to 0 under a start value of 1
+    played = _pair_counts(game for game, _ in frozen)
+    game_combos, report = presolve(game_combos, game_scores, current, n_games, rounds, played)
+    if report['infeasible']:
+        logger.warning('presolve found a player without a legal game')
+    prob, gcvars = _build_problem(game_combos, game_scores, current, n_games, rounds, played)
+    if not solver:
+        solver = pulp.getSolver('PULP_CBC_CMD', timeLimit=600, gapAbs=2)
+
+    # old games in legal orientation, for the warm start and to fix the untouched ones
+    keep, start = [], []
+    for game, gn in open_games:
+        if max(game) >= len(players):
+            continue
+        gc = Game(*canonical_games(game)[0].tolist(), gn)
+        if gc not in gcvars:
+            continue
+        start.append(gc)
+        if not touched & {names[p] for p in game}:
+            keep.append(gc)
+    start = set(start)
+    for gc, v in gcvars.items():
+        v.setInitialValue(1 if gc in start else 0)
+
+    # local repair first, only the games with a changed player are open
+    for gc in keep:
+        gcvars[gc].lowBound = 1
+    with _warm_start(solver):
+        prob.solve(solver)
+        if not _solved(prob):
+            logger.info('repair with %s fixed games is infeasible, solving open game numbers', len(keep))
+            for gc in keep:
+                gcvars[gc].lowBound = 0
+            prob.solve(solver)
+            if not _solved(prob):
+                logger.warning('no feasible schedule for the changed roster')
+
+    new = Schedule.from_gcvars(gcvars, names, ratings)
+    before = {(frozenset(map(frozenset, (g[:2], g[2:]))), gn) for g, gn in open_games}
+    after = {(frozenset(map(frozenset, (g[:2], g[2:]))), gn)
+             for g, gn in zip(new.games.tolist(), new.rounds.tolist())}
+    n_changed = len(after - before)
+    return Schedule(names, [g for g, _ in frozen] + new.games.tolist(),
+                    [gn for _, gn in frozen] + new.rounds.tolist(), ratings), n_changed
+
+
+def rolling_schedule(players, n_games, window=3, solver=None):
+    """Solves a few game numbers at a time and yields each one as it is committed
+
+    Each step solves game numbers t to t + window - 1 with the partner and
+    opponent counts of the committed game numbers as history, then commits
+    game number t only. The later game numbers of the window are the
+    warm start of the next step.
 
+    Args:
+        players (dict[str, float]): dict of player and score
+        n_games (int): number of games
+        window (int, optional): game numbers in each model
+        solver (pulp.apis.core.LpSolver): optional solver, used for every step
+
+    Yields:
+        tuple: game_number, list of 2-tuples of tuple(team1), tuple(team2)
+
+    """
+    import pulp
+    logger = logging.getLogger(__name__)
+    if window < 1:
+        raise ValueError(f'window must be at least 1: {window}')
+    names = list(players)
+    ratings = [players[name] for name in names]
+    p = list(range(len(names)))
+    games = TABLES.games(len(names))
+    by_round = defaultdict(list)
+    for gc in game_keys(games, n_games):
+        by_round[gc.game_number].append(gc)
+    game_scores = _matchup_scores(games, ratings)
+    if not solver:
+        solver = pulp.getSolver('PULP_CBC_CMD', timeLimit=60, gapAbs=1)
+
+    committed, carry = [], set()
+    for t in range(1, n_games + 1):
+        rounds = list(range(t, min(t + window, n_games + 1)))
+        game_combos = [gc for game_number in rounds for gc in by_round[game_number]]
+        played = _pair_counts(committed)
+        game_combos, _ = presolve(game_combos, game_scores, p, n_games, rounds, played)
+        prob, gcvars = _build_problem(game_combos, game_scores, p, n_games, rounds, played)
+
+        # only the carried game numbers get a start, CBC completes the rest
+        if carry:
+            for gc, v in gcvars.items():
+                if gc.game_number < rounds[-1]:
+                    v.setInitialValue(1 if gc in carry else 0)
+        with _warm_start(solver, bool(carry)):
+            prob.solve(solver)
+        if not _solved(prob):
+            logger.warning('no feasible schedule for game_number %s after %s committed', t, t - 1)
+            return
+
+        chosen = [gc for gc, v in gcvars.items() if v.varValue is not None and round(v.varValue) == 1]
+        carry = {gc for gc in chosen if gc.game_number > t}
+        now = [gc.players for gc in chosen if gc.game_number == t]
+        committed += now
+        yield t, [((names[a], names[b]), (names[c], names[d])) for a, b, c, d in now]
+
+
+'''
 def _to_spreadsheet(df, fname):
     """Writes formatted dataframe to spreadsheet
     
@@ -2,6 +2,11 @@
 pyscheduler2.py
 pure python implementation of scheduler
 
+validate() checks rounds with bitmasks: player id i is bit 1 << i and a
+game is the OR of its players' bits, so a repeated player is a missing
+bit. Partner and opponent history is kept in search.PairHistory, the
+same counts the local search scores its moves with.
+
 TODO: 
   passes basic tests but need to inspect output
   need to test gap implementation
@@ -10,12 +15,21 @@ TODO:
 from collections import defaultdict
 import itertools
 import logging
-from typing import Dict, List, Union
+from typing import Dict, Iterable, List, Sequence, Tuple, Union
+
+import numpy as np
+
+from .games import Game, GameScores, decode_games, encode_teams, game_keys, games_within
+from .schedule import Schedule
+from .search import PairHistory, anneal
+from .stats import SolveStats, phase
+from .tables import lookup_games
 
 
 class PyScheduler2:
 
-    def __init__(self, n_games: int, players: Dict[Union[str, int], float], method: str = 'diff'):
+    def __init__(self, n_games: int, players: Dict[Union[str, int], float], method: str = 'diff',
+                 thresh: float = None, stats: SolveStats = None):
         """Creates new instance
 
         Args:
@@ -23,6 +37,8 @@ class PyScheduler2:
             players (dict[Union[str, int], float]): dict of player and score
             method (str, optional): default 'diff', measures relative gap between teams
                                     'gap' measures gap b/w best and worst player
+            thresh (float, optional): only keep games with score <= thresh
+            stats (SolveStats, optional): collects phase timings as properties are computed
 
         Returns:
             PyScheduler2
@@ -32,6 +48,9 @@ class PyScheduler2:
         self.n_games = n_games
         self.method = method
         self.players = players
+        self.thresh = thresh
+        self.stats = stats
+        self._game_array = None
         self._game_combos = None
         self._game_scores = None
         self._team_combos = None
@@ -61,72 +80,188 @@ class PyScheduler2:
         """
         # calculate game combinations
         # each item is a 3-tuple of tuple(team1), tuple(team2), game_number
-        # the set intersection ensures no common elements between teams
+        # legal games come from game_array, names are only reattached here
         if not self._game_combos:
-            legal_games = [(t[0], t[1]) for t in itertools.combinations(self.team_combos, 2) 
-                           if not set(t[0]) & set(t[1])]
-            self._game_combos = [(t1, t2, gn) for gn in self.games for t1, t2 in legal_games]
+            games = decode_games(self.game_array, self.player_names)
+            self._game_combos = [(t1, t2, gn) for gn in self.games for t1, t2 in games]
         return self._game_combos
 
-    def _gs_diff(self)-> Dict[tuple, float]:
+    @property
+    def game_array(self) -> np.ndarray:
+        """Creates integer-encoded legal games from team combinations
+
+        Args:
+            None
+
+        Returns:
+            np.ndarray: (n_games x 4) array of player ids, columns 0-1 are team1
+
+        """
+        if self._game_array is None:
+            with phase(self.stats, 'game_array', thresh=self.thresh) as rec:
+                names, teams = encode_teams(self.team_combos, self.player_names)
+                if len(names) > len(self.players):
+                    raise ValueError(f'Unknown players in team_combos: {names[len(self.players):]}')
+                if self.thresh is None:
+                    self._game_array = lookup_games(teams)
+                else:
+                    # only keep games that use the allowed teams
+                    allowed = np.zeros((len(names), len(names)), dtype=bool)
+                    allowed[teams[:, 0], teams[:, 1]] = allowed[teams[:, 1], teams[:, 0]] = True
+                    games = np.vstack([np.empty((0, 4), dtype=teams.dtype)] +
+                                      list(games_within(self.ratings, self.thresh, self.method)))
+                    self._game_array = games[allowed[games[:, 0], games[:, 1]] &
+                                             allowed[games[:, 2], games[:, 3]]]
+                rec['n_legal_games'] = len(self._game_array)
+        return self._game_array
+
+    @property
+    def game_keys(self) -> List[Game]:
+        """Creates a packed Game for every row of game_array in every game_number
+
+        Args:
+            None
+
+        Returns:
+            list[Game]
+
+        """
+        return game_keys(self.game_array, self.n_games)
+
+    def validate(self, games: Iterable[Tuple[int, Sequence[int]]], partner_cap: int = 1,
+                 opponent_cap: int = 2) -> int:
+        """Counts constraint violations of a schedule, pure python
+
+        Args:
+            games (Iterable): (game_number, (p1, p2, p3, p4)) of player ids,
+                              e.g. zip(sched.rounds.tolist(), sched.games.tolist())
+            partner_cap (int, optional): max times two players are partners
+            opponent_cap (int, optional): max times two players are opponents
+
+        Returns:
+            int: players missing from or repeated in a game_number, plus pairs over a cap
+
+        """
+        full = (1 << len(self.players)) - 1
+        seen = dict.fromkeys(self.games, 0)
+        history = PairHistory(len(self.players), partner_cap, opponent_cap)
+        n = 0
+        for game_number, game in games:
+            mask = 0
+            for player in game:
+                mask |= 1 << player
+            # a repeated player shows up as a game with fewer than 4 bits
+            n += 4 - bin(mask).count('1') + bin(seen.get(game_number, 0) & mask).count('1')
+            seen[game_number] = seen.get(game_number, 0) | mask
+            history.add(game)
+        n += sum(bin(full & ~mask).count('1') for mask in seen.values())
+        return n + history.violations()
+
+    def to_schedule(self, combos: List[Union[tuple, Game]]) -> Schedule:
+        """Creates schedule from selected game combos
+
+        Args:
+            combos (list[Union[tuple, Game]]): game combos or Game keys
+
+        Returns:
+            Schedule
+
+        """
+        return Schedule.from_combos(combos, self.player_names, self.players)
+
+    @property
+    def ratings(self) -> np.ndarray:
+        """Player scores in player id order"""
+        return np.array(self.player_scores, dtype=float)
+
+    def _gs_diff(self) -> np.ndarray:
         """Diff method to calculate game_scores
         
         Args:
             None
 
         Returns:
-            dict[tuple, float]
+            np.ndarray: score of each row of game_array
 
         """
-        unique_game_scores = {}
-        unique_game_combos = set([(gc[0], gc[1]) for gc in self.game_combos])
-        s = self.players
-        for gc in unique_game_combos:
-            p1, p2 = gc[0]
-            p3, p4 = gc[1]
-            unique_game_scores[(gc[0], gc[1])] = abs((s[p1] + s[p2]) - (s[p3] + s[p4]))
-        return unique_game_scores
-
-    def _gs_gap(self)-> Dict[tuple, float]:
+        r = self.ratings[self.game_array]
+        return np.abs((r[:, 0] + r[:, 1]) - (r[:, 2] + r[:, 3]))
+
+    def _gs_gap(self) -> np.ndarray:
         """Gap method to calculate game_scores
         
         Args:
             None
 
         Returns:
-            dict[tuple, float]
+            np.ndarray: score of each row of game_array
 
         """
-        unique_game_scores = {}
-        unique_game_combos = set([(gc[0], gc[1]) for gc in self.game_combos])
-        for gc in unique_game_combos:
-            scores = [s[p] for p in itertools.chain.from_iterable(gc)]           
-            unique_game_scores[(gc[0], gc[1])] = max(scores) - min(scores)
-        return unique_game_scores
+        r = self.ratings[self.game_array]
+        return r.max(axis=1) - r.min(axis=1)
 
     @property
-    def game_scores(self) -> Dict[tuple, float]:
+    def game_score_array(self) -> np.ndarray:
+        """Creates game scores for each row of game_array
+
+        Args:
+            None
+
+        Returns:
+            np.ndarray
+
+        """
+        return self.game_scores.scores
+
+    @property
+    def game_scores(self) -> GameScores:
         """Creates game scores from mapping
 
         Args:
             None
 
         Returns:
-            dict[tuple, float]
+            GameScores: mapping of (team1, team2, game_number) to score
 
         """
-        if not self._game_scores:
+        if self._game_scores is None:
             # calculate game score differential
-            if self.method == 'diff':
-                unique_game_scores = self._gs_diff()
-            elif self.method == 'gap':
-                unique_game_scores = self._gs_gap()
-            else:
-                raise ValueError(f'Invalid game_scores method: {method}')
-            self._game_scores = {(k[0], k[1], g): v for g in self.games 
-                                 for k, v in unique_game_scores.items()}
+            # scores are stored once and shared by every game_number
+            if self.method not in ('diff', 'gap'):
+                raise ValueError(f'Invalid game_scores method: {self.method}')
+            # enumerate first so it is timed as its own phase
+            self.game_array
+            with phase(self.stats, 'game_scores', method=self.method):
+                scores = self._gs_diff() if self.method == 'diff' else self._gs_gap()
+            self._game_scores = GameScores(scores, self.game_array, self.player_names, self.games)
         return self._game_scores
 
+    def solve(self, iterations: int = 20000, time_limit: float = None, seed: int = None) -> Schedule:
+        """Creates schedule with simulated annealing, no solver required
+
+        Games with a score over thresh are penalized like pairs over a cap,
+        so a schedule without violations keeps every game within thresh.
+
+        Args:
+            iterations (int, optional): number of moves
+            time_limit (float, optional): stop after this many seconds
+            seed (int, optional): random seed
+
+        Returns:
+            Schedule
+
+        """
+        with phase(self.stats, 'anneal', iterations=iterations) as rec:
+            games, rounds, cost, violations = anneal(self.player_scores, self.n_games, self.method,
+                                                     iterations=iterations, time_limit=time_limit,
+                                                     seed=seed, thresh=self.thresh)
+            rec.update(objective=cost, violations=violations)
+        if violations:
+            logging.getLogger(__name__).warning('Schedule has %s constraint violations', violations)
+        sched = Schedule(self.player_names, games, rounds, self.players)
+        sched.stats = self.stats
+        return sched
+
     @property
     def team_combos(self) -> List[tuple]:
         """Creates team combinations
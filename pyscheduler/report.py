@@ -0,0 +1,141 @@
+"""
+report.py
+partner and opponent reports from incidence matrices
+
+Each team of a schedule is a row of a 0/1 incidence matrix over the
+players, so partner counts are T1'T1 + T2'T2 and opponent counts are
+T1'T2 + T2'T1. The same einsum runs over a stack of schedules, so
+thousands of candidate schedules can be validated in one call.
+
+"""
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from .schedule import Schedule
+
+
+def incidence(games: np.ndarray, n_players: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Team incidence matrices
+
+    Args:
+        games (np.ndarray): (..., n x 4) array of player ids
+        n_players (int): number of players
+
+    Returns:
+        tuple: (..., n x n_players) 0/1 arrays for team1 and team2
+
+    """
+    games = np.asarray(games)
+    ids = np.arange(n_players)
+    t1 = (games[..., :2, None] == ids).sum(axis=-2, dtype=np.int32)
+    t2 = (games[..., 2:, None] == ids).sum(axis=-2, dtype=np.int32)
+    return t1, t2
+
+
+def pair_counts(games: np.ndarray, n_players: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Times each pair of players are partners and opponents
+
+    Args:
+        games (np.ndarray): (..., n x 4) array of player ids
+        n_players (int): number of players
+
+    Returns:
+        tuple: (..., n_players x n_players) partner and opponent counts,
+               the partner diagonal is zero
+
+    """
+    t1, t2 = incidence(games, n_players)
+    partners = np.einsum('...np,...nq->...pq', t1, t1) + np.einsum('...np,...nq->...pq', t2, t2)
+    opponents = np.einsum('...np,...nq->...pq', t1, t2)
+    opponents += np.swapaxes(opponents, -1, -2)
+    idx = np.arange(n_players)
+    partners[..., idx, idx] = 0
+    return partners, opponents
+
+
+def validate(games: np.ndarray, rounds: np.ndarray, n_players: int, n_games: int,
+             partner_cap: int = 1, opponent_cap: int = 2) -> np.ndarray:
+    """Checks a stack of schedules against the scheduling constraints
+
+    Args:
+        games (np.ndarray): (s x n x 4) array of player ids
+        rounds (np.ndarray): (n,) or (s x n) game numbers, 1 to n_games
+        n_players (int): number of players
+        n_games (int): number of games each player plays
+        partner_cap (int, optional): max times two players are partners
+        opponent_cap (int, optional): max times two players are opponents
+
+    Returns:
+        np.ndarray: (s,) bool, True where every player plays once per
+                    game_number and no pair is over a cap
+
+    """
+    games = np.asarray(games)
+    rounds = np.broadcast_to(np.asarray(rounds), games.shape[:-1])
+    t1, t2 = incidence(games, n_players)
+    by_round = (rounds[..., None] == np.arange(1, n_games + 1)).astype(np.int32)
+    played = np.einsum('...np,...ng->...pg', t1 + t2, by_round)
+    partners, opponents = pair_counts(games, n_players)
+    return ((played == 1).all(axis=(-2, -1)) &
+            (partners.max(axis=(-2, -1)) <= partner_cap) &
+            (opponents.max(axis=(-2, -1)) <= opponent_cap))
+
+
+def player_summary(schedule: Schedule) -> Dict[str, np.ndarray]:
+    """Per-player statistics of a schedule
+
+    Args:
+        schedule (Schedule): a schedule with ratings
+
+    Returns:
+        dict: arrays in player id order, keys games, mean_score_diff
+              (mean team score difference of the player's games),
+              max_partner and max_opponent (most repeats with one player)
+
+    """
+    n_players = len(schedule.names)
+    t1, t2 = incidence(schedule.games, n_players)
+    played = t1 + t2
+    diffs = np.abs(np.diff(schedule.team_scores(), axis=1)).ravel()
+    n = played.sum(axis=0)
+    partners, opponents = pair_counts(schedule.games, n_players)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_diff = played.T @ diffs / n
+    return {'games': n, 'mean_score_diff': mean_diff,
+            'max_partner': partners.max(axis=1), 'max_opponent': opponents.max(axis=1)}
+
+
+def game_table(schedule: Schedule) -> List[Dict]:
+    """Games with their team scores, one dict per game
+
+    Args:
+        schedule (Schedule): a schedule with ratings
+
+    Returns:
+        list[dict]: keys Team1, Team2, Round#, Team1_score, Team2_score,
+                    Combined_score and Score_diff, sorted by Round#
+
+    """
+    scores = schedule.team_scores()
+    return [{'Team1': t1, 'Team2': t2, 'Round#': game_number,
+             'Team1_score': s1, 'Team2_score': s2, 'Combined_score': s1 + s2,
+             'Score_diff': round(abs(s1 - s2), 2)}
+            for (t1, t2, game_number), (s1, s2) in zip(schedule, scores.tolist())]
+
+
+def grid(counts: np.ndarray, names: Sequence) -> List[List[str]]:
+    """Formats a count matrix as spreadsheet rows
+
+    Args:
+        counts (np.ndarray): (n_players x n_players) counts from pair_counts
+        names (list): player names in id order
+
+    Returns:
+        list[list[str]]: header row, then one row per player, zero counts are blank
+
+    """
+    rows = [['player'] + list(names)]
+    for name, row in zip(names, np.asarray(counts).tolist()):
+        rows.append([name] + [str(v) if v else '' for v in row])
+    return rows
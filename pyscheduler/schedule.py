@@ -0,0 +1,136 @@
+"""
+schedule.py
+array-backed schedule container
+
+A Schedule holds solved games as arrays of player ids and game numbers
+and only attaches player names on access.
+
+"""
+from collections.abc import Mapping
+from typing import Iterable, List, Sequence, Union
+
+import numpy as np
+
+from .games import ID_DTYPE, Game, encode_teams, pack_games, unpack_games
+
+
+class Schedule:
+    """Array-backed schedule
+
+    Games are held as an (n x 4) array of player ids with a parallel
+    array of game numbers, sorted by game_number. Iterating yields
+    (team1, team2, game_number) tuples of player names. stats holds the
+    SolveStats of the run that created it, if it was instrumented.
+
+    """
+    __slots__ = ('names', 'games', 'rounds', 'ratings', 'stats')
+
+    def __init__(self, names: Sequence, games: np.ndarray, rounds: np.ndarray,
+                 ratings: Union[Mapping, Sequence, None] = None):
+        """Creates new instance
+
+        Args:
+            names (list): player names in id order
+            games (np.ndarray): (n x 4) array of player ids
+            rounds (np.ndarray): game_number of each game
+            ratings (Union[dict, list], optional): player ratings, by name or in id order
+
+        Returns:
+            Schedule
+
+        """
+        games = np.asarray(games, dtype=ID_DTYPE).reshape(-1, 4)
+        rounds = np.asarray(rounds, dtype=ID_DTYPE).reshape(-1)
+        order = np.argsort(rounds, kind='stable')
+        self.names = list(names)
+        self.games = games[order]
+        self.rounds = rounds[order]
+        if isinstance(ratings, Mapping):
+            ratings = [ratings[name] for name in self.names]
+        self.ratings = None if ratings is None else np.asarray(ratings, dtype=float)
+        self.stats = None
+
+    @classmethod
+    def from_combos(cls, combos: Iterable, names: Sequence = None,
+                    ratings: Union[Mapping, Sequence, None] = None) -> 'Schedule':
+        """Creates schedule from game combos
+
+        Args:
+            combos (list): (team1, team2, game_number) tuples of names, or Game
+            names (list, optional): player names in id order, required for Game
+            ratings (Union[dict, list], optional): player ratings
+
+        Returns:
+            Schedule
+
+        """
+        combos = list(combos)
+        if combos and isinstance(combos[0], Game):
+            games, rounds = unpack_games(np.array(combos, dtype=np.int64))
+        else:
+            names, teams = encode_teams((team for gc in combos for team in gc[:2]), names)
+            games = teams.reshape(-1, 4)
+            rounds = [gc[2] for gc in combos]
+        return cls(names or [], games, rounds, ratings)
+
+    @classmethod
+    def from_gcvars(cls, gcvars: Mapping, names: Sequence = None,
+                    ratings: Union[Mapping, Sequence, None] = None) -> 'Schedule':
+        """Creates schedule from solved decision variables
+
+        Args:
+            gcvars (dict[tuple, LpVariable]): the decision variables
+            names (list, optional): player names in id order, required for Game keys
+            ratings (Union[dict, list], optional): player ratings
+
+        Returns:
+            Schedule
+
+        """
+        return cls.from_combos([k for k, v in gcvars.items()
+                                if v.varValue is not None and round(v.varValue) == 1],
+                               names, ratings)
+
+    @property
+    def game_numbers(self) -> List[int]:
+        return np.unique(self.rounds).tolist()
+
+    def __len__(self) -> int:
+        return len(self.rounds)
+
+    def __iter__(self):
+        named = np.array(self.names, dtype=object)[self.games].tolist()
+        for (p1, p2, p3, p4), game_number in zip(named, self.rounds.tolist()):
+            yield ((p1, p2), (p3, p4), game_number)
+
+    def __repr__(self):
+        return f'Schedule({len(self)} games, {len(self.game_numbers)} rounds)'
+
+    def round(self, game_number: int) -> List[tuple]:
+        """Games in one game_number
+
+        Args:
+            game_number (int): the game_number
+
+        Returns:
+            list[tuple]: each item is a 2-tuple of tuple(team1), tuple(team2)
+
+        """
+        named = np.array(self.names, dtype=object)[self.games[self.rounds == game_number]].tolist()
+        return [((p1, p2), (p3, p4)) for p1, p2, p3, p4 in named]
+
+    def keys(self) -> List[Game]:
+        """Games as packed Game keys"""
+        return [Game.from_int(v) for v in pack_games(self.games, self.rounds).tolist()]
+
+    def team_scores(self) -> np.ndarray:
+        """Sum of ratings of each team
+
+        Returns:
+            np.ndarray: (n x 2) array, columns are team1 and team2
+
+        """
+        if self.ratings is None:
+            raise ValueError('Schedule has no ratings')
+        r = self.ratings[self.games]
+        return np.column_stack((r[:, 0] + r[:, 1], r[:, 2] + r[:, 3]))
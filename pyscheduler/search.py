@@ -0,0 +1,236 @@
+"""
+search.py
+solver-free local search for schedules
+
+Each game_number is a permutation of player ids, read four at a time
+as (p1, p2) vs (p3, p4). Moves swap two players within one game_number,
+so only the two games they sit in are rescored against the PairHistory.
+
+"""
+import math
+import random
+import time
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from .games import TOL
+
+
+PARTNER_CAP = 1
+OPPONENT_CAP = 2
+PENALTY = 10.0
+
+
+def _score(method, r, p1, p2, p3, p4):
+    """Scores one game from player ratings"""
+    if method == 'diff':
+        return abs((r[p1] + r[p2]) - (r[p3] + r[p4]))
+    scores = (r[p1], r[p2], r[p3], r[p4])
+    return max(scores) - min(scores)
+
+
+class PairHistory:
+    """Partner and opponent counts of every pair of players
+
+    Counts are flat lists indexed by p1 * n_players + p2 and kept
+    symmetric, so a check is one index per pair.
+
+    """
+
+    def __init__(self, n_players: int, partner_cap: int = PARTNER_CAP,
+                 opponent_cap: int = OPPONENT_CAP):
+        """Creates new instance
+
+        Args:
+            n_players (int): number of players
+            partner_cap (int, optional): max times two players are partners
+            opponent_cap (int, optional): max times two players are opponents
+
+        Returns:
+            PairHistory
+
+        """
+        self.n = n_players
+        self.partner_cap = partner_cap
+        self.opponent_cap = opponent_cap
+        self.partners = [0] * (n_players * n_players)
+        self.opponents = [0] * (n_players * n_players)
+
+    def partnered(self, p1: int, p2: int) -> int:
+        return self.partners[p1 * self.n + p2]
+
+    def opposed(self, p1: int, p2: int) -> int:
+        return self.opponents[p1 * self.n + p2]
+
+    def fits(self, game: Sequence[int]) -> bool:
+        """True if adding the game keeps every pair within its cap
+
+        Args:
+            game (tuple[int]): player ids, team1 then team2
+
+        Returns:
+            bool
+
+        """
+        p1, p2, p3, p4 = game
+        n, partners, opponents = self.n, self.partners, self.opponents
+        return (partners[p1 * n + p2] < self.partner_cap and partners[p3 * n + p4] < self.partner_cap and
+                opponents[p1 * n + p3] < self.opponent_cap and opponents[p1 * n + p4] < self.opponent_cap and
+                opponents[p2 * n + p3] < self.opponent_cap and opponents[p2 * n + p4] < self.opponent_cap)
+
+    def add(self, game: Sequence[int], sign: int = 1) -> int:
+        """Counts (sign=1) or uncounts (sign=-1) a game
+
+        Args:
+            game (tuple[int]): player ids, team1 then team2
+            sign (int, optional): 1 or -1
+
+        Returns:
+            int: pairs that went over a cap (sign=1) or were over it before (sign=-1)
+
+        """
+        p1, p2, p3, p4 = game
+        n, partners, opponents = self.n, self.partners, self.opponents
+        partner_cap, opponent_cap = self.partner_cap, self.opponent_cap
+        over = 0
+        for a, b in ((p1, p2), (p3, p4)):
+            c = partners[a * n + b] + sign
+            partners[a * n + b] = partners[b * n + a] = c
+            over += c > partner_cap if sign > 0 else c >= partner_cap
+        for a, b in ((p1, p3), (p1, p4), (p2, p3), (p2, p4)):
+            c = opponents[a * n + b] + sign
+            opponents[a * n + b] = opponents[b * n + a] = c
+            over += c > opponent_cap if sign > 0 else c >= opponent_cap
+        return over
+
+    def violations(self) -> int:
+        """Number of pairs over a cap"""
+        return (sum(1 for c in self.partners if c > self.partner_cap) +
+                sum(1 for c in self.opponents if c > self.opponent_cap)) // 2
+
+
+class _State:
+    """Round permutations with partner and opponent counts
+
+    Pair counts are kept in a PairHistory. Cost is the sum of game scores
+    plus penalty for each game score over max_score and each pair count
+    over its cap.
+
+    """
+
+    def __init__(self, rounds: List[List[int]], ratings: Sequence[float], method: str,
+                 penalty: float, max_score: float = 1):
+        self.rounds = rounds
+        self.r = list(ratings)
+        self.n = len(ratings)
+        self.method = method
+        self.penalty = penalty
+        self.max_score = max_score + TOL
+        self.history = PairHistory(self.n)
+        self.cost = 0.0
+        for perm in rounds:
+            for k in range(0, self.n, 4):
+                self.cost += self._apply(perm[k:k + 4], 1)
+
+    def _apply(self, game, sign):
+        """Adds (sign=1) or removes (sign=-1) a game and returns the change in cost"""
+        score = _score(self.method, self.r, *game)
+        over = (score > self.max_score) + self.history.add(game, sign)
+        return sign * (score + self.penalty * over)
+
+    def swap(self, rnd, i, j):
+        """Swaps two positions in a game_number and returns the change in cost"""
+        perm = self.rounds[rnd]
+        gi, gj = i - i % 4, j - j % 4
+        starts = (gi,) if gi == gj else (gi, gj)
+        delta = 0.0
+        for k in starts:
+            delta += self._apply(perm[k:k + 4], -1)
+        perm[i], perm[j] = perm[j], perm[i]
+        for k in starts:
+            delta += self._apply(perm[k:k + 4], 1)
+        self.cost += delta
+        return delta
+
+    def violations(self):
+        """Number of games and pairs over the caps"""
+        n = 0
+        for perm in self.rounds:
+            for k in range(0, self.n, 4):
+                if _score(self.method, self.r, *perm[k:k + 4]) > self.max_score:
+                    n += 1
+        return n + self.history.violations()
+
+
+def anneal(ratings: Sequence[float], n_games: int, method: str = 'diff',
+           iterations: int = 20000, time_limit: Optional[float] = None,
+           seed: Optional[int] = None, t_start: float = 1.0, t_end: float = .001,
+           penalty: float = PENALTY, start: Optional[tuple] = None, thresh: Optional[float] = None):
+    """Simulated annealing over round-by-round pairings
+
+    Args:
+        ratings (list[float]): player ratings in player id order
+        n_games (int): number of games to schedule
+        method (str, optional): 'diff' or 'gap', see PyScheduler2
+        iterations (int, optional): number of moves
+        time_limit (float, optional): stop after this many seconds
+        seed (int, optional): random seed
+        t_start (float, optional): starting temperature
+        t_end (float, optional): final temperature
+        penalty (float, optional): cost per pair over a cap and per game score over the max
+        start (tuple, optional): (n x 4) array of player ids and array of game numbers
+                                 to start from instead of random rounds
+        thresh (float, optional): max game score, default 1, games over it
+                                  cost the same penalty as pairs over a cap
+
+    Returns:
+        tuple: (n x 4) array of player ids, array of game numbers, cost, violations
+
+    """
+    n = len(ratings)
+    if n % 4:
+        raise ValueError(f'Number of players must be a multiple of 4: {n}')
+    if method not in ('diff', 'gap'):
+        raise ValueError(f'Invalid game_scores method: {method}')
+    rng = random.Random(seed)
+    rounds = []
+    if start is not None:
+        games, game_numbers = np.asarray(start[0]).reshape(-1, 4), np.asarray(start[1])
+        for game_number in np.unique(game_numbers):
+            perm = games[game_numbers == game_number].reshape(-1).tolist()
+            if sorted(perm) != list(range(n)):
+                raise ValueError(f'Start round {game_number} does not have every player once')
+            rounds.append(perm)
+        if len(rounds) != n_games:
+            raise ValueError(f'Start has {len(rounds)} game numbers, expected {n_games}')
+    for _ in range(n_games - len(rounds)):
+        perm = list(range(n))
+        rng.shuffle(perm)
+        rounds.append(perm)
+    max_score = 1 if thresh is None else min(thresh, 1)
+    state = _State(rounds, ratings, method, penalty, max_score)
+    best_cost, best = state.cost, [list(perm) for perm in rounds]
+
+    cooling = (t_end / t_start) ** (1 / max(iterations, 1))
+    temp = t_start
+    deadline = time.monotonic() + time_limit if time_limit else None
+    for it in range(iterations):
+        if deadline and not it % 1000 and time.monotonic() > deadline:
+            break
+        rnd = rng.randrange(n_games)
+        i, j = rng.randrange(n), rng.randrange(n)
+        # swapping teammates does not change the game
+        if i // 2 == j // 2:
+            continue
+        delta = state.swap(rnd, i, j)
+        if delta > 0 and rng.random() >= math.exp(-delta / temp):
+            state.swap(rnd, i, j)
+        elif state.cost < best_cost - 1e-9:
+            best_cost, best = state.cost, [list(perm) for perm in rounds]
+        temp *= cooling
+
+    state = _State(best, ratings, method, penalty, max_score)
+    games = np.array([perm[k:k + 4] for perm in best for k in range(0, n, 4)]).reshape(-1, 4)
+    game_numbers = np.repeat(np.arange(1, n_games + 1), n // 4)
+    return games, game_numbers, state.cost, state.violations()
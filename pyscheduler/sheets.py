@@ -0,0 +1,364 @@
+"""
+sheets.py
+batched, diff-aware spreadsheet I/O
+
+A SheetPublisher remembers the last values it wrote to a sheet and
+sends only the changed cells, the row backgrounds whose banding changed
+and the autoresize requests, all in one batchUpdate. A SheetReader
+keeps the last read of a sheet and only reads again when the backend
+reports a new revision of that sheet: the spreadsheet version, minus
+the backend's own writes to other sheets, so publishing the schedule
+does not invalidate the players read. GoogleSheetsBackend needs a
+drive_service for versions, without one every read goes to the API.
+Backends speak the Sheets API request format; FakeSheetsBackend applies
+it in memory so the whole path can be tested and benchmarked offline.
+
+"""
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+
+HEADER_BACKGROUND = '#bdbdbd'
+BAND_BACKGROUND = '#f3f3f3'
+# own writes remembered for revision(), older ones count as outside edits
+MAX_WRITES = 64
+
+
+def _cell(value) -> str:
+    """Cell value as the Sheets API reads it back"""
+    return '' if value is None else str(value)
+
+
+def _grid(values: Sequence[Sequence]) -> List[List[str]]:
+    """Rows of cell strings with trailing blanks removed"""
+    rows = [[_cell(v) for v in row] for row in values]
+    for row in rows:
+        while row and row[-1] == '':
+            row.pop()
+    while rows and not rows[-1]:
+        rows.pop()
+    return rows
+
+
+def _color(hex_color: str) -> Dict[str, float]:
+    """'#rrggbb' as a Sheets API color, white for ''"""
+    if not hex_color:
+        return {'red': 1.0, 'green': 1.0, 'blue': 1.0}
+    h = hex_color.lstrip('#')
+    return {k: int(h[i:i + 2], 16) / 255 for k, i in (('red', 0), ('green', 2), ('blue', 4))}
+
+
+def _value(value) -> Dict:
+    """Cell as a Sheets API ExtendedValue, {} clears it"""
+    if value is None or value == '':
+        return {}
+    if isinstance(value, bool):
+        return {'userEnteredValue': {'boolValue': value}}
+    if isinstance(value, (int, float)):
+        return {'userEnteredValue': {'numberValue': value}}
+    return {'userEnteredValue': {'stringValue': str(value)}}
+
+
+def _request_sheet_ids(requests: List[Dict]) -> set:
+    """sheetIds that batchUpdate requests touch"""
+    ids = set()
+    for req in requests:
+        for body in req.values():
+            target = body.get('start') or body.get('range') or body.get('dimensions') or {}
+            if 'sheetId' in target:
+                ids.add(target['sheetId'])
+    return ids
+
+
+def _record_write(writes: Dict, before, after, sheets) -> None:
+    """Remembers that the backend's own write took the version from before to after"""
+    if before is None or after is None or before == after:
+        return
+    writes[after] = (before, frozenset(sheets))
+    while len(writes) > MAX_WRITES:
+        del writes[next(iter(writes))]
+
+
+def _revision(writes: Dict, version, sheet: str):
+    """Latest version at which sheet may have changed, skipping own writes to other sheets"""
+    while version in writes and sheet not in writes[version][1]:
+        version = writes[version][0]
+    return version
+
+
+def _band(idx: int, n_rows: int) -> str:
+    """Background of a row, header grey, odd rows banded, blank past the data"""
+    if idx >= n_rows:
+        return ''
+    if idx == 0:
+        return HEADER_BACKGROUND
+    return BAND_BACKGROUND if idx % 2 == 1 else ''
+
+
+class GoogleSheetsBackend:
+    """Sheets API backend, e.g. on the sheet_service of a sheetfu SpreadsheetApp"""
+
+    def __init__(self, service, spreadsheet_id: str, drive_service=None):
+        """Creates new instance
+
+        Args:
+            service: googleapiclient Sheets v4 service
+            spreadsheet_id (str): the spreadsheet id
+            drive_service (optional): googleapiclient Drive v3 service, enables version()
+                                      and revision(), so SheetReader can skip reads
+
+        Returns:
+            GoogleSheetsBackend
+
+        """
+        self.service = service
+        self.spreadsheet_id = spreadsheet_id
+        self.drive_service = drive_service
+        self._sheet_ids = None
+        self._writes = {}
+
+    def get_values(self, sheet: str) -> List[List]:
+        resp = self.service.spreadsheets().values().get(spreadsheetId=self.spreadsheet_id,
+                                                        range=sheet).execute()
+        return resp.get('values', [])
+
+    def batch_update(self, requests: List[Dict]) -> None:
+        # versions around the write tell revision() which version bumps are our own
+        before = self.version()
+        self.service.spreadsheets().batchUpdate(spreadsheetId=self.spreadsheet_id,
+                                                body={'requests': requests}).execute()
+        if before is not None:
+            titles = {v: k for k, v in (self._sheet_ids or {}).items()}
+            _record_write(self._writes, before, self.version(),
+                          [titles.get(i) for i in _request_sheet_ids(requests)])
+
+    def sheet_id(self, sheet: str) -> int:
+        if self._sheet_ids is None:
+            resp = self.service.spreadsheets().get(spreadsheetId=self.spreadsheet_id,
+                                                   fields='sheets.properties').execute()
+            self._sheet_ids = {s['properties']['title']: s['properties']['sheetId']
+                               for s in resp.get('sheets', [])}
+        return self._sheet_ids[sheet]
+
+    def version(self) -> Optional[str]:
+        """Spreadsheet version from Drive, None if there is no drive_service"""
+        if self.drive_service is None:
+            return None
+        return self.drive_service.files().get(fileId=self.spreadsheet_id, fields='version').execute()['version']
+
+    def revision(self, sheet: str) -> Optional[str]:
+        """Version at which sheet last may have changed, None if there is no drive_service
+
+        Writes by this backend to other sheets do not count. An edit by
+        hand while this backend is writing is counted as part of the
+        write, on whichever sheets the write touched.
+
+        """
+        return _revision(self._writes, self.version(), sheet)
+
+
+class FakeSheetsBackend:
+    """In-memory backend that applies batchUpdate requests and counts round trips"""
+
+    def __init__(self, sheets: Dict[str, Sequence[Sequence]] = None):
+        """Creates new instance
+
+        Args:
+            sheets (dict[str, list[list]], optional): sheet name to starting values
+
+        Returns:
+            FakeSheetsBackend
+
+        """
+        self.values = {}
+        self.backgrounds = {}
+        self.calls = []
+        self._version = 0
+        self._sheet_ids = {}
+        self._writes = {}
+        for name, values in (sheets or {}).items():
+            self.set_values(name, values)
+
+    def set_values(self, sheet: str, values: Sequence[Sequence]) -> None:
+        """Replaces a sheet's values like an edit by hand, not counted as a call"""
+        self._sheet_ids.setdefault(sheet, len(self._sheet_ids))
+        self.values[sheet] = [[_cell(v) for v in row] for row in values]
+        self.backgrounds.setdefault(sheet, {})
+        self._version += 1
+
+    def get_values(self, sheet: str) -> List[List[str]]:
+        self.calls.append(('get_values', sheet))
+        return _grid(self.values.get(sheet, []))
+
+    def sheet_id(self, sheet: str) -> int:
+        if sheet not in self._sheet_ids:
+            self.set_values(sheet, [])
+        return self._sheet_ids[sheet]
+
+    def version(self) -> str:
+        self.calls.append(('version', None))
+        return str(self._version)
+
+    def revision(self, sheet: str) -> str:
+        return _revision(self._writes, self.version(), sheet)
+
+    def batch_update(self, requests: List[Dict]) -> None:
+        self.calls.append(('batch_update', len(requests)))
+        names = {v: k for k, v in self._sheet_ids.items()}
+        for req in requests:
+            if 'updateCells' in req:
+                start = req['updateCells']['start']
+                grid = self.values[names[start['sheetId']]]
+                for r, row in enumerate(req['updateCells']['rows'], start['rowIndex']):
+                    while len(grid) <= r:
+                        grid.append([])
+                    for c, cell in enumerate(row['values'], start['columnIndex']):
+                        while len(grid[r]) <= c:
+                            grid[r].append('')
+                        grid[r][c] = _cell(next(iter(cell.get('userEnteredValue', {'': ''}).values())))
+            elif 'repeatCell' in req:
+                rng = req['repeatCell']['range']
+                color = req['repeatCell']['cell']['userEnteredFormat']['backgroundColor']
+                for r in range(rng['startRowIndex'], rng['endRowIndex']):
+                    self.backgrounds[names[rng['sheetId']]][r] = color
+            elif 'autoResizeDimensions' not in req:
+                raise ValueError(f'Unsupported request: {list(req)}')
+        self._version += 1
+        _record_write(self._writes, str(self._version - 1), str(self._version),
+                      [names[i] for i in _request_sheet_ids(requests)])
+
+
+class SheetReader:
+    """Reads a sheet, reusing the last read while the backend's revision of it is unchanged
+
+    The revision comes from the spreadsheet version, so a
+    GoogleSheetsBackend without a drive_service reads every time.
+
+    """
+
+    def __init__(self, backend, sheet: str):
+        """Creates new instance
+
+        Args:
+            backend: GoogleSheetsBackend or FakeSheetsBackend
+            sheet (str): the sheet name
+
+        Returns:
+            SheetReader
+
+        """
+        self.backend = backend
+        self.sheet = sheet
+        self._revision = None
+        self._values = None
+
+    def read(self) -> Tuple[List[List[str]], bool]:
+        """Values of the sheet
+
+        Returns:
+            tuple: list[list[str]] of rows, True if they differ from the last read
+
+        """
+        revision = self.backend.revision(self.sheet)
+        if revision is not None and revision == self._revision:
+            return self._values, False
+        values = _grid(self.backend.get_values(self.sheet))
+        changed = values != self._values
+        self._revision, self._values = revision, values
+        return values, changed
+
+    def records(self) -> Tuple[List[Dict[str, str]], bool]:
+        """Rows as dicts keyed by the stripped header row, and the changed flag"""
+        values, changed = self.read()
+        if not values:
+            return [], changed
+        headers = [h.strip() for h in values[0]]
+        return [dict(zip(headers, row + [''] * (len(headers) - len(row)))) for row in values[1:]], changed
+
+
+class SheetPublisher:
+    """Writes a table to a sheet, sending only what changed since the last write"""
+
+    def __init__(self, backend, sheet: str, autoresize: bool = True):
+        """Creates new instance
+
+        Args:
+            backend: GoogleSheetsBackend or FakeSheetsBackend
+            sheet (str): the sheet name
+            autoresize (bool, optional): resize rows and columns after a change
+
+        Returns:
+            SheetPublisher
+
+        """
+        logging.getLogger(__name__).addHandler(logging.NullHandler())
+        self.backend = backend
+        self.sheet = sheet
+        self.autoresize = autoresize
+        # last values written and their width, None until the first publish
+        self._last = None
+        self._width = None
+
+    def _diff(self, sheet_id, old, new):
+        """updateCells requests for each run of changed cells in a row"""
+        requests, n_cells = [], 0
+        for r in range(max(len(old), len(new))):
+            before = old[r] if r < len(old) else []
+            after = new[r] if r < len(new) else []
+            width = max(len(before), len(after))
+            changed = [c for c in range(width)
+                       if (before[c] if c < len(before) else '') != (_cell(after[c]) if c < len(after) else '')]
+            runs = []
+            for c in changed:
+                if runs and runs[-1][1] == c:
+                    runs[-1][1] = c + 1
+                else:
+                    runs.append([c, c + 1])
+            for start, end in runs:
+                cells = [_value(after[c] if c < len(after) else None) for c in range(start, end)]
+                requests.append({'updateCells': {
+                    'start': {'sheetId': sheet_id, 'rowIndex': r, 'columnIndex': start},
+                    'rows': [{'values': cells}], 'fields': 'userEnteredValue'}})
+                n_cells += end - start
+        return requests, n_cells
+
+    def publish(self, values: Sequence[Sequence]) -> Dict[str, int]:
+        """Writes the table, the first row is the header
+
+        Args:
+            values (list[list]): the rows
+
+        Returns:
+            dict: requests sent and cells written, both 0 if nothing changed
+
+        """
+        # the first write diffs against what is on the sheet now
+        if self._last is None:
+            self._last = _grid(self.backend.get_values(self.sheet))
+        old, new = self._last, [list(row) for row in values]
+        sheet_id = self.backend.sheet_id(self.sheet)
+        requests, n_cells = self._diff(sheet_id, old, new)
+
+        # banding only changes for rows between the old and new row counts,
+        # unless the width changed or the old formatting is unknown
+        grid = _grid(new)
+        n_old, n_new = len(old), len(grid)
+        width = max([len(row) for row in grid] or [0])
+        old_width = max([len(row) for row in old] or [0]) if self._width is None else self._width
+        first = 0 if self._width != width else min(n_old, n_new)
+        for r in range(first, max(n_old, n_new)):
+            requests.append({'repeatCell': {
+                'range': {'sheetId': sheet_id, 'startRowIndex': r, 'endRowIndex': r + 1,
+                          'startColumnIndex': 0, 'endColumnIndex': max(width, old_width, 1)},
+                'cell': {'userEnteredFormat': {'backgroundColor': _color(_band(r, n_new))}},
+                'fields': 'userEnteredFormat.backgroundColor'}})
+        if n_cells and self.autoresize:
+            for dimension, end in (('COLUMNS', max(width, old_width)), ('ROWS', max(n_old, n_new))):
+                requests.append({'autoResizeDimensions': {'dimensions': {
+                    'sheetId': sheet_id, 'dimension': dimension, 'startIndex': 0, 'endIndex': end}}})
+
+        if requests:
+            self.backend.batch_update(requests)
+        self._last, self._width = grid, width
+        logging.getLogger(__name__).debug('published %s cells of %s in %s requests',
+                                          n_cells, self.sheet, len(requests))
+        return {'requests': len(requests), 'cells': n_cells}
@@ -0,0 +1,135 @@
+"""
+stats.py
+phase timings and solver statistics
+
+A SolveStats collects one dict per pipeline phase with its wall time
+and whatever the phase knows, e.g. variable and constraint counts or
+the CBC status, objective, bound, gap and time to first incumbent.
+A callback gets each phase as it finishes, so it can be sent to
+a metrics system.
+
+"""
+from contextlib import contextmanager
+import re
+import time
+from typing import Callable, Dict, List, Optional
+
+
+RESULT_RE = re.compile(r'^Result - (.+)$', re.M)
+OBJECTIVE_RE = re.compile(r'^Objective value:\s+(\S+)', re.M)
+BOUND_RE = re.compile(r'^Lower bound:\s+(\S+)', re.M)
+GAP_RE = re.compile(r'^Gap:\s+(\S+)', re.M)
+NODES_RE = re.compile(r'^Enumerated nodes:\s+(\d+)', re.M)
+INCUMBENT_RE = re.compile(r'solution of (\S+) found .*\(([\d.]+) seconds\)')
+
+
+class SolveStats:
+    """Phase timings and solver statistics of one schedule"""
+
+    def __init__(self, callback: Optional[Callable[[dict], None]] = None):
+        """Creates new instance
+
+        Args:
+            callback (Callable, optional): called with each phase dict as it finishes
+
+        Returns:
+            SolveStats
+
+        """
+        self.callback = callback
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name: str, **info):
+        """Times a block, the yielded dict is filled in by the block
+
+        Args:
+            name (str): the phase name
+            **info: values known before the block runs
+
+        Yields:
+            dict: the phase record
+
+        """
+        rec = {'name': name, **info}
+        start = time.perf_counter()
+        try:
+            yield rec
+        finally:
+            rec['seconds'] = time.perf_counter() - start
+            self.phases.append(rec)
+            if self.callback:
+                self.callback(rec)
+
+    def extend(self, phases: List[dict]) -> None:
+        """Adds phases recorded elsewhere, e.g. in a job process, and passes each to the callback"""
+        for rec in phases:
+            self.phases.append(rec)
+            if self.callback:
+                self.callback(rec)
+
+    def __getitem__(self, name: str) -> dict:
+        for rec in reversed(self.phases):
+            if rec['name'] == name:
+                return rec
+        raise KeyError(name)
+
+    def __contains__(self, name: str) -> bool:
+        return any(rec['name'] == name for rec in self.phases)
+
+    @property
+    def seconds(self) -> float:
+        return sum(rec['seconds'] for rec in self.phases)
+
+    def to_dict(self) -> Dict:
+        return {'seconds': self.seconds, 'phases': [dict(rec) for rec in self.phases]}
+
+    def __repr__(self):
+        return 'SolveStats({})'.format(', '.join(f"{rec['name']}={rec['seconds']:.3f}s"
+                                                  for rec in self.phases))
+
+
+@contextmanager
+def phase(stats: Optional[SolveStats], name: str, **info):
+    """Same as stats.phase, does nothing but yield a dict if stats is None"""
+    if stats is None:
+        yield dict(info)
+    else:
+        with stats.phase(name, **info) as rec:
+            yield rec
+
+
+def _float(value):
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def cbc_log_stats(log_path: str) -> Dict:
+    """Reads result, objective, bound, gap and incumbents from a CBC log
+
+    Args:
+        log_path (str): path to the log
+
+    Returns:
+        dict: keys result, objective, bound, gap, nodes, first_incumbent (seconds),
+              incumbents (count) and incumbent_times ((seconds, objective) of each incumbent)
+
+    """
+    with open(log_path) as f:
+        log = f.read()
+    incumbents: List[tuple] = [(float(t), float(obj)) for obj, t in INCUMBENT_RE.findall(log)]
+    d = {'result': None, 'objective': None, 'bound': None, 'gap': None, 'nodes': None,
+         'first_incumbent': incumbents[0][0] if incumbents else None,
+         'incumbents': len(incumbents), 'incumbent_times': incumbents}
+    for key, regex, cast in (('result', RESULT_RE, str.strip), ('objective', OBJECTIVE_RE, _float),
+                             ('bound', BOUND_RE, _float), ('gap', GAP_RE, _float),
+                             ('nodes', NODES_RE, int)):
+        match = regex.search(log)
+        if match:
+            d[key] = cast(match.group(1))
+    # CBC only prints the bound when it stopped early
+    if d['bound'] is None and d['result'] and d['result'].startswith('Optimal'):
+        d['bound'], d['gap'] = d['objective'], 0.0
+    return d
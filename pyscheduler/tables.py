@@ -0,0 +1,213 @@
+"""
+tables.py
+precomputed legal-game tables per roster size
+
+The legal games of a roster only depend on its number of players, so
+they are enumerated once per size instead of once per call. The table
+for n players holds the games array that legal_games(team_array(n))
+returns. Tables are saved as .npy files and opened with
+np.load(mmap_mode='r'), so every process that opens one shares the same
+read-only pages from the page cache.
+
+Tables are only written when asked to. Precompute them with
+    python -m pyscheduler.tables --max-players 32
+which writes to PYSCHEDULER_TABLE_DIR, or pyscheduler/tables in the user
+cache directory. Setting PYSCHEDULER_TABLE_DIR, or passing a path to
+GameTables, also writes missing tables on first use. Otherwise sizes
+that were not precomputed are built in memory and nothing is written.
+
+Partner and opponent pair incidence is deliberately not stored. The
+rounds model and presolve bucket pairs per Game key after presolve and
+thresh filtering, so a table over every legal game would not be read.
+
+"""
+import argparse
+import logging
+import os
+from pathlib import Path
+import tempfile
+from typing import Dict, List, Union
+
+import numpy as np
+
+from .games import ID_DTYPE, legal_games, team_array
+
+# bump when the table layout changes so older files are not reused
+TABLE_VERSION = 1
+# tables up to this size are written on first use, if writing is enabled
+MAX_PLAYERS = 32
+TABLE_NAMES = ('games',)
+
+
+def default_dir() -> Path:
+    """PYSCHEDULER_TABLE_DIR, or pyscheduler/tables in the user cache directory"""
+    if os.environ.get('PYSCHEDULER_TABLE_DIR'):
+        return Path(os.environ['PYSCHEDULER_TABLE_DIR'])
+    cache = os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+    return Path(cache) / 'pyscheduler' / 'tables'
+
+
+def build_table(n_players: int) -> Dict[str, np.ndarray]:
+    """Enumerates the tables of one roster size
+
+    Args:
+        n_players (int): number of players
+
+    Returns:
+        dict: games (n x 4) player ids
+
+    """
+    return {'games': legal_games(team_array(n_players))}
+
+
+class GameTables:
+    """Legal-game tables by roster size, saved as .npy files and memory-mapped"""
+
+    def __init__(self, path: Union[str, Path] = None, max_players: int = MAX_PLAYERS,
+                 write: bool = None):
+        """Creates new instance
+
+        Args:
+            path (Union[str, Path], optional): table directory, default default_dir()
+            max_players (int, optional): larger tables are only used if precomputed,
+                                         otherwise built in memory
+            write (bool, optional): write missing tables on first use, default True
+                                    if path or PYSCHEDULER_TABLE_DIR is given
+
+        Returns:
+            GameTables
+
+        """
+        logging.getLogger(__name__).addHandler(logging.NullHandler())
+        self.path = Path(path) if path else default_dir()
+        self.max_players = max_players
+        self.write = bool(path or os.environ.get('PYSCHEDULER_TABLE_DIR')) if write is None else write
+        self._tables = {}
+
+    def file(self, n_players: int, name: str) -> Path:
+        return self.path / f'v{TABLE_VERSION}' / f'{name}_{n_players}.npy'
+
+    def exists(self, n_players: int) -> bool:
+        return all(self.file(n_players, name).exists() for name in TABLE_NAMES)
+
+    def save(self, n_players: int) -> Dict[str, np.ndarray]:
+        """Builds and writes the tables of one roster size
+
+        Each file is written to a temporary name and renamed into place,
+        so a process opening it never sees a partial table.
+
+        Args:
+            n_players (int): number of players
+
+        Returns:
+            dict: the tables, see build_table
+
+        """
+        tables = build_table(n_players)
+        folder = self.file(n_players, 'games').parent
+        folder.mkdir(parents=True, exist_ok=True)
+        for name, arr in tables.items():
+            fd, tmp = tempfile.mkstemp(suffix='.npy', dir=folder)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    np.save(f, arr)
+                os.replace(tmp, self.file(n_players, name))
+            except BaseException:
+                os.remove(tmp)
+                raise
+        return tables
+
+    def precompute(self, max_players: int = None, overwrite: bool = False) -> List[int]:
+        """Writes the tables of every roster size from 4 to max_players
+
+        Args:
+            max_players (int, optional): default self.max_players
+            overwrite (bool, optional): rewrite tables that already exist
+
+        Returns:
+            list[int]: the roster sizes written
+
+        """
+        written = []
+        for n_players in range(4, (max_players or self.max_players) + 1):
+            if overwrite or not self.exists(n_players):
+                self.save(n_players)
+                written.append(n_players)
+        return written
+
+    def table(self, n_players: int) -> Dict[str, np.ndarray]:
+        """The tables of one roster size, read-only
+
+        Opened tables are kept for the life of the instance. If write is
+        set, a missing table up to max_players is written first. A table
+        that was not written, because writing is off, the directory cannot
+        be written or the roster is larger, is built in memory.
+
+        Args:
+            n_players (int): number of players
+
+        Returns:
+            dict: games array, see build_table
+
+        """
+        if n_players not in self._tables:
+            tables = None
+            # mmap cannot open the empty tables of fewer than 4 players
+            if n_players >= 4:
+                try:
+                    if self.write and not self.exists(n_players) and n_players <= self.max_players:
+                        self.save(n_players)
+                    if self.exists(n_players):
+                        tables = {name: np.asarray(np.load(self.file(n_players, name), mmap_mode='r'))
+                                  for name in TABLE_NAMES}
+                except (OSError, ValueError) as e:
+                    logging.getLogger(__name__).warning('Game tables for %s players not shared: %s',
+                                                        n_players, e)
+            if tables is None:
+                tables = build_table(n_players)
+                for arr in tables.values():
+                    arr.flags.writeable = False
+            self._tables[n_players] = tables
+        return self._tables[n_players]
+
+    def games(self, n_players: int) -> np.ndarray:
+        """Legal games of a roster, same rows as legal_games(team_array(n_players))"""
+        return self.table(n_players)['games']
+
+
+TABLES = GameTables()
+
+
+def lookup_games(teams: np.ndarray, tables: GameTables = None) -> np.ndarray:
+    """legal_games(teams), read from the tables when teams are every team of a roster
+
+    Args:
+        teams (np.ndarray): (n_teams x 2) array of player ids
+        tables (GameTables, optional): default TABLES
+
+    Returns:
+        np.ndarray: (n_games x 4) array of player ids, read-only
+
+    """
+    teams = np.asarray(teams, dtype=ID_DTYPE).reshape(-1, 2)
+    n_players = int(teams.max()) + 1 if len(teams) else 0
+    if len(teams) == n_players * (n_players - 1) // 2 and np.array_equal(teams, team_array(n_players)):
+        return (tables or TABLES).games(n_players)
+    return legal_games(teams)
+
+
+def main(argv: List[str] = None) -> None:
+    """Precomputes game tables, the pyscheduler-tables console script"""
+    parser = argparse.ArgumentParser(description='precompute legal-game tables')
+    parser.add_argument('--max-players', type=int, default=MAX_PLAYERS)
+    parser.add_argument('--dir', help='table directory, default PYSCHEDULER_TABLE_DIR or the user cache')
+    parser.add_argument('--overwrite', action='store_true')
+    args = parser.parse_args(argv)
+    tables = GameTables(args.dir, args.max_players)
+    written = tables.precompute(overwrite=args.overwrite)
+    size = sum(f.stat().st_size for f in tables.file(4, 'games').parent.glob('*.npy'))
+    print(f'wrote {len(written)} roster sizes to {tables.file(4, "games").parent} ({size / 1e6:.1f} MB)')
+
+
+if __name__ == '__main__':
+    main()
@@ -18,6 +18,9 @@ def run():
           author_email="eric@erictruett.com",
           license="MIT",
           packages=find_packages(),
+          entry_points={"console_scripts": ["pyscheduler-batch = pyscheduler.batch:main",
+                                            "pyscheduler-tables = pyscheduler.tables:main"]},
+          extras_require={"cpsat": ["ortools"]},
           zip_safe=False)
 
 
@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+from collections import Counter
 from pathlib import Path
 import sys
 
@@ -7,6 +8,53 @@ import pytest
 sys.path.append("../pyscheduler")
 
 
+LEAGUE = {
+    'Mark': 4.2,
+    'Bev': 3.9,
+    'Jeff': 3.7,
+    'Peter S': 5.0,
+    'Kimber': 3.9,
+    'Eric': 4.5,
+    'Erik': 4.4,
+    'Charlie': 4.3
+}
+
+
+def _check_schedule(sched, players, n_games, partner_cap=1, opponent_cap=2):
+    """Asserts every player plays once per game_number and no pair goes over its cap"""
+    assert len(sched) == n_games * len(players) // 4
+    partners, opponents = Counter(), Counter()
+    for game_number in range(1, n_games + 1):
+        games = sched.round(game_number)
+        assert sorted(p for t1, t2 in games for p in t1 + t2) == sorted(players)
+        for t1, t2 in games:
+            partners.update([frozenset(t1), frozenset(t2)])
+            opponents.update(frozenset((a, b)) for a in t1 for b in t2)
+    assert max(partners.values()) <= partner_cap
+    assert max(opponents.values()) <= opponent_cap
+
+
+@pytest.fixture
+def league():
+    """8 players and their ratings"""
+    return dict(LEAGUE)
+
+
+@pytest.fixture
+def check_schedule():
+    """Validates a Schedule, see _check_schedule"""
+    return _check_schedule
+
+
+@pytest.fixture(scope="session", autouse=True)
+def game_tables(tmp_path_factory):
+    """Keeps game tables written by the tests out of the user cache"""
+    from pyscheduler import tables
+    tables.TABLES.path = tmp_path_factory.mktemp("tables")
+    tables.TABLES.write = True
+    return tables.TABLES
+
+
 @pytest.fixture(scope="session", autouse=True)
 def root_directory(request):
     """Gets root directory"""
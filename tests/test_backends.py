@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+# tests/test_backends.py
+from collections import Counter
+
+import pulp
+import pytest
+
+from pyscheduler import pyscheduler
+from pyscheduler.backends import CpSatBackend, PulpBackend, get_backend
+from pyscheduler.games import game_keys, legal_games, team_array
+from pyscheduler.stats import SolveStats
+
+
+DATA = {
+    'Mark': 4.2,
+    'Bev': 3.9,
+    'Jeff': 3.7,
+    'Peter S': 5.0,
+    'Kimber': 3.9,
+    'Eric': 4.5,
+    'Erik': 4.4,
+    'Charlie': 4.3
+}
+N_GAMES = 2
+
+
+@pytest.fixture
+def model():
+    """Builds the rounds model of DATA"""
+    games = legal_games(team_array(len(DATA)))
+    game_combos = game_keys(games, N_GAMES)
+    game_scores = pyscheduler._matchup_scores(games, list(DATA.values()))
+    return pyscheduler._schedule_model(game_combos, game_scores, list(range(len(DATA))), N_GAMES)
+
+
+def _check(chosen):
+    """Asserts every player plays once per game_number"""
+    assert len(chosen) == N_GAMES * len(DATA) // 4
+    for game_number in range(1, N_GAMES + 1):
+        players = Counter(p for g in chosen if g.game_number == game_number for p in g.players)
+        assert set(players) == set(range(len(DATA))) and set(players.values()) == {1}
+
+
+def test_get_backend():
+    """Tests backends are created by name"""
+    assert isinstance(get_backend('cbc'), PulpBackend)
+    assert get_backend('cpsat', time_limit=5).time_limit == 5
+    with pytest.raises(ValueError):
+        get_backend('other')
+
+
+def test_pulp_backend(model):
+    """Tests the CBC backend solves the model and records the solve"""
+    stats = SolveStats()
+    backend = PulpBackend(pulp.getSolver('PULP_CBC_CMD', msg=False, timeLimit=30))
+    status, objective, chosen = backend.solve(model, stats=stats)
+    assert status == 'optimal'
+    _check(chosen)
+    assert objective == pytest.approx(model.objective(chosen))
+    assert stats['solve']['backend'] == 'cbc' and stats['solve']['n_vars'] == model.n_vars
+
+
+def test_make_schedule_backend(tmp_path):
+    """Tests make_schedule takes a backend in place of a pulp solver"""
+    backend = PulpBackend(pulp.getSolver('PULP_CBC_CMD', msg=False, timeLimit=30))
+    stats = SolveStats()
+    sched = pyscheduler.make_schedule(DATA, N_GAMES, backend, warm_start=True, stats=stats)
+    assert len(sched) == N_GAMES * len(DATA) // 4
+    assert [rec['name'] for rec in stats.phases][-4:] == ['build', 'warm_start', 'solve', 'extract']
+    assert backend.solver.optionsDict['warmStart'] is False
+    with pytest.raises(ValueError):
+        pyscheduler.make_schedule(DATA, N_GAMES, backend, model_dir=tmp_path)
+
+
+def test_cpsat_backend(model):
+    """Tests CP-SAT finds the same optimum as CBC"""
+    pytest.importorskip('ortools')
+    status, objective, chosen = CpSatBackend(time_limit=30, workers=2, seed=0).solve(model)
+    assert status == 'optimal'
+    _check(chosen)
+    cbc = PulpBackend(pulp.getSolver('PULP_CBC_CMD', msg=False, timeLimit=30)).solve(model)
+    assert objective == pytest.approx(cbc[1])
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+# tests/test_batch.py
+from collections import Counter
+import json
+
+import pytest
+
+from pyscheduler import batch
+
+
+DATA = {
+    'Mark': 4.2,
+    'Bev': 3.9,
+    'Jeff': 3.7,
+    'Peter S': 5.0,
+    'Kimber': 3.9,
+    'Eric': 4.5,
+    'Erik': 4.4,
+    'Charlie': 4.3
+}
+
+
+def test_load_jobs(tmp_path):
+    """Tests csv rows are grouped by league and defaults are filled in"""
+    fn = tmp_path / 'leagues.csv'
+    fn.write_text('league,player,rating\n' + ''.join(f'{league},{k},{v}\n' for league in ('a', 'b')
+                                                     for k, v in DATA.items()))
+    jobs = batch.load_jobs(str(fn), 2, {'solver': 'anneal'})
+    assert [job['id'] for job in jobs] == ['a', 'b']
+    assert jobs[0]['players'] == DATA and jobs[0]['n_games'] == 2
+    assert jobs[0]['settings'] == {'solver': 'anneal'}
+
+
+def test_batch_schedule():
+    """Tests a failing and a timed out job do not stop the others"""
+    big = {f'{k}{idx}': v for idx in range(2) for k, v in DATA.items()}
+    jobs = [{'id': 'ok', 'players': DATA, 'n_games': 2, 'settings': {'solver': 'anneal', 'seed': 0}},
+            {'id': 'bad', 'players': DATA},
+            {'id': 'slow', 'players': big, 'n_games': 10, 'settings': {'time_limit': 0}},
+            {'id': 'cbc', 'players': DATA, 'n_games': 2}]
+    results = {rec['id']: rec for rec in batch.batch_schedule(jobs, processes=2, time_limit=10, grace=.5)}
+    assert set(results) == {'ok', 'bad', 'slow', 'cbc'}
+    assert results['bad']['status'].startswith('error')
+    assert results['slow']['status'] == 'timeout'
+    for job_id in ('ok', 'cbc'):
+        assert results[job_id]['status'] == 'ok'
+        counts = Counter(p for t1, t2, _ in results[job_id]['games'] for p in t1 + t2)
+        assert set(counts) == set(DATA) and set(counts.values()) == {2}
+    json.dumps(results)
+    with pytest.raises(ValueError):
+        list(batch.batch_schedule([jobs[0], jobs[0]]))
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+# tests/test_cache.py
+import os
+import time
+
+from pyscheduler.cache import ScheduleCache, schedule_key
+
+
+PLAYERS = {'Al': 4.0, 'Beth': 3.5, 'Chris': 4.5, 'Debbie': 3.0}
+COMBOS = [(('Al', 'Debbie'), ('Beth', 'Chris'), 1), (('Al', 'Beth'), ('Chris', 'Debbie'), 2)]
+
+
+def test_schedule_key():
+    """Tests key ignores roster order but not ratings or settings"""
+    key = schedule_key(PLAYERS, 2, thresh=.25)
+    assert key == schedule_key(dict(reversed(list(PLAYERS.items()))), 2, thresh=.25)
+    assert key != schedule_key({**PLAYERS, 'Al': 4.1}, 2, thresh=.25)
+    assert key != schedule_key(PLAYERS, 3, thresh=.25)
+    assert key != schedule_key(PLAYERS, 2, thresh=.5)
+
+
+def test_memory_lru():
+    """Tests least recently used entry is dropped"""
+    cache = ScheduleCache(maxsize=2)
+    cache.put('a', COMBOS)
+    cache.put('b', COMBOS)
+    assert cache.get('a') == COMBOS
+    cache.put('c', COMBOS)
+    assert cache.get('b') is None
+    assert cache.get('a') == COMBOS
+
+
+def test_disk_layer(tmp_path):
+    """Tests entries survive a new instance and are evicted by size"""
+    cache = ScheduleCache(tmp_path)
+    cache.put('a', COMBOS)
+    assert ScheduleCache(tmp_path).get('a') == COMBOS
+
+    size = os.path.getsize(tmp_path / 'a.json')
+    cache = ScheduleCache(tmp_path, max_bytes=2 * size)
+    past = time.time() - 100
+    os.utime(tmp_path / 'a.json', (past, past))
+    cache.put('b', COMBOS)
+    cache.put('c', COMBOS)
+    assert not (tmp_path / 'a.json').exists()
+    assert 'b' in cache and ScheduleCache(tmp_path).get('c') == COMBOS
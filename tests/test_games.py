@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+# tests/test_games.py
+import itertools
+
+import numpy as np
+import pytest
+
+from pyscheduler import games
+
+
+@pytest.mark.parametrize('n_players', [4, 5, 8, 13])
+def test_legal_games(n_players):
+    """Tests legal games match set-based enumeration"""
+    teams = games.team_array(n_players)
+    gc = games.legal_games(teams)
+    expected = [t1 + t2 for t1, t2 in itertools.combinations(itertools.combinations(range(n_players), 2), 2)
+                if not set(t1) & set(t2)]
+    assert gc.shape == (len(expected), 4)
+    assert [tuple(row) for row in gc.tolist()] == expected
+
+
+def test_encode_decode():
+    """Tests names survive the integer encoding"""
+    team_combos = list(itertools.combinations(['Al', 'Beth', 'Chris', 'Debbie', 'Eric'], 2))
+    names, teams = games.encode_teams(team_combos)
+    assert names == ['Al', 'Beth', 'Chris', 'Debbie', 'Eric']
+    assert np.array_equal(teams, games.team_array(5))
+    decoded = games.decode_games(games.legal_games(teams), names)
+    assert decoded[0] == (('Al', 'Beth'), ('Chris', 'Debbie'))
+    assert len(decoded) == 15
+
+
+@pytest.mark.parametrize('method,thresh', [('diff', .25), ('diff', 0), ('gap', .5)])
+def test_games_within(method, thresh):
+    """Tests threshold enumeration matches scoring then filtering every legal game"""
+    ratings = np.random.default_rng(0).choice(np.arange(35, 51) / 10, 13)
+    gc = games.legal_games(games.team_array(13))
+    r = ratings[gc]
+    if method == 'diff':
+        scores = np.abs((r[:, 0] + r[:, 1]) - (r[:, 2] + r[:, 3]))
+    else:
+        scores = r.max(axis=1) - r.min(axis=1)
+    expected = sorted(tuple(row) for row in gc[scores <= thresh].tolist())
+    found = [tuple(row) for block in games.games_within(ratings, thresh, method) for row in block.tolist()]
+    assert sorted(found) == expected
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+# tests/test_imports.py
+import subprocess
+import sys
+
+
+def _loaded(code):
+    proc = subprocess.run([sys.executable, '-c', code + '\nimport sys\nprint(sorted(m for m in '
+                           '("numpy", "pandas", "pulp") if m in sys.modules))'],
+                          capture_output=True, text=True, check=True)
+    return proc.stdout.strip().splitlines()[-1]
+
+
+def test_lazy_imports():
+    """Tests the package and the light modules do not load pulp"""
+    assert _loaded('import pyscheduler, pyscheduler.cache, pyscheduler.jobs, pyscheduler.stats') == '[]'
+    assert _loaded('import pyscheduler.pyscheduler2') == "['numpy']"
+    # the CpSatBackend path only needs pulp to solve with CBC
+    assert _loaded('import pyscheduler.pyscheduler, pyscheduler.batch, pyscheduler.pods, '
+                   'pyscheduler.portfolio') == "['numpy']"
+    assert _loaded('import pyscheduler\npyscheduler.make_schedule') == "['numpy']"
+    # solving with the default CBC solver does
+    assert _loaded("import pyscheduler\npyscheduler.make_schedule(dict.fromkeys('abcd', 4.0), 1)"
+                   ) == "['numpy', 'pulp']"
+
+
+def test_star_import():
+    """Tests from pyscheduler import * still provides the module names"""
+    ns = {}
+    exec('from pyscheduler import *', ns)
+    assert {'make_schedule', 'presolve', 'np', 'itertools'} <= set(ns)
+    assert callable(ns['make_schedule'])
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+# tests/test_jobs.py
+import threading
+import time
+
+import pytest
+
+from pyscheduler import jobs
+
+
+@pytest.fixture
+def queue():
+    q = jobs.JobQueue(max_workers=1)
+    yield q
+    q.shutdown()
+
+
+def _wait(job, timeout=5):
+    """Blocks until a job is finished"""
+    for _ in range(timeout * 100):
+        if job.finished:
+            return job
+        threading.Event().wait(.01)
+    raise TimeoutError(job.id)
+
+
+def test_job_result(queue):
+    """Tests a job reports progress and its result"""
+    def fn(job, x):
+        job.update(progress='adding', objective=1.5)
+        return x + 1
+
+    job = _wait(queue.submit(fn, 1))
+    d = job.to_dict()
+    assert d['status'] == jobs.DONE and d['result'] == 2
+    assert d['progress'] == 'adding' and d['objective'] == 1.5
+    assert queue.get(job.id) is job
+
+
+def test_job_failed(queue):
+    """Tests an exception marks the job failed"""
+    def fn(job):
+        raise RuntimeError('boom')
+
+    job = _wait(queue.submit(fn))
+    assert job.status == jobs.FAILED and 'boom' in job.to_dict()['error']
+
+
+def test_supersede(queue):
+    """Tests a newer job in the same group cancels the older ones"""
+    started, release = threading.Event(), threading.Event()
+
+    def slow(job):
+        started.set()
+        release.wait(5)
+        job.update(progress='writing')
+        return 'stale'
+
+    first = queue.submit(slow, group='league')
+    started.wait(5)
+    queued = queue.submit(slow, group='league')
+    other = queue.submit(lambda job: 'other', group='other')
+    latest = queue.submit(lambda job: 'latest', group='league')
+    release.set()
+    assert _wait(first).status == jobs.CANCELLED
+    assert queued.status == jobs.CANCELLED
+    assert _wait(latest).result == 'latest'
+    assert _wait(other).status == jobs.DONE
+    assert not queue.cancel(latest.id)
+
+
+def test_best_objective(tmp_path):
+    """Tests the objective is read from the solver log"""
+    log = tmp_path / 'cbc.log'
+    log.write_text('Cbc0012I Integer solution of 4.2 found by DiveCoefficient after 0 iterations '
+                   'and 0 nodes (0.12 seconds)\n'
+                   'Cbc0004I Integer solution of 3.1 found after 88 iterations and 2 nodes (0.40 seconds)\n')
+    job = jobs.Job()
+    job.log_path = str(log)
+    assert job.best_objective() == pytest.approx(3.1)
+
+
+def test_run_process(queue):
+    """Tests a job gets the result of its child process"""
+    job = _wait(queue.submit(lambda job: job.run_process(pow, 2, 10)))
+    assert job.status == jobs.DONE and job.result == 1024
+    failed = _wait(queue.submit(lambda job: job.run_process(int, 'x')))
+    assert failed.status == jobs.FAILED and 'ValueError' in failed.error
+
+
+def test_cancel_kills_process(queue):
+    """Tests cancelling a job kills its child process instead of waiting for it"""
+    job = queue.submit(lambda job: job.run_process(time.sleep, 30))
+    while job._process is None:
+        threading.Event().wait(.01)
+    proc = job._process
+    start = time.monotonic()
+    assert queue.cancel(job.id)
+    assert _wait(job).status == jobs.CANCELLED
+    assert time.monotonic() - start < 5 and not proc.is_alive()
+    # the worker is free for the next job
+    assert _wait(queue.submit(lambda job: 'next')).result == 'next'
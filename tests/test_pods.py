@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+# tests/test_pods.py
+import numpy as np
+import pytest
+
+from pyscheduler import pods
+
+
+PLAYERS = {f'P{idx:02d}': float(r) for idx, r in
+           enumerate(np.random.default_rng(0).choice(np.arange(30, 51) / 10, 24))}
+
+
+def test_split_pods():
+    """Tests pods are rating tiers with sizes that are multiples of 4"""
+    split = pods.split_pods(PLAYERS, 8)
+    assert [len(p) for p in split] == [8, 8, 8]
+    assert min(split[0].values()) >= max(split[1].values())
+    assert [len(p) for p in pods.split_pods(PLAYERS, 12)] == [12, 12]
+    with pytest.raises(ValueError):
+        pods.split_pods(dict(list(PLAYERS.items())[:22]), 8)
+
+
+@pytest.mark.parametrize('mix', [False, True])
+def test_pod_schedule(mix, check_schedule):
+    """Tests merged pods give every player one game per round within the caps"""
+    sched = pods.pod_schedule(PLAYERS, 3, 8, time_limit=20, processes=2, mix=mix)
+    check_schedule(sched, PLAYERS, 3)
+
+
+def test_solve_pod_fallback(caplog):
+    """Tests a pod CBC cannot schedule falls back to local search and logs what it left"""
+    players = dict({f'P{idx}': 3.0 for idx in range(7)}, Star=9.0)
+    sched = pods._solve_pod(players, 2, 10, 2)
+    assert len(sched) == 2 * len(players) // 4
+    assert 'using local search' in caplog.text
+    # every game with Star is over the score cap, so local search cannot clear them
+    assert 'local search left' in caplog.text
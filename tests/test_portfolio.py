@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+# tests/test_portfolio.py
+import time
+
+import pytest
+
+from pyscheduler import portfolio
+
+
+MEMBERS = [
+    {'name': 'cbc', 'kind': 'cbc'},
+    {'name': 'anneal', 'kind': 'anneal', 'seed': 0, 'iterations': 5000},
+    {'name': 'greedy', 'kind': 'greedy', 'seed': 0},
+]
+
+
+def test_portfolio_schedule(league, check_schedule):
+    """Tests the winner is recorded and its schedule is valid"""
+    sched, report = portfolio.portfolio_schedule(league, 2, MEMBERS, time_limit=30, processes=2)
+    assert report['winner'] in {m['name'] for m in MEMBERS}
+    assert report['members'][report['winner']]['objective'] == report['objective']
+    assert set(report['members']) == {m['name'] for m in MEMBERS}
+    check_schedule(sched, league, 2)
+
+
+def test_portfolio_member_names(league):
+    """Tests duplicate member names are rejected"""
+    with pytest.raises(ValueError):
+        portfolio.portfolio_schedule(league, 2, MEMBERS + MEMBERS[:1])
+
+
+def test_portfolio_stops_on_optimal(league):
+    """Tests a proven optimal CBC run ends the race even when another member holds the best schedule"""
+    # equal ratings give every schedule objective 0, so greedy keeps the lead
+    players = dict.fromkeys(league, 4.0)
+    members = [{'name': 'greedy', 'kind': 'greedy', 'seed': 0},
+               {'name': 'cbc', 'kind': 'cbc'},
+               {'name': 'slow', 'kind': 'anneal', 'seed': 0, 'iterations': 10 ** 9}]
+    start = time.monotonic()
+    sched, report = portfolio.portfolio_schedule(players, 2, members, time_limit=60, processes=3)
+    assert time.monotonic() - start < 30
+    assert report['members']['cbc']['status'] == 'optimal'
+    assert report['winner'] == 'greedy' and report['members']['slow']['status'] == 'killed'
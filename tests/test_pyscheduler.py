@@ -1,11 +1,13 @@
 # -*- coding: utf-8 -*-
 # tests/test_pyscheduler.py
+from collections import Counter
 import numpy as np
 from numpy.random import default_rng
 import pulp
 import pytest
 
 from pyscheduler import pyscheduler
+from pyscheduler.games import game_keys, legal_games, team_array
 
 RNG = default_rng()
 N_GAMES = 5
@@ -59,4 +61,102 @@ def test_game_scores(game_combos):
     random_key = keys[RNG.choice(np.arange(len(keys)))]
     assert isinstance(random_key, tuple)
     value = gs[random_key]
-    assert isinstance(value, float)
\ No newline at end of file
+    assert isinstance(value, float)
+
+
+def test_matchup_scores():
+    """Tests each matchup is scored once with the same scores as every game combo"""
+    games = legal_games(team_array(len(DATA)))
+    ratings = list(DATA.values())
+    expected = pyscheduler._game_scores(game_keys(games, N_GAMES), ratings)
+    gs = pyscheduler._matchup_scores(games, ratings)
+    assert len(gs) == len(games) and gs.keys() == expected.keys()
+    assert all(gs[k] == pytest.approx(v) for k, v in expected.items())
+
+
+def test_game_combos_within():
+    """Tests threshold game combos match filtering every game combo"""
+    team_combos = list(pulp.combination(DATA.keys(), 2))
+    gs = pyscheduler._game_scores(pyscheduler._game_combos(team_combos, N_GAMES), DATA)
+    expected = {k: v for k, v in gs.items() if v <= .25}
+    gc, valid = pyscheduler._game_combos_within(DATA, N_GAMES, .25)
+    assert valid.keys() == expected.keys()
+    assert len(gc) == len(expected) * N_GAMES
+
+
+def test_build_problem_matches_scan():
+    """Tests indexed constraints match scanning every variable"""
+    p = list(DATA.keys())[:8]
+    team_combos = list(pulp.combination(p, 2))
+    game_combos = pyscheduler._game_combos(team_combos, 2)
+    game_scores = pyscheduler._game_scores(game_combos, DATA)
+    prob, gcvars = pyscheduler._build_problem(game_combos, game_scores, p, 2)
+
+    expected = []
+    for player in p:
+        for game_number in (1, 2):
+            expected.append([v for k, v in gcvars.items()
+                             if (player in k[0] or player in k[1]) and k[2] == game_number])
+    # pair rows are only kept when the pair has more games than its cap
+    for player, pplayer in pulp.combination(p, 2):
+        partners = [v for k, v in gcvars.items()
+                    if (player in k[0] and pplayer in k[0]) or
+                    (player in k[1] and pplayer in k[1])]
+        opponents = [v for k, v in gcvars.items()
+                     if (player in k[0] and pplayer in k[1]) or
+                     (player in k[1] and pplayer in k[0])]
+        expected += [vs for vs, cap in ((partners, 1), (opponents, 2)) if len(vs) > cap]
+
+    constraints = list(prob.constraints.values())
+    assert len(constraints) == len(expected)
+    for c, e in zip(constraints, expected):
+        assert [v.name for v in c.keys()] == [v.name for v in e]
+    # game scores > 1 are bounds, not rows
+    assert all((v.upBound == 0) == (game_scores[(k[0], k[1])] > 1) for k, v in gcvars.items())
+
+
+def test_presolve():
+    """Tests presolve drops high scores, played pairs and games ruled out by forced ones"""
+    p = list(DATA.keys())[:8]
+    game_combos = pyscheduler._game_combos(list(pulp.combination(p, 2)), 2)
+    game_scores = pyscheduler._game_scores(game_combos, DATA)
+    kept, report = pyscheduler.presolve(game_combos, game_scores, p, 2)
+    assert report['removed_score'] == sum(game_scores[(k[0], k[1])] > 1 for k in game_combos)
+    assert report['n_after'] == len(kept) and not report['infeasible']
+
+    # one legal game left for Mark in game_number 1 forces it
+    t1, t2 = ('Mark', 'Bev'), ('Jeff', 'Kimber')
+    only = [gc for gc in game_combos if gc[2] == 2 or 'Mark' not in gc[0] + gc[1] or gc[:2] == (t1, t2)]
+    kept, report = pyscheduler.presolve(only, dict.fromkeys(game_scores, 0), p, 2)
+    assert report['n_forced'] >= 1 and (t1, t2, 1) in kept
+    for gc in kept:
+        players = set(gc[0] + gc[1])
+        if gc != (t1, t2, 1):
+            assert not (gc[2] == 1 and players & set(t1 + t2))
+            assert frozenset(t1) not in {frozenset(gc[0]), frozenset(gc[1])}
+
+    partners, opponents = Counter([frozenset(t1)]), Counter()
+    kept, report = pyscheduler.presolve(game_combos, game_scores, p, 2, played=(partners, opponents))
+    assert report['removed_played'] and all(frozenset(t1) not in map(frozenset, gc[:2]) for gc in kept)
+
+
+def test_greedy_schedule():
+    """Tests greedy schedule is complete and respects the caps"""
+    p = list(DATA.keys())[:12]
+    game_combos = pyscheduler._game_combos(list(pulp.combination(p, 2)), 3)
+    game_scores = pyscheduler._game_scores(game_combos, DATA)
+    games = pyscheduler._greedy_schedule(game_combos, game_scores, p, 3)
+    assert len(games) == 9
+    for game_number in (1, 2, 3):
+        players = [x for gc in games if gc[2] == game_number for x in gc[0] + gc[1]]
+        assert sorted(players) == sorted(p)
+    partners = [frozenset(t) for gc in games for t in gc[:2]]
+    assert len(partners) == len(set(partners))
+
+
+def test_incumbent_times(tmp_path):
+    """Tests reading incumbents from a CBC log"""
+    log = tmp_path / 'cbc.log'
+    log.write_text('Cbc0012I Integer solution of 3.4 found by DiveCoefficient after 12 '
+                   'iterations and 0 nodes (3.49 seconds)\n')
+    assert pyscheduler._incumbent_times(log) == [(3.49, 3.4)]
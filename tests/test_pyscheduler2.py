@@ -1,12 +1,15 @@
 # -*- coding: utf-8 -*-
 # tests/test_pyscheduler.py
+from collections import Counter
+from collections.abc import Mapping
 from copy import deepcopy
 import numpy as np
 from numpy.random import default_rng
 import pulp
 import pytest
 
-from pyscheduler import pyscheduler2
+from pyscheduler import pyscheduler2, search
+from pyscheduler.stats import SolveStats
 
 
 RNG = default_rng()
@@ -63,9 +66,99 @@ def test_game_scores(o, game_combos):
     o2 = deepcopy(o)
     o2._game_combos = game_combos
     gs = o2.game_scores
-    assert isinstance(gs, dict)
+    assert isinstance(gs, Mapping)
     keys = list(gs.keys())
     random_key = keys[RNG.choice(np.arange(len(keys)))]
     assert isinstance(random_key, tuple)
     value = gs[random_key]
-    assert isinstance(value, float)
\ No newline at end of file
+    assert isinstance(value, float)
+
+
+@pytest.mark.parametrize('method', ['diff', 'gap'])
+def test_game_scores_per_round(o, method):
+    """Tests game scores are shared by every game_number"""
+    o.method = method
+    gs = o.game_scores
+    assert len(gs) == len(o.game_array) * N_GAMES
+    for t1, t2, gn in o.game_combos[:50]:
+        scores = [DATA[p] for p in t1 + t2]
+        if method == 'diff':
+            expected = abs(sum(scores[:2]) - sum(scores[2:]))
+        else:
+            expected = max(scores) - min(scores)
+        assert gs[(t1, t2, gn)] == pytest.approx(expected)
+    t1, t2, _ = o.game_combos[0]
+    assert (t1, t2, N_GAMES + 1) not in gs
+
+
+@pytest.mark.parametrize('method', ['diff', 'gap'])
+def test_thresh(o, method):
+    """Tests thresh keeps only games with score <= thresh"""
+    o.method = method
+    o2 = pyscheduler2.PyScheduler2(N_GAMES, DATA, method=method, thresh=.5)
+    expected = {gc for gc in o.game_combos if o.game_scores[gc] <= .5}
+    assert set(o2.game_combos) == expected
+    assert (o2.game_score_array <= .5).all()
+
+
+@pytest.mark.parametrize('method', ['diff', 'gap'])
+def test_solve(method):
+    """Tests local search schedule meets constraints"""
+    o = pyscheduler2.PyScheduler2(N_GAMES, DATA, method=method)
+    sched = o.solve(seed=0)
+    assert len(sched) == N_GAMES * len(DATA) // 4
+    partners, opponents = Counter(), Counter()
+    for game_number in sched.game_numbers:
+        games = sched.round(game_number)
+        assert sorted(p for t1, t2 in games for p in t1 + t2) == sorted(DATA)
+        for t1, t2 in games:
+            partners.update([frozenset(t1), frozenset(t2)])
+            opponents.update(frozenset((a, b)) for a in t1 for b in t2)
+    assert max(partners.values()) == 1
+    assert max(opponents.values()) <= 2
+
+
+def test_solve_thresh():
+    """Tests local search keeps every game score within thresh"""
+    o = pyscheduler2.PyScheduler2(N_GAMES, DATA, thresh=.25, stats=SolveStats())
+    sched = o.solve(seed=0)
+    assert o.stats['anneal']['violations'] == 0
+    scores = np.abs(np.diff(sched.team_scores(), axis=1))
+    assert (scores <= .25 + 1e-9).all()
+
+
+def test_solve_stats():
+    """Tests PyScheduler2 records a phase per computed step"""
+    o = pyscheduler2.PyScheduler2(N_GAMES, DATA, stats=SolveStats())
+    o.game_scores
+    sched = o.solve(iterations=1000, seed=0)
+    assert [rec['name'] for rec in sched.stats.phases] == ['game_array', 'game_scores', 'anneal']
+    assert sched.stats['game_array']['n_legal_games'] == len(o.game_array)
+
+
+def test_validate():
+    """Tests bitmask validation of a solved and a broken schedule"""
+    o = pyscheduler2.PyScheduler2(N_GAMES, DATA)
+    sched = o.solve(seed=0)
+    games = list(zip(sched.rounds.tolist(), sched.games.tolist()))
+    assert o.validate(games) == 0
+    # the same player twice in one game_number, another one missing
+    gn, (p1, p2, p3, p4) = games[0]
+    assert o.validate([(gn, (p1, p2, p3, p1))] + games[1:]) >= 2
+    history = pyscheduler2.PairHistory(len(DATA))
+    history.add((0, 1, 2, 3))
+    assert history.partnered(1, 0) == 1 and history.opposed(3, 0) == 1
+    assert not history.fits((0, 1, 4, 5)) and history.fits((0, 2, 4, 5))
+    history.add((0, 1, 2, 3), -1)
+    assert history.fits((0, 1, 4, 5)) and history.violations() == 0
+
+
+def test_pair_history_moves():
+    """Tests PairHistory reports the pairs a game pushes over or brings back within a cap"""
+    history = search.PairHistory(len(DATA))
+    assert history.add((0, 1, 2, 3)) == 0
+    assert history.add((0, 1, 4, 5)) == 1
+    assert history.add((0, 1, 4, 5), -1) == 1 and history.add((0, 1, 2, 3), -1) == 0
+    # removing a game that was never added leaves negative counts, not an error
+    assert history.add((6, 7, 8, 9), -1) == 0
+    assert history.add((6, 7, 8, 9)) == 0 and history.partnered(6, 7) == 0
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+# tests/test_report.py
+from collections import Counter
+import itertools
+
+import numpy as np
+
+from pyscheduler import report
+from pyscheduler.schedule import Schedule
+from pyscheduler.search import anneal
+
+
+RATINGS = [4.2, 3.9, 3.7, 5.0, 3.9, 4.5, 4.4, 4.3]
+
+
+def _schedule(seed=0):
+    games, rounds, _, violations = anneal(RATINGS, 3, iterations=5000, seed=seed)
+    assert not violations
+    return Schedule(list('abcdefgh'), games, rounds, RATINGS)
+
+
+def test_pair_counts():
+    """Tests the incidence products match counting game by game"""
+    sched = _schedule()
+    partners, opponents = report.pair_counts(sched.games, 8)
+    p, o = Counter(), Counter()
+    for a, b, c, d in sched.games.tolist():
+        p.update([(a, b), (b, a), (c, d), (d, c)])
+        for x, y in itertools.product((a, b), (c, d)):
+            o.update([(x, y), (y, x)])
+    for i, j in itertools.product(range(8), repeat=2):
+        assert partners[i, j] == (p[(i, j)] if i != j else 0)
+        assert opponents[i, j] == o[(i, j)]
+
+
+def test_validate():
+    """Tests a stack of schedules is checked in one call"""
+    scheds = [_schedule(seed) for seed in range(3)]
+    games = np.stack([sched.games for sched in scheds])
+    rounds = np.stack([sched.rounds for sched in scheds])
+    bad = games.copy()
+    bad[1, 0, 0], bad[1, 0, 1] = bad[1, 0, 1], bad[1, 1, 0]
+    assert report.validate(games, rounds, 8, 3).all()
+    assert report.validate(bad, rounds, 8, 3).tolist() == [True, False, True]
+
+
+def test_player_summary():
+    """Tests per-player games and mean score differences"""
+    sched = _schedule()
+    summary = report.player_summary(sched)
+    assert summary['games'].tolist() == [3] * 8
+    assert summary['max_partner'].max() == 1
+    rows = report.game_table(sched)
+    mean_a = np.mean([abs(r['Team1_score'] - r['Team2_score']) for r in rows if 'a' in r['Team1'] + r['Team2']])
+    assert np.isclose(summary['mean_score_diff'][0], mean_a)
+    grid = report.grid(report.pair_counts(sched.games, 8)[0], sched.names)
+    assert grid[0] == ['player'] + sched.names and grid[1][1] == ''
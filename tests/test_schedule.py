@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+# tests/test_schedule.py
+from collections import Counter
+import pickle
+
+import numpy as np
+import pulp
+import pytest
+
+from pyscheduler import pyscheduler
+from pyscheduler.games import Game, legal_games, pack_games, team_array, unpack_games
+from pyscheduler.schedule import Schedule
+from pyscheduler.stats import SolveStats
+
+
+DATA = {
+    'Mark': 4.2,
+    'Bev': 3.9,
+    'Jeff': 3.7,
+    'Peter S': 5.0,
+    'Kimber': 3.9,
+    'Eric': 4.5,
+    'Erik': 4.4,
+    'Charlie': 4.3
+}
+
+
+def test_game():
+    """Tests packed game indexes like a game combo"""
+    g = Game(0, 5, 2, 7, 3)
+    t1, t2, gn = g
+    assert (t1, t2, gn) == ((0, 5), (2, 7), 3)
+    assert g[0] == (0, 5)
+    assert g.matchup == Game(0, 5, 2, 7)
+    assert pickle.loads(pickle.dumps(g)) == g
+    assert {g: 1}[Game(0, 5, 2, 7, 3)] == 1
+    with pytest.raises(ValueError):
+        Game(0, 1, 2, 5000)
+
+
+def test_pack_games():
+    """Tests packing round trip"""
+    games = legal_games(team_array(8))
+    rounds = np.arange(len(games)) % 5 + 1
+    unpacked, unpacked_rounds = unpack_games(pack_games(games, rounds))
+    assert np.array_equal(unpacked, games)
+    assert np.array_equal(unpacked_rounds, rounds)
+
+
+def test_schedule_from_combos():
+    """Tests schedule keeps name-based access"""
+    combos = [(('Mark', 'Bev'), ('Jeff', 'Eric'), 2), (('Mark', 'Jeff'), ('Bev', 'Eric'), 1)]
+    sched = Schedule.from_combos(combos, ratings=DATA)
+    assert len(sched) == 2
+    assert sched.game_numbers == [1, 2]
+    assert list(sched) == [combos[1], combos[0]]
+    assert sched.round(2) == [(('Mark', 'Bev'), ('Jeff', 'Eric'))]
+    assert sched.team_scores()[0].tolist() == pytest.approx([7.9, 8.4])
+    again = Schedule.from_combos(sched.keys(), sched.names)
+    assert list(again) == list(sched)
+
+
+def test_make_schedule():
+    """Tests every player plays once per round"""
+    solver = pulp.getSolver('PULP_CBC_CMD', msg=False, timeLimit=30)
+    sched = pyscheduler.make_schedule(DATA, 2, solver)
+    assert isinstance(sched, Schedule)
+    assert len(sched) == 4
+    for game_number in sched.game_numbers:
+        players = Counter(p for t1, t2 in sched.round(game_number) for p in t1 + t2)
+        assert set(players) == set(DATA) and set(players.values()) == {1}
+
+
+def test_make_schedule_infeasible(tmp_path, caplog):
+    """Tests an infeasible roster gives an empty schedule and a warning"""
+    solver = pulp.getSolver('PULP_CBC_CMD', msg=False, timeLimit=30)
+    # 3 games of 4 players need all 3 matchups, Mark and Peter S against Bev and Jeff scores 1.6
+    players = dict(list(DATA.items())[:4])
+    for model_dir in (None, tmp_path):
+        sched = pyscheduler.make_schedule(players, 3, solver, model_dir=model_dir)
+        assert len(sched) == 0 and sched.names == list(players)
+    assert 'no feasible schedule' in caplog.text
+
+
+def test_reschedule():
+    """Tests played rounds are kept and the new roster is scheduled"""
+    solver = pulp.getSolver('PULP_CBC_CMD', msg=False, timeLimit=30)
+    sched = pyscheduler.make_schedule(DATA, 3, solver)
+    new, n_changed = pyscheduler.reschedule(sched, {'Mark': None, 'Natalie': 4.2}, 1, solver)
+    assert new.round(1) == sched.round(1)
+    assert 0 < n_changed <= 4
+    for game_number in (2, 3):
+        games = new.round(game_number)
+        players = Counter(p for t1, t2 in games for p in t1 + t2)
+        assert set(players) == set(DATA) - {'Mark'} | {'Natalie'} and set(players.values()) == {1}
+    partners = Counter(frozenset(t) for gn in new.game_numbers for t1, t2 in new.round(gn) for t in (t1, t2))
+    assert max(partners.values()) == 1
+    assert solver.optionsDict['warmStart'] is False
+    with pytest.raises(ValueError):
+        pyscheduler.reschedule(sched, {'Mark': None}, 1, solver)
+
+
+def test_reschedule_rating_over_cap():
+    """Tests a rating change that pushes old games over the score cap is repaired"""
+    solver = pulp.getSolver('PULP_CBC_CMD', msg=False, timeLimit=30)
+    sched = pyscheduler.make_schedule(DATA, 3, solver)
+    ratings = dict(DATA, Mark=3.0)
+    over = [(t1, t2) for t1, t2, _ in sched
+            if abs(sum(ratings[p] for p in t1) - sum(ratings[p] for p in t2)) > 1]
+    assert over
+    new, n_changed = pyscheduler.reschedule(sched, {'Mark': 3.0}, 0, solver)
+    assert n_changed >= len(over)
+    for game_number in (1, 2, 3):
+        players = Counter(p for t1, t2 in new.round(game_number) for p in t1 + t2)
+        assert set(players) == set(DATA) and set(players.values()) == {1}
+    assert (np.abs(np.diff(new.team_scores(), axis=1)) <= 1 + 1e-9).all()
+
+
+def test_rolling_schedule():
+    """Tests game numbers are yielded in order and the caps hold across them"""
+    solver = pulp.getSolver('PULP_CBC_CMD', msg=False, timeLimit=10)
+    rounds = list(pyscheduler.rolling_schedule(DATA, 3, 2, solver))
+    assert [gn for gn, _ in rounds] == [1, 2, 3]
+    partners, opponents = Counter(), Counter()
+    for _, games in rounds:
+        assert sorted(p for t1, t2 in games for p in t1 + t2) == sorted(DATA)
+        for t1, t2 in games:
+            partners.update([frozenset(t1), frozenset(t2)])
+            opponents.update(frozenset((a, b)) for a in t1 for b in t2)
+    assert max(partners.values()) == 1 and max(opponents.values()) <= 2
+    assert solver.optionsDict['warmStart'] is False
+    with pytest.raises(ValueError):
+        next(pyscheduler.rolling_schedule(DATA, 3, 0))
+
+
+def test_make_schedule_stats():
+    """Tests every phase is recorded and passed to the callback"""
+    solver = pulp.getSolver('PULP_CBC_CMD', msg=False, timeLimit=30)
+    seen = []
+    stats = SolveStats(callback=lambda rec: seen.append(rec['name']))
+    sched = pyscheduler.make_schedule(DATA, 2, solver, warm_start=True, stats=stats)
+    assert sched.stats is stats
+    assert seen == ['game_combos', 'game_scores', 'presolve', 'build', 'warm_start', 'solve', 'extract']
+    assert stats['presolve']['n_before'] == stats['game_combos']['n_game_combos']
+    assert stats['build']['n_vars'] == stats['presolve']['n_after']
+    assert stats['solve']['status'] == 'Optimal'
+    assert stats['solve']['first_incumbent'] is not None
+    assert 'logPath' not in solver.optionsDict and solver.optionsDict['warmStart'] is False
+    assert stats.to_dict()['seconds'] == pytest.approx(sum(rec['seconds'] for rec in stats.phases))
+
+
+def test_make_schedule_model_dir(tmp_path):
+    """Tests the built model is stored once and solved again from disk"""
+    solver = pulp.getSolver('PULP_CBC_CMD', msg=False, timeLimit=30)
+    first, second = SolveStats(), SolveStats()
+    sched = pyscheduler.make_schedule(DATA, 2, solver, stats=first, model_dir=tmp_path)
+    again = pyscheduler.make_schedule(DATA, 2, solver, stats=second, model_dir=tmp_path)
+    assert not first['build']['cached'] and second['build']['cached']
+    assert len(list(tmp_path.iterdir())) == 1
+    assert second['solve']['status'] == 'Optimal'
+    assert second['solve']['objective'] == pytest.approx(first['solve']['objective'])
+    for s in (sched, again):
+        for game_number in s.game_numbers:
+            players = Counter(p for t1, t2 in s.round(game_number) for p in t1 + t2)
+            assert set(players) == set(DATA) and set(players.values()) == {1}
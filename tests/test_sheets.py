@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+# tests/test_sheets.py
+from pyscheduler import sheets
+
+
+TABLE = [['Round#', 'Court 1', 'Court 2'],
+         [1, 'a and b\nc and d', 'e and f\ng and h'],
+         [2, 'a and c\nb and d', 'e and g\nf and h']]
+
+
+def _calls(backend, kind):
+    return [n for name, n in backend.calls if name == kind]
+
+
+def test_publish():
+    """Tests one batchUpdate per publish and only changed cells are sent"""
+    backend = sheets.FakeSheetsBackend({'schedule': [['old'] * 5 for _ in range(6)]})
+    publisher = sheets.SheetPublisher(backend, 'schedule')
+    publisher.publish(TABLE)
+    assert sheets._grid(backend.values['schedule']) == sheets._grid(TABLE)
+    assert backend.backgrounds['schedule'][0] == sheets._color(sheets.HEADER_BACKGROUND)
+    assert backend.backgrounds['schedule'][1] == sheets._color(sheets.BAND_BACKGROUND)
+    assert backend.backgrounds['schedule'][4] == sheets._color('')
+    assert len(_calls(backend, 'batch_update')) == 1
+
+    assert publisher.publish(TABLE) == {'requests': 0, 'cells': 0}
+    assert len(_calls(backend, 'batch_update')) == 1
+
+    changed = [list(row) for row in TABLE]
+    changed[2][2] = 'e and h\nf and g'
+    # one cell and the two autoresize requests
+    assert publisher.publish(changed) == {'requests': 3, 'cells': 1}
+    assert backend.values['schedule'][2][2] == 'e and h\nf and g'
+    assert _calls(backend, 'get_values') == ['schedule']
+
+
+def test_reader():
+    """Tests the sheet is only read again after the spreadsheet changes"""
+    backend = sheets.FakeSheetsBackend({'players': [[' Player ', 'Rating'], ['Mark', '4.2']]})
+    reader = sheets.SheetReader(backend, 'players')
+    assert reader.records() == ([{'Player': 'Mark', 'Rating': '4.2'}], True)
+    assert reader.records() == ([{'Player': 'Mark', 'Rating': '4.2'}], False)
+    assert len(_calls(backend, 'get_values')) == 1
+    backend.set_values('players', [[' Player ', 'Rating'], ['Mark', '4.2']])
+    assert reader.read()[1] is False
+    backend.set_values('players', [['Player', 'Rating'], ['Mark', '4.4']])
+    assert reader.read()[1] is True
+
+
+def test_reader_own_writes():
+    """Tests publishing to another sheet does not invalidate the read"""
+    backend = sheets.FakeSheetsBackend({'players': [['Player', 'Rating'], ['Mark', '4.2']],
+                                        'schedule': []})
+    reader = sheets.SheetReader(backend, 'players')
+    publisher = sheets.SheetPublisher(backend, 'schedule')
+    reader.read()
+    publisher.publish(TABLE)
+    publisher.publish(TABLE[:2])
+    assert reader.read()[1] is False
+    assert len(_calls(backend, 'get_values')) == 2
+
+    # an edit by hand after the publish is still read
+    backend.set_values('players', [['Player', 'Rating'], ['Mark', '4.4']])
+    publisher.publish(TABLE)
+    assert reader.read() == ([['Player', 'Rating'], ['Mark', '4.4']], True)
+
+    # so is a write to the sheet itself
+    sheets.SheetPublisher(backend, 'players').publish([['Player', 'Rating'], ['Mark', '4.6']])
+    assert reader.read()[1] is True
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+# tests/test_stats.py
+import math
+
+from pyscheduler.stats import cbc_log_stats
+
+
+def test_cbc_log_stats(tmp_path):
+    """Tests statistics of a solve stopped on the time limit"""
+    log = tmp_path / 'cbc.log'
+    log.write_text('Cbc0012I Integer solution of 0.2 found by feasibility pump after 0 iterations '
+                   'and 0 nodes (2.94 seconds)\n'
+                   'Cbc0020I Exiting on maximum time\n\n'
+                   'Result - Stopped on time limit\n\n'
+                   'Objective value:                0.20000000\n'
+                   'Lower bound:                    0.000\n'
+                   'Gap:                            inf\n'
+                   'Enumerated nodes:               0\n')
+    d = cbc_log_stats(str(log))
+    assert d['result'] == 'Stopped on time limit'
+    assert d['objective'] == 0.2 and d['bound'] == 0 and math.isinf(d['gap'])
+    assert d['first_incumbent'] == 2.94 and d['incumbents'] == 1 and d['nodes'] == 0
+
+
+def test_cbc_log_incumbent_times(tmp_path):
+    """Tests the time and objective of each incumbent"""
+    log = tmp_path / 'cbc.log'
+    log.write_text('Cbc0012I Integer solution of 3.4 found by DiveCoefficient after 12 '
+                   'iterations and 0 nodes (3.49 seconds)\n'
+                   'Cbc0012I Integer solution of 1.2 found by RINS after 40 '
+                   'iterations and 3 nodes (5.10 seconds)\n')
+    assert cbc_log_stats(str(log))['incumbent_times'] == [(3.49, 3.4), (5.1, 1.2)]
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+# tests/test_tables.py
+import numpy as np
+import pytest
+
+from pyscheduler.games import legal_games, team_array
+from pyscheduler.tables import GameTables, build_table, lookup_games
+
+
+def test_build_table():
+    """Tests the table matches legal_games"""
+    table = build_table(8)
+    assert list(table) == ['games']
+    assert np.array_equal(table['games'], legal_games(team_array(8)))
+
+
+def test_tables_mmap(tmp_path):
+    """Tests tables are written once and opened read-only with mmap"""
+    tables = GameTables(tmp_path, max_players=8)
+    games = tables.games(8)
+    assert tables.exists(8) and isinstance(games.base, np.memmap)
+    assert not games.flags.writeable
+    assert np.array_equal(games, legal_games(team_array(8)))
+    with pytest.raises(ValueError):
+        games[0, 0] = 1
+    assert np.array_equal(GameTables(tmp_path).games(8), games)
+
+    # larger than max_players is built in memory
+    assert len(tables.games(9)) and not tables.exists(9)
+    assert tables.precompute(6) == [4, 5, 6] and tables.precompute(6) == []
+
+
+def test_tables_no_write(tmp_path, monkeypatch):
+    """Tests the default directory is only read unless writing is enabled"""
+    monkeypatch.delenv('PYSCHEDULER_TABLE_DIR', raising=False)
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+    tables = GameTables()
+    assert not tables.write
+    assert np.array_equal(tables.games(8), legal_games(team_array(8)))
+    assert not tables.exists(8) and not any(tmp_path.iterdir())
+
+    # precomputed tables are still shared
+    GameTables(write=True).precompute(8)
+    assert isinstance(GameTables().games(8).base, np.memmap)
+
+    monkeypatch.setenv('PYSCHEDULER_TABLE_DIR', str(tmp_path / 'env'))
+    assert GameTables().write
+
+
+def test_lookup_games(tmp_path):
+    """Tests every team of a roster reads the table, other teams are enumerated"""
+    tables = GameTables(tmp_path)
+    teams = team_array(6)
+    assert lookup_games(teams, tables) is tables.games(6)
+    assert np.array_equal(lookup_games(teams[1:], tables), legal_games(teams[1:]))